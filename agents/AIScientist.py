@@ -11,11 +11,16 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_community.chat_models import ChatTongyi
 
 from utils.state import State
-from tools.paper_search_tool import searhArxivTool
+from tools.paper_search_tool import searhArxivTool, fetchArxivByIdsTool
 from utils.state import State, react_pre_model_wrapper
 from tools.chatbot_with_context_manager import chatbot_with_context_manager
 from tools.dataset_tools import create_kaggle_tool
 from tools.timing import get_timing_logger, time_node
+from utils.summary_index import get_summary_index
+from tools.novelty import get_novelty_checker, RETURN, VERIFY, CONTINUE
+from tools.idea_selection import IdeaSelector
+from tools.speculation import SpeculativeDatasetSearch
+from langchain_core.messages import AIMessage
 
 dotenv.load_dotenv()
 
@@ -38,6 +43,24 @@ with open(os.path.join(os.path.dirname(__file__), "..", "prompt/codeGen.md")) as
 # with open(os.path.join(os.path.dirname(__file__), "..", "prompt/dataAnalysis.md")) as f:
 #     dataAnalysis_prompt_template = f.read()
 
+def _read_markdown_dir(directory: str) -> dict:
+    summaries = dict()
+    for file in os.listdir(directory):
+        if file.endswith(".md"):
+            with open(os.path.join(directory, file), "r") as f:
+                summaries[file] = f.read()
+    return summaries
+
+
+def _run_paper_ids(state: State):
+    """本次运行涉及的论文 ID（PDF 文件名主干）；状态中没有论文信息时返回 None（不限定范围）"""
+    names = set(state.get("processed_papers") or [])
+    names.update(os.path.basename(path) for path in state.get("downloaded_papers") or [])
+    names.update(os.path.basename(item.get("pdf_path", "")) for item in state.get("parsed_multimodal_content") or [])
+    paper_ids = {os.path.splitext(name)[0] for name in names if name}
+    return paper_ids or None
+
+
 def build_AIScientist_subgraph(config):
     """
     构建文献 AIScientist 子图，使用 ArXiv 搜索文献并通过嵌入模型进行RAG处理生成文献调研报告
@@ -105,6 +128,7 @@ def build_AIScientist_subgraph(config):
 
     literature_search_tools = [
         searhArxivTool(),
+        fetchArxivByIdsTool(),
     ]
     # llm_literature_search_react = create_react_agent(literatureSearch_llm, literature_search_tools, pre_model_hook=react_pre_model_wrapper(config.question))
     llm_literature_search_react = literatureSearch_llm.bind_tools(literature_search_tools)
@@ -117,8 +141,13 @@ def build_AIScientist_subgraph(config):
     # planGen_llm = planGen_llm.bind_tools(dataset_search_tools)
 
     # 准备 llm
+    # IDEA_BEST_OF_N > 1 时每轮并发生成多个候选想法并择优
+    idea_selector = None
+    if int(os.environ.get("IDEA_BEST_OF_N", 1)) > 1:
+        idea_selector = IdeaSelector(ideaGen_llm)
     idea_generation_chatbot = chatbot_with_context_manager(
-        config, ideaGen_llm, ideaGen_prompt_template, context_manage="vector_search", calling_subgraph="idea_generation"
+        config, ideaGen_llm, ideaGen_prompt_template, context_manage="vector_search", calling_subgraph="idea_generation",
+        idea_selector=idea_selector
     )
     literature_search_chabot = chatbot_with_context_manager(
         config, llm_literature_search_react, literatureSearch_prompt_template, context_manage="vector_search", calling_subgraph="literature_search"
@@ -134,31 +163,74 @@ def build_AIScientist_subgraph(config):
     )
 
     def router_by_idea(state: State):
-        if ("HIGH_SIMILARITY" in state["messages"][-1].content) and (state["literature_tool_call_counter"] <= 5):
+        if ("HIGH_SIMILARITY" in state["messages"][-1].content) and (state.get("literature_tool_call_counter", 0) <= 5):
             return "RETURN"
         else:
             return "CONTINUE"
+
+    def novelty_check(state: State):
+        """本地打分：明显重合的想法直接退回，其余交给文献检索 LLM（NOVELTY_ALLOW_CONTINUE=1 时相似度很低的想法跳过核验）"""
+        rounds = state.get("novelty_rounds", 0) + 1
+        state["novelty_rounds"] = rounds
+        idea = state.get("new_idea") or ""
+        methods = state.get("methods_description") or ""
+        if methods and methods != idea:
+            idea = f"{idea}\n{methods}"
+
+        checker = get_novelty_checker()
+        if checker is None or not idea.strip():
+            state["novelty_verdict"] = VERIFY
+            return state
+
+        result = checker.check(idea)
+        verdict = result["verdict"]
+        max_rounds = int(os.environ.get("NOVELTY_MAX_ROUNDS", 3))
+        if verdict == RETURN and rounds >= max_rounds:
+            logger.info(f"新颖性检查已退回 {rounds} 轮，交给 LLM 核验")
+            verdict = VERIFY
+        if verdict == RETURN:
+            overlaps = "\n".join(f"- {p['title']} (arXiv {p['paper_id']}, similarity {p['score']:.2f})"
+                                  for p in result["similar"])
+            state["messages"].append(AIMessage(
+                content=f"HIGH_SIMILARITY. Your idea overlaps heavily with existing work:\n{overlaps}\n"
+                        f"Modify the idea at the method level so that it clearly differs from these papers."
+            ))
+        state["novelty_verdict"] = verdict
+        # 数据集检索只依赖想法，与文献核验并行进行
+        if verdict != RETURN and dataset_speculation is not None and not state.get("resume_node_call_stack"):
+            dataset_speculation.start(state)
+        return state
+
+    def router_by_novelty(state: State):
+        return state.get("novelty_verdict", VERIFY)
         
     def load_summaries(state: State):
-        state["literature_summary"] = dict()
         l_summary_path = os.path.join(os.path.dirname(__file__), "..", "outputs/reports")
-        for file in os.listdir(l_summary_path):
-            if file.endswith(".md"):
-                with open(os.path.join(l_summary_path, file), "r") as f:
-                    state["literature_summary"][file] = f.read()
-
-        state["methodology_summary"] = dict()
         m_summary_path = os.path.join(os.path.dirname(__file__), "..", "outputs/methods")
-        for file in os.listdir(m_summary_path):
-            if file.endswith(".md"):
-                with open(os.path.join(m_summary_path, file), "r") as f:
-                    state["methodology_summary"][file] = f.read()
+        index = get_summary_index()
+        if index is None:
+            state["literature_summary"] = _read_markdown_dir(l_summary_path)
+            state["methodology_summary"] = _read_markdown_dir(m_summary_path)
+            return state
+
+        # 只读取新增/修改过的文件
+        index.refresh(l_summary_path, "report")
+        index.refresh(m_summary_path, "methodology")
 
+        # 只取本次运行的论文，避免历史运行累积的文件混入 prompt
+        paper_ids = _run_paper_ids(state)
+        report_names = None
+        if paper_ids is not None:
+            report_names = [name.strip() for name in os.environ.get("SUMMARY_REPORT_FILES", "report_draft.md").split(",")]
+        state["literature_summary"] = index.load("report", names=report_names)
+        state["methodology_summary"] = index.load("methodology", paper_ids=paper_ids)
+        logger.info(f"加载总结: 报告 {len(state['literature_summary'])} 个，方法论 {len(state['methodology_summary'])} 个")
         return state
     
     dataset_downloader = create_kaggle_tool()
 
     load_summaries = time_node("AIScientist", "load_summaries", timing_logger)(load_summaries)
+    novelty_check_ = time_node("AIScientist", "novelty_check", timing_logger)(novelty_check)
     idea_generation_chatbot_ = time_node("AIScientist", "idea_generation_chatbot", timing_logger)(idea_generation_chatbot)
     literature_search_chabot_ = time_node("AIScientist", "literature_search_chabot", timing_logger)(literature_search_chabot)
     dataset_search_chatbot_ = time_node("AIScientist", "data_search_chabot", timing_logger)(dataset_search_chatbot)
@@ -166,23 +238,37 @@ def build_AIScientist_subgraph(config):
     code_generation_chatbot_ = time_node("AIScientist", "code_generation_chatbot", timing_logger)(code_generation_chatbot)
     dataset_downloader_ = time_node("AIScientist", "dataset_downloader", timing_logger)(dataset_downloader)
 
+    dataset_speculation = None
+    if os.environ.get("DATASET_SPECULATION", "1") != "0":
+        dataset_speculation = SpeculativeDatasetSearch(dataset_search_chatbot_, dataset_downloader_)
+
+    def dataset_acquisition(state: State):
+        """数据集检索 + 下载；当前想法已有推测结果时直接合并"""
+        if dataset_speculation is not None and dataset_speculation.take(state):
+            return state
+        return dataset_downloader_(dataset_search_chatbot_(state))
+
+    dataset_acquisition_ = time_node("AIScientist", "dataset_acquisition", timing_logger)(dataset_acquisition)
+
         
     graph = StateGraph(State)
 
     graph.add_node("load_summaries", load_summaries)
     graph.add_node("idea_generation_chatbot", idea_generation_chatbot_)
+    graph.add_node("novelty_check", novelty_check_)
     graph.add_node("literature_search_chabot", literature_search_chabot_)
-    graph.add_node("dataset_search_chatbot", dataset_search_chatbot_)
-    graph.add_node("dataset_downloader", dataset_downloader_)
+    graph.add_node("dataset_acquisition", dataset_acquisition_)
     graph.add_node("plan_generation_chatbot", plan_generation_chatbot_)
     graph.add_node("code_generation_chatbot", code_generation_chatbot_)
     
     graph.add_edge(START, "load_summaries")
     graph.add_edge("load_summaries", "idea_generation_chatbot")
-    graph.add_edge("idea_generation_chatbot", "literature_search_chabot")
-    graph.add_conditional_edges("literature_search_chabot", router_by_idea, {"RETURN": "idea_generation_chatbot", "CONTINUE": "dataset_search_chatbot"})
-    graph.add_edge("dataset_search_chatbot", "dataset_downloader")
-    graph.add_edge("dataset_downloader", "plan_generation_chatbot")
+    graph.add_edge("idea_generation_chatbot", "novelty_check")
+    graph.add_conditional_edges("novelty_check", router_by_novelty, {
+        RETURN: "idea_generation_chatbot", VERIFY: "literature_search_chabot", CONTINUE: "dataset_acquisition"
+    })
+    graph.add_conditional_edges("literature_search_chabot", router_by_idea, {"RETURN": "idea_generation_chatbot", "CONTINUE": "dataset_acquisition"})
+    graph.add_edge("dataset_acquisition", "plan_generation_chatbot")
     graph.add_edge("plan_generation_chatbot", "code_generation_chatbot")
     graph.add_edge("code_generation_chatbot", END)
 
@@ -18,7 +18,12 @@ from tools.summary_tools import SummaryWriterTool
 from tools.methodology_tools import MethodologyWriterTool
 from utils.node import SimpleToolNode
 from utils.tool_utils import route_by_tool_call_summary, route_methodology_workflow, route_pdf_parser_workflow
-from tools.chatbot import create_simple_chatbot, create_methodology_chatbot, create_pdf_parser_chatbot
+from tools.chatbot import create_simple_chatbot, create_methodology_chatbot, create_pdf_parser_chatbot, \
+    extract_paper_methodology, paper_info_from_result, summarize_papers
+from tools.pdf_parser import PDFParser
+from tools.literature_pipeline import LiteraturePipeline
+from tools.summary_mapreduce import MapReduceSummarizer
+from common.utils import get_pdf_files
 from tools.timing import get_timing_logger, time_node
 
 with open(os.path.join(os.path.dirname(__file__), "..", "prompt/pdfParser.md"), "r", encoding="utf-8") as f:
@@ -68,7 +73,8 @@ def ensure_dirs():
 def build_literature_parse_subgraph(pdf_dir: str = "../outputs/pdf",
                                     md_output_dir: str = "../outputs/markdown",
                                     reports_save_path: str = "../outputs/reports/",
-                                    methods_save_path: str = "../outputs/methods/") -> StateGraph:
+                                    methods_save_path: str = "../outputs/methods/",
+                                    streaming: bool = None) -> StateGraph:
     """
     Build a subgraph for literature parsing, including PDF parsing, summary generation, and methodology extraction.
     
@@ -77,6 +83,9 @@ def build_literature_parse_subgraph(pdf_dir: str = "../outputs/pdf",
         glm_api_key: API key for GLM models
         pdf_dir: Directory containing PDF files to parse
         md_output_dir: Directory for markdown output
+        streaming: Stream each paper through parse -> methodology as soon as it is parsed, with the
+            summary running alongside (default from LITERATURE_STREAMING, on). False keeps the
+            staged chatbot/tool graph.
     
     Returns:
         Compiled StateGraph
@@ -119,6 +128,25 @@ def build_literature_parse_subgraph(pdf_dir: str = "../outputs/pdf",
     summary_tools = [SummaryWriterTool(save_path=reports_save_path, file_name="report_draft.md")]
     methodology_tools = [MethodologyWriterTool(save_path=methods_save_path)]
     
+    # Per-paper notes + tree reduction instead of one prompt with every paper's full text
+    summarizer = None
+    if os.environ.get("SUMMARY_MAP_REDUCE", "1").lower() not in ("0", "false", "no"):
+        summarizer = MapReduceSummarizer(summary_llm)
+    
+    if streaming is None:
+        streaming = os.environ.get("LITERATURE_STREAMING", "1").lower() not in ("0", "false", "no")
+    if streaming:
+        return _build_streaming_subgraph(
+            pdf_dir=pdf_dir,
+            md_output_dir=md_output_dir,
+            methods_save_path=methods_save_path,
+            summary_llm=summary_llm.bind_tools(summary_tools),
+            methodology_llm=methodology_multimodal_llm,
+            summary_tool=summary_tools[0],
+            summarizer=summarizer,
+            timing_logger=timing_logger
+        )
+    
     # Bind tools to LLMs
     pdf_parser_llm = pdf_parser_llm.bind_tools(pdf_parser_tools, tool_choice="pdf_parser_tool")
     summary_llm = summary_llm.bind_tools(summary_tools)
@@ -128,7 +156,7 @@ def build_literature_parse_subgraph(pdf_dir: str = "../outputs/pdf",
     pdf_parser_chatbot = create_pdf_parser_chatbot(pdf_parser_llm, pdf_parser_prompt_template, pdf_dir=pdf_dir)
     pdf_parser_tool_node = SimpleToolNode(pdf_parser_tools)
     
-    summary_chatbot = create_simple_chatbot(summary_llm, summary_prompt_template)
+    summary_chatbot = create_simple_chatbot(summary_llm, summary_prompt_template, summarizer=summarizer)
     summary_tool_node = SimpleToolNode(summary_tools)
     
     methodology_chatbot = create_methodology_chatbot(
@@ -227,6 +255,67 @@ def build_literature_parse_subgraph(pdf_dir: str = "../outputs/pdf",
     
     return graph.compile()
 
+def _build_streaming_subgraph(pdf_dir: str, md_output_dir: str, methods_save_path: str,
+                              summary_llm, methodology_llm, summary_tool, summarizer, timing_logger) -> StateGraph:
+    """
+    Single-node variant of the literature subgraph: papers flow through parse -> methodology
+    one by one (bounded queues between stages) and the summary consumes papers as they arrive,
+    instead of waiting for every PDF before the next stage starts.
+    """
+    def methodology_fn(parsed_item):
+        return extract_paper_methodology(
+            llm=methodology_llm,
+            prompt_template=methodology_prompt_template,
+            paper_info=paper_info_from_result(parsed_item),
+            md_output_dir=md_output_dir,
+            methods_save_path=methods_save_path
+        )
+
+    def summary_fn(parsed_items):
+        return summarize_papers(summary_llm, summary_prompt_template, parsed_items, summary_tool, summarizer)
+
+    def literature_pipeline(state: State) -> State:
+        pdf_files = state.get("downloaded_papers") or get_pdf_files(pdf_dir)
+        if not pdf_files:
+            error_msg = f"No PDF files found in {pdf_dir}"
+            logger.warning(error_msg)
+            state["errors"] = state.get("errors", []) + [error_msg]
+            return state
+        state["downloaded_papers"] = pdf_files
+
+        pdf_parser = PDFParser(pdf_dir, md_output_dir)
+        pipeline = LiteraturePipeline(
+            pdf_parser,
+            methodology_fn=methodology_fn,
+            summary_fn=summary_fn,
+            # 单篇笔记在论文到达时生成并缓存，最终总结只做归约
+            summary_prepare_fn=summarizer.summarize_paper if summarizer is not None else None,
+            parse_workers=min(4, len(pdf_files))
+        )
+        output = pipeline.run(pdf_files)
+
+        state = PDFParser.apply_results(state, output["parsed"])
+        processed_papers = state.get("processed_papers") or set()
+        for paper, (_prompt, _content, result) in output["methodologies"].items():
+            if result is not None:
+                processed_papers.add(paper)
+            else:
+                output["errors"].append(f"保存Methodology失败: {paper}")
+        state["processed_papers"] = processed_papers
+        # 解析失败已由 apply_results 记录
+        failed = {r.get("error") for r in output["parsed"] if r.get("status") == "failed"}
+        state["errors"] = state.get("errors", []) + [e for e in output["errors"] if e not in failed]
+        return state
+
+    literature_pipeline = time_node("paperReader", "literature_pipeline", timing_logger)(literature_pipeline)
+
+    graph = StateGraph(State)
+    graph.add_node("literature_pipeline", literature_pipeline)
+    graph.add_edge(START, "literature_pipeline")
+    graph.add_edge("literature_pipeline", END)
+    return graph.compile()
+
+
 if __name__ == "__main__":
     
     pdf_path = "../data/pdf/"
@@ -3,9 +3,9 @@ from langchain_core.prompts import PromptTemplate
 from langgraph.graph import StateGraph, START, END
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-import arxiv
 import requests
 import time
+import re
 from pathlib import Path
 import os
 from langchain.chat_models import init_chat_model
@@ -15,12 +15,16 @@ from tools.timing import get_timing_logger, time_node
 dotenv.load_dotenv(dotenv_path="/Users/chongyanghe/Desktop/DeepScientist/.env")
 
 from utils.state import State
+from utils.search_utils import ArxivSearch, reciprocal_rank_fusion
+from utils.paper_store import get_paper_store, parse_arxiv_id
 
 # ===================== 1. 第一个 Agent: Query Refinement Agent =====================
 class QueryRefinementAgent:
     """Agent 1: 查询优化（翻译+增强）"""
     
-    def __init__(self, model_name: str = "deepseek-reasoner", temperature: float = 0.7):
+    def __init__(self, model_name: str = "deepseek-reasoner", temperature: float = 0.7, num_variants: int = None):
+        # 生成的查询变体数量；为 1 时只生成一个查询、不做融合（下载篇数由 PAPER_DOWNLOAD_BUDGET 单独控制）
+        self.num_variants = num_variants or int(os.environ.get("QUERY_VARIANTS", 3))
         self.llm = init_chat_model(
                     model_name,
                     base_url=os.environ.get("OPENAI_BASE_URL", ""),
@@ -41,12 +45,42 @@ class QueryRefinementAgent:
             """
         self.prompt_template = PromptTemplate.from_template(prompt_template)
 
+        expansion_path = Path(os.path.dirname(__file__)) / ".." / "prompt" / "queryExpansion.md"
+        self.expansion_template = None
+        if self.num_variants > 1 and expansion_path.exists():
+            with open(expansion_path, "r", encoding="utf-8") as f:
+                self.expansion_template = PromptTemplate.from_template(f.read())
+
+    @staticmethod
+    def _parse_variants(content: str, limit: int) -> list:
+        """按行解析查询变体，去掉编号/引号并去重"""
+        variants = []
+        seen = set()
+        for line in content.splitlines():
+            line = re.sub(r"^\s*(?:[-*•]|\d+[.)、])\s*", "", line).strip().strip('"').strip("'").strip()
+            if line and line.lower() not in seen:
+                seen.add(line.lower())
+                variants.append(line)
+        return variants[:limit]
+
     def refine_query(self, state: State) -> State:
         """
         接收状态对象，优化查询后返回更新的状态
         """
         # 从 state 中提取初始查询
         original_query = state["original_query"]
+        if self.expansion_template is not None:
+            # 一次调用生成多个查询变体
+            prompt = self.expansion_template.format(query=original_query, num_variants=self.num_variants)
+            response = self.llm.invoke(prompt)
+            refined_queries = self._parse_variants(response.content, self.num_variants)
+            if refined_queries:
+                logger.info(f"🧩 生成 {len(refined_queries)} 个查询变体：{refined_queries}")
+                state["refined_queries"] = refined_queries
+                state["refined_query"] = refined_queries[0]
+                return state
+            logger.warning("查询变体解析失败，退回单查询模式")
+
         # 调用 LLM 优化查询
         prompt = self.prompt_template.format(query=original_query)
         response = self.llm.invoke(prompt)
@@ -54,6 +88,7 @@ class QueryRefinementAgent:
         refined_query = response.content.strip()
         # 更新 state 并返回
         state["refined_query"] = refined_query
+        state["refined_queries"] = [refined_query]
 
         return state
 
@@ -68,35 +103,58 @@ class SearchAgent:
                     model_provider="openai",
                     extra_body={"chat_template_kwargs": {"enable_thinking": True}}
                 )
+        # 带本地缓存的 ArXiv 检索器（重复查询直接走本地 SQLite）
+        self.searcher = ArxivSearch()
+        # 每个查询变体取回的条数，以及融合后进入下载的论文数
+        # 下载篇数默认与原来一致（1 篇）；调大会成倍增加下载、解析与逐篇 LLM 调用的开销
+        self.results_per_query = int(os.environ.get("RESULTS_PER_QUERY", 5))
+        self.download_budget = max(1, int(os.environ.get("PAPER_DOWNLOAD_BUDGET", 1)))
 
     def search_papers(self, state: State) -> State:
         """
         接收状态对象，搜索论文后返回更新的状态
         """
-        # 从 state 中提取优化后的查询
-        refined_query = state["refined_query"]
-        logger.info(f"🔍 使用优化后查询进行 ArXiv 搜索：{refined_query}")
-        # 调用 ArXiv API 搜索论文
-        paper_urls = self._search_arxiv(refined_query)
+        # 从 state 中提取优化后的查询（多个变体时逐个检索后做 RRF 融合）
+        queries = state.get("refined_queries") or [state["refined_query"]]
+        logger.info(f"🔍 使用 {len(queries)} 个查询进行 ArXiv 搜索：{queries}")
+        papers = self._search_fused(queries)
         # 更新 state 并返回
-        state["paper_urls"] = paper_urls
+        state["paper_candidates"] = [paper.to_dict() for paper in papers]
+        state["paper_urls"] = [paper.pdf_url for paper in papers if paper.pdf_url][:self.download_budget]
         return state
 
-    def _search_arxiv(self, query: str) -> list:
+    def _search_fused(self, queries: list) -> list:
+        """
+        逐个执行多个查询，并用 reciprocal-rank fusion 合并排序
+
+        arXiv 要求每 3 秒最多一个请求：本地缓存命中的变体先返回，其余串行经共享限流器访问远程
+        """
+        if len(queries) == 1:
+            # 单查询：与原来一样只取需要下载的篇数
+            return self._search_arxiv(queries[0], self.download_budget)
+
+        rankings = [None] * len(queries)
+        cache = self.searcher.cache
+        if cache is not None:
+            for i, query in enumerate(queries):
+                rankings[i] = cache.lookup_query(query, self.results_per_query)
+        cached_count = sum(ranking is not None for ranking in rankings)
+        if cached_count:
+            logger.info(f"📦 {cached_count}/{len(queries)} 个查询变体命中本地缓存")
+        for i, query in enumerate(queries):
+            if rankings[i] is None:
+                rankings[i] = self._search_arxiv(query, self.results_per_query)
+        fused = reciprocal_rank_fusion(rankings)
+        logger.info(f"📑 融合后候选论文 {len(fused)} 篇（下载预算 {self.download_budget}）")
+        return fused
+
+    def _search_arxiv(self, query: str, max_results: int = 1) -> list:
         """ArXiv 底层搜索逻辑"""
-        urls = []
         try:
-            search = arxiv.Search(
-                query=query,
-                max_results=1, # 可修改
-                sort_by=arxiv.SortCriterion.Relevance,
-                sort_order=arxiv.SortOrder.Descending
-            )
-            for result in search.results():
-                urls.append(result.pdf_url)
+            return self.searcher.search(query, max_results=max_results)
         except Exception as e:
             print(f"ArXiv 搜索失败：{e}")
-        return urls
+        return []
 
 # ===================== 3. 第三个 Agent: Downloader Agent (论文下载) =====================
 class DownloaderAgent:
@@ -106,6 +164,8 @@ class DownloaderAgent:
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(parents=True, exist_ok=True)
         self.max_papers = max_papers
+        # 跨运行共享的内容寻址论文库，已知 id 直接从库中取，不再走网络
+        self.store = get_paper_store()
     
     def download_papers(self, state: State) -> State:
         """
@@ -125,16 +185,30 @@ class DownloaderAgent:
         downloaded_papers = []
         for url in paper_urls[:self.max_papers]:
             try:
+                # 生成本地文件名
+                filename = url.split("/")[-1] + ".pdf"
+                filepath = self.download_dir / filename
+                arxiv_id, version = parse_arxiv_id(url)
+
+                # 论文库中已有该 id/版本，直接放到下载目录
+                sha256 = self.store.lookup(arxiv_id, version) if (self.store and arxiv_id) else None
+                if sha256:
+                    self.store.materialize(sha256, str(filepath))
+                    downloaded_papers.append(filepath)
+                    print(f"命中论文库，跳过下载：{filepath}")
+                    continue
+
                 # 避免请求过快被封
                 time.sleep(1)
                 response = requests.get(url, timeout=10)
                 response.raise_for_status()  # 抛出 HTTP 错误
-                # 生成本地文件名
-                filename = url.split("/")[-1] + ".pdf"
-                filepath = self.download_dir / filename
-                # 写入文件
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
+                if self.store:
+                    sha256 = self.store.put_bytes(response.content, arxiv_id, version)
+                    self.store.materialize(sha256, str(filepath))
+                else:
+                    # 写入文件
+                    with open(filepath, 'wb') as f:
+                        f.write(response.content)
                 # 记录下载结果
                 # downloaded_papers.append({
                 #     "url": url,
@@ -27,8 +27,13 @@ def get_pdf_files(pdf_dir: str = "data/pdf/") -> List[str]:
             pdf_files.append(pdf_path)
     return pdf_files
 
+_ensured_cwds = set()
+
 def ensure_dirs():
-    """确保输出目录存在"""
+    """确保输出目录存在（同一工作目录下只执行一次）"""
+    cwd = os.getcwd()
+    if cwd in _ensured_cwds:
+        return
     dirs = [
         "outputs/parsed",
         "outputs/reports",
@@ -37,4 +42,5 @@ def ensure_dirs():
         "res/markdown"  # PDF解析输出目录
     ]
     for dir_path in dirs:
-        os.makedirs(dir_path, exist_ok=True)
\ No newline at end of file
+        os.makedirs(dir_path, exist_ok=True)
+    _ensured_cwds.add(cwd)
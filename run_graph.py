@@ -11,6 +11,7 @@ from agents.codeGenerator import build_code_experiment_subgraph
 from agents.latexWriter import build_latex_writer_agent
 from utils.state import State
 from utils.config import Config
+from utils.artifact_store import new_run_id, release_artifact_store
 
 # os.environ['HF_HUB_OFFLINE'] = '1'  # 强制离线模式
 # os.environ['TRANSFORMERS_OFFLINE'] = '1' 
@@ -68,6 +69,7 @@ def main(
 ):
     graph = build_graph()
     initial_state = {
+        "run_id": new_run_id(),
         "original_query": original_query,
         "messages": messages,
         "topic": topic,
@@ -81,7 +83,10 @@ def main(
         "revision_count": 0,
         "quality_score": 0.9
     }
-    final_state = graph.invoke(initial_state)
+    try:
+        final_state = graph.invoke(initial_state)
+    finally:
+        release_artifact_store(initial_state["run_id"])
 
     return final_state
 
@@ -14,6 +14,7 @@ from agents.latexWriter import build_latex_writer_agent
 from utils.state import State
 from utils.config import Config
 from utils.workflow_tracer import get_workflow_tracer, reset_workflow_tracer
+from utils.artifact_store import release_artifact_store
 from pathlib import Path
 
 def build_graph_with_progress(progress_callback: Optional[Callable[[str, str, Optional[Dict]], None]] = None):
@@ -127,6 +128,7 @@ def main_with_progress(
     graph = build_graph_with_progress(progress_callback)
     
     initial_state = {
+        "run_id": tracer.run_id,
         "original_query": original_query,
         "messages": messages,
         "topic": topic,
@@ -312,5 +314,6 @@ def main_with_progress(
             progress_callback("error", "error", {"message": f"执行出错: {str(e)}"})
         raise
     finally:
-        # 重置轨迹记录器，为下次运行做准备
+        # 释放本次运行的中间产物，重置轨迹记录器，为下次运行做准备
+        release_artifact_store(initial_state["run_id"])
         reset_workflow_tracer()
@@ -0,0 +1,86 @@
+"""
+本地新颖性检查的阈值校准用例
+
+摘要取自真实论文；"改写"用例是按原摘要重述的想法（附带常规的实验方法段落），
+应当被退回或交给 LLM 核验，绝不能被直接放行。
+"""
+import pytest
+
+# 本地新颖性检查依赖 NumPy（见 backend/requirements.txt），未安装时跳过而不是在收集阶段报错
+pytest.importorskip("numpy")
+
+from tools.novelty import NoveltyChecker, RETURN, VERIFY, CONTINUE
+
+ABSTRACTS = {
+    "2211.14730": (
+        'A Time Series is Worth 64 Words: Long-term Forecasting with Transformers',
+        'We propose an efficient design of Transformer-based models for multivariate time series forecasting and self-supervised representation learning. It is based on two key components: (i) segmentation of time series into subseries-level patches which are served as input tokens to Transformer; (ii) channel-independence where each channel contains a single univariate time series that shares the same embedding and Transformer weights across all the series. Patching design naturally has three-fold benefit: local semantic information is retained in the embedding; computation and memory usage of the attention maps are quadratically reduced given the same look-back window; and the model can attend longer history. Our channel-independent patch time series Transformer (PatchTST) can improve the long-term forecasting accuracy significantly when compared with that of SOTA Transformer-based models. We also apply our model to self-supervised pre-training tasks and attain excellent fine-tuning performance, which outperforms supervised training on large datasets. Transferring of masked pre-trained representation on one dataset to others also produces SOTA forecasting accuracy.',
+    ),
+    "2012.07436": (
+        'Informer: Beyond Efficient Transformer for Long Sequence Time-Series Forecasting',
+        "Many real-world applications require the prediction of long sequence time-series, such as electricity consumption planning. Long sequence time-series forecasting (LSTF) demands a high prediction capacity of the model, which is the ability to capture precise long-range dependency coupling between output and input efficiently. Recent studies have shown the potential of Transformer to increase the prediction capacity. However, there are several severe issues with Transformer that prevent it from being directly applicable to LSTF, including quadratic time complexity, high memory usage, and inherent limitation of the encoder-decoder architecture. To address these issues, we design an efficient transformer-based model for LSTF, named Informer, with three distinctive characteristics: (i) a ProbSparse self-attention mechanism, which achieves O(L log L) in time complexity and memory usage, and has comparable performance on sequences' dependency alignment. (ii) the self-attention distilling highlights dominating attention by halving cascading layer input, and efficiently handles extreme long input sequences. (iii) the generative style decoder, while conceptually simple, predicts the long time-series sequences at one forward operation rather than a step-by-step way, which drastically improves the inference speed of long-sequence predictions. Extensive experiments on four large-scale datasets demonstrate that Informer significantly outperforms existing methods and provides a new solution to the LSTF problem.",
+    ),
+    "2310.06625": (
+        'iTransformer: Inverted Transformers Are Effective for Time Series Forecasting',
+        'The recent boom of linear forecasting models questions the ongoing passion for architectural modifications of Transformer-based forecasters. These forecasters leverage Transformers to model the global dependencies over temporal tokens of time series, with each token formed by multiple variates of the same timestamp. However, Transformers are challenged in forecasting series with larger lookback windows due to performance degradation and computation explosion. Besides, the embedding for each temporal token fuses multiple variates that represent potential delayed events and distinct physical measurements, which may fail in learning variate-centric representations and result in meaningless attention maps. In this work, we reflect on the competent duties of Transformer components and repurpose the Transformer architecture without any modification to the basic components. We propose iTransformer that simply applies the attention and feed-forward network on the inverted dimensions. Specifically, the time points of individual series are embedded into variate tokens which are utilized by the attention mechanism to capture multivariate correlations; meanwhile, the feed-forward network is applied for each variate token to learn nonlinear representations. The iTransformer model achieves state-of-the-art on challenging real-world datasets, which further empowers the Transformer family with promoted performance, generalization ability across different variates, and better utilization of arbitrary lookback windows, making it a nice alternative as the fundamental backbone of time series forecasting.',
+    ),
+    "2106.09685": (
+        'LoRA: Low-Rank Adaptation of Large Language Models',
+        'An important paradigm of natural language processing consists of large-scale pre-training on general domain data and adaptation to particular tasks or domains. As we pre-train larger models, full fine-tuning, which retrains all model parameters, becomes less feasible. Using GPT-3 175B as an example -- deploying independent instances of fine-tuned models, each with 175B parameters, is prohibitively expensive. We propose Low-Rank Adaptation, or LoRA, which freezes the pre-trained model weights and injects trainable rank decomposition matrices into each layer of the Transformer architecture, greatly reducing the number of trainable parameters for downstream tasks. Compared to GPT-3 175B fine-tuned with Adam, LoRA can reduce the number of trainable parameters by 10,000 times and the GPU memory requirement by 3 times. LoRA performs on-par or better than fine-tuning in model quality on RoBERTa, DeBERTa, GPT-2, and GPT-3, despite having fewer trainable parameters, a higher training throughput, and, unlike adapters, no additional inference latency.',
+    ),
+    "1810.04805": (
+        'BERT: Pre-training of Deep Bidirectional Transformers for Language Understanding',
+        'We introduce a new language representation model called BERT, which stands for Bidirectional Encoder Representations from Transformers. Unlike recent language representation models, BERT is designed to pre-train deep bidirectional representations from unlabeled text by jointly conditioning on both left and right context in all layers. As a result, the pre-trained BERT model can be fine-tuned with just one additional output layer to create state-of-the-art models for a wide range of tasks, such as question answering and language inference, without substantial task-specific architecture modifications.',
+    ),
+}
+
+METHODS = 'The model is trained end-to-end with a mean squared error loss using the Adam optimizer. We evaluate on standard benchmarks (ETTh1, ETTm1, Weather, Electricity, Traffic) against strong baselines and report MSE and MAE, with ablation studies on each component and sensitivity analysis of the main hyperparameters.'
+
+# (改写后的想法, 对应的原论文)
+PARAPHRASED_DUPLICATES = [
+    ('We split each univariate channel of a multivariate time series into subseries-level patches and feed the patches as input tokens to a Transformer. Channels are processed independently but share the same embedding and Transformer weights. Patching keeps local semantic information, quadratically reduces attention computation and memory for a given look-back window, and lets the model attend to a longer history, improving long-term forecasting. We further pre-train the patch Transformer with masked self-supervised representation learning and fine-tune or transfer it across datasets.' + " " + METHODS, "2211.14730"),
+    ('For long sequence time-series forecasting we propose an efficient Transformer that replaces full self-attention with a ProbSparse self-attention achieving O(L log L) time and memory, applies self-attention distilling that halves the cascading layer input to highlight dominating attention and handle extremely long inputs, and uses a generative-style decoder that predicts the whole long output sequence in one forward pass instead of step by step, greatly speeding up inference.' + " " + METHODS, "2012.07436"),
+    ("We embed each variate's whole time series as a single token instead of mixing variates per timestamp. Attention is applied across these variate tokens to capture multivariate correlations, and the feed-forward network is applied to each variate token to learn nonlinear series representations, without modifying the basic Transformer components. This inverted Transformer handles long lookback windows and generalizes across variates for time series forecasting." + " " + METHODS, "2310.06625"),
+    ('We freeze the pre-trained weights of a large language model and inject trainable low-rank decomposition matrices into every Transformer layer, so that adaptation to downstream tasks trains orders of magnitude fewer parameters, uses less GPU memory and adds no inference latency compared with full fine-tuning and adapters.' + " " + METHODS, "2106.09685"),
+]
+
+DIFFERENT_IDEA = 'We forecast regional electricity demand by retrieving analogous historical events (heat waves, holidays, outages) from a text-indexed event memory built with a language model, and conditioning a lightweight probabilistic forecaster on the retrieved event embeddings and their observed demand responses, producing calibrated prediction intervals under rare conditions.' + " " + METHODS
+
+
+class _FakePaperCache:
+    def abstracts_since(self, since: float = 0.0):
+        return [(paper_id, title, abstract, 1.0) for paper_id, (title, abstract) in ABSTRACTS.items()]
+
+
+def _checker(**kwargs) -> NoveltyChecker:
+    return NoveltyChecker(paper_cache=_FakePaperCache(), min_corpus=1, **kwargs)
+
+
+@pytest.mark.parametrize("allow_continue", [False, True])
+@pytest.mark.parametrize("idea,paper_id", PARAPHRASED_DUPLICATES)
+def test_paraphrased_duplicate_is_not_continued(idea, paper_id, allow_continue):
+    result = _checker(allow_continue=allow_continue).check(idea)
+    assert result["verdict"] != CONTINUE
+    assert result["similar"][0]["paper_id"] == paper_id
+
+
+def test_close_paraphrase_is_returned():
+    idea, paper_id = PARAPHRASED_DUPLICATES[0]
+    result = _checker().check(idea)
+    assert result["verdict"] == RETURN
+    assert result["similar"][0]["paper_id"] == paper_id
+
+
+def test_low_similarity_is_verified_by_default():
+    result = _checker().check(DIFFERENT_IDEA)
+    assert result["score"] < 0.1
+    assert result["verdict"] == VERIFY
+
+
+def test_low_similarity_continues_only_when_opted_in():
+    assert _checker(allow_continue=True).check(DIFFERENT_IDEA)["verdict"] == CONTINUE
+
+
+def test_small_corpus_is_verified():
+    checker = NoveltyChecker(paper_cache=_FakePaperCache(), min_corpus=len(ABSTRACTS) + 1, allow_continue=True)
+    assert checker.check(DIFFERENT_IDEA)["verdict"] == VERIFY
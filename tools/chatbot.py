@@ -1,26 +1,56 @@
 import os
+import re
 import base64
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from common.llm_config import get_llm, call_multimodal_llm
 from common.utils import init_logger, get_pdf_files
+from tools.markdown_store import resolve_content
+from tools.figure_ranker import FigureRanker
+from utils.artifact_store import ensure_run_id, get_artifact_store
+from utils.rate_limit import get_provider_limiter
+from utils.tool_utils import build_methodology_queue
 from utils.state import State
 from langchain_core.load import dumps, loads
 from langchain.chat_models import init_chat_model
 from loguru import logger
 
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # logger = init_logger("chatbot")
 
-def create_simple_chatbot(llm, prompt_template: str):
+def _load_parsed_content(state_dict: State):
+    """Fill parsed_multimodal_content from the run's artifact store when it is missing from the state."""
+    if not state_dict.get("parsed_multimodal_content"):
+        parsed = get_artifact_store(ensure_run_id(state_dict)).get("parsed_multimodal_content")
+        if parsed:
+            state_dict["parsed_multimodal_content"] = parsed
+
+
+def _literature_content(parsed_items, summarizer=None) -> str:
+    """Literature content for the summary prompt: map-reduced notes, or the concatenated full texts."""
+    if summarizer is not None:
+        return summarizer.literature_content(parsed_items)
+    # markdown 全文按句柄懒加载，不保存在状态中
+    literature_texts = [
+        text
+        for text in (resolve_content(item) for item in parsed_items if item.get("status") == "success")
+        if text
+    ]
+    return "\n\n---\n\n".join(literature_texts)
+
+
+def create_simple_chatbot(llm, prompt_template: str, summarizer=None):
     """
     Create a simple chatbot function without context management.
     
     Args:
         llm: Language model instance
         prompt_template: Prompt template string with placeholders like {literature_content}
+        summarizer: Optional MapReduceSummarizer; when given, {literature_content} is filled with
+            per-paper notes merged down to the fan-in limit instead of every paper's full text
     
     Returns:
         A chatbot function that can be used as a node in LangGraph
@@ -29,16 +59,7 @@ def create_simple_chatbot(llm, prompt_template: str):
         """Simple chatbot node that formats prompt and calls LLM."""
         # Get existing messages
         all_messages = state_dict.get("messages", [])
-        # 优化：只在必要时读取state.json，优先使用内存中的状态
-        if "parsed_multimodal_content" not in state_dict or not state_dict.get("parsed_multimodal_content"):
-            try:
-                state_file = os.path.join(os.path.dirname(__file__), "..", "outputs/state.json")
-                if os.path.exists(state_file):
-                    with open(state_file, "r", encoding="utf-8") as f:
-                        new_state = json.loads(f.read())
-                        state_dict["parsed_multimodal_content"] = new_state.get("parsed_multimodal_content", [])
-            except Exception as e:
-                logger.warning(f"读取state.json失败，使用内存状态: {e}")
+        _load_parsed_content(state_dict)
         
         # Check if summary phase has been initialized
         # Summary messages are identified by checking if there's a HumanMessage with summary prompt content
@@ -76,20 +97,14 @@ def create_simple_chatbot(llm, prompt_template: str):
         if not messages:
             # Extract literature content from state
             parsed_content = state_dict.get("parsed_multimodal_content", [])
-            literature_texts = [
-                item["content"] 
-                for item in parsed_content 
-                if item.get("status") == "success" and item.get("content")
-            ]
+            literature_content = _literature_content(parsed_content, summarizer)
             
-            if not literature_texts:
+            if not literature_content:
                 error_msg = "没有可用的有效内容用于生成报告"
                 logger.error(f"❌ {error_msg}")
                 state_dict["errors"] = state_dict.get("errors", []) + [error_msg]
                 return state_dict
             
-            literature_content = "\n\n---\n\n".join(literature_texts)
-            
             # Format prompt
             prompt = prompt_template.format(literature_content=literature_content)
             
@@ -131,201 +146,217 @@ def create_simple_chatbot(llm, prompt_template: str):
     
     return chatbot
 
-def create_methodology_chatbot(llm_with_tools, prompt_template: str, md_output_dir: str, methods_save_path: str = "../outputs/methods"):
+def paper_info_from_result(parsed_item: Dict[str, Any]) -> Dict[str, Any]:
+    """解析结果 -> 方法论提取所需的论文信息（markdown 只保存句柄，按需懒加载）"""
+    pdf_path = parsed_item.get("pdf_path", "")
+    return {
+        "paper_id": os.path.splitext(os.path.basename(pdf_path))[0],
+        "pdf_path": pdf_path,
+        "markdown": parsed_item.get("markdown"),
+        "figures": parsed_item.get("figures", []),
+        "thumbnails": parsed_item.get("thumbnails", [])
+    }
+
+
+def _strip_thinking(content: str) -> str:
+    """Filter out thinking content if present"""
+    if content and ("<think>" in content.lower() or "思考过程" in content or "thinking:" in content.lower()):
+        content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL | re.IGNORECASE)
+        content = re.sub(r'思考过程[:：].*?\n', '', content, flags=re.DOTALL)
+        content = re.sub(r'Thinking[:：].*?\n', '', content, flags=re.DOTALL | re.IGNORECASE)
+    return content
+
+
+def extract_paper_methodology(llm, prompt_template: str, paper_info: Dict[str, Any], md_output_dir: str,
+                              methods_save_path: str = "../outputs/methods", provider: str = "zhipu"):
+    """
+    Extract and save the methodology of a single paper (multimodal: markdown + figures).
+    
+    Shared by the methodology chatbot node and the streaming literature pipeline.
+    
+    Args:
+        llm: Multimodal LLM instance
+        prompt_template: Prompt template with {paper_id}, {markdown_content} and {figures_info}
+        paper_info: Paper info, see paper_info_from_result
+        md_output_dir: Directory containing markdown files extracted from PDFs
+        methods_save_path: Directory path for saving methodology files
+        provider: Model provider; calls are throttled by its shared ProviderLimiter
+    
+    Returns:
+        (formatted_prompt, methodology_content, writer_result); writer_result is None if saving failed
+    """
+    paper_id = paper_info.get("paper_id", "unknown")
+    markdown_content = resolve_content(paper_info)
+    figures = paper_info.get("figures", [])
+    
+    # Upload candidates: prefer thumbnails, fall back to the original figure
+    md_dir = md_output_dir.rstrip("/") if md_output_dir else "res/markdown"
+    base_path = Path(md_dir)
+    thumbnails = paper_info.get("thumbnails") or []
+    upload_paths = [
+        base_path / (thumbnails[idx] if idx < len(thumbnails) and thumbnails[idx] else fig_path_rel)
+        for idx, fig_path_rel in enumerate(figures)
+    ]
+    # Rank figures by method relevance and keep the top-k within the pixel budget
+    figure_paths = [base_path / fig_path_rel for fig_path_rel in figures]
+    selected = FigureRanker().select(markdown_content, figures, upload_paths, figure_paths)
+    
+    # Format prompt
+    figures_info = []
+    for idx, entry in enumerate(selected):
+        caption = f" ({entry['caption']})" if entry["caption"] else ""
+        figures_info.append(f"Image {idx + 1}: {entry['figure']}{caption}")
+    
+    formatted_prompt = prompt_template.format(
+        paper_id=paper_id,
+        markdown_content=markdown_content,
+        figures_info="\n".join(figures_info) if figures_info else "No image information"
+    )
+    
+    # Collect image paths for call_multimodal_llm
+    image_paths = [str(entry["upload_path"]) for entry in selected]
+    
+    # Call multimodal LLM using the common method (similar to openlens-ai)
+    logger.info(f"🤖 调用多模态模型生成Methodology: {paper_id}")
+    methodology_content = _strip_thinking(get_provider_limiter(provider).call(
+        call_multimodal_llm,
+        llm=llm,
+        prompt=formatted_prompt,
+        image_paths=image_paths,
+        logger_instance=logger
+    ))
+    
+    # Automatically call the tool to save the methodology content
+    from tools.methodology_tools import MethodologyWriterTool
+    tool = MethodologyWriterTool(save_path=methods_save_path)
+    try:
+        result = tool._run(methodology_content=methodology_content, paper_id=paper_id)
+        logger.info(f"✅ Methodology已保存: {paper_id}")
+    except Exception as tool_error:
+        logger.error(f"❌ 保存Methodology失败: {tool_error}")
+        result = None
+    return formatted_prompt, methodology_content, result
+
+
+def summarize_papers(llm, prompt_template: str, parsed_items, summary_tool, summarizer=None) -> Optional[str]:
+    """
+    Generate the Introduction / Related Works report for a set of parsed papers and save it.
+    
+    Args:
+        llm: Language model instance (may be bound to summary_writer_tool)
+        prompt_template: Prompt template string with {literature_content}
+        parsed_items: Parsed results (entries of parsed_multimodal_content)
+        summary_tool: SummaryWriterTool used to save the report
+        summarizer: Optional MapReduceSummarizer, see create_simple_chatbot
+    
+    Returns:
+        The writer tool result, or None if there was no usable content
+    """
+    literature_content = _literature_content(parsed_items, summarizer)
+    if not literature_content:
+        return None
+    
+    prompt = prompt_template.format(literature_content=literature_content)
+    response = llm.invoke([HumanMessage(content=prompt)])
+    
+    # The bound LLM normally answers with a summary_writer_tool call; fall back to the plain text
+    summary_report = None
+    for tool_call in getattr(response, "tool_calls", None) or []:
+        if tool_call.get("name") == summary_tool.name:
+            summary_report = tool_call.get("args", {}).get("summary_report")
+    if not summary_report:
+        summary_report = _strip_thinking(response.content if isinstance(response.content, str) else str(response.content))
+    return summary_tool._run(summary_report=summary_report)
+
+
+def create_methodology_chatbot(llm_with_tools, prompt_template: str, md_output_dir: str, methods_save_path: str = "../outputs/methods",
+                               max_workers: int = None):
     """
     Create a chatbot function for methodology extraction with image support.
     
+    Papers waiting for extraction are kept as an indexed queue in state_dict["methodology_queue"];
+    each call drains the queue with up to max_workers concurrent multimodal calls (throttled by the
+    provider limiter), so N papers take about ceil(N / k) sequential calls instead of N graph loops.
+    
     Args:
         llm_with_tools: Multimodal LLM instance with bound tools
         prompt_template: Prompt template string with placeholders for paper info and images
         md_output_dir: Directory containing markdown files extracted from PDFs
         methods_save_path: Directory path for saving methodology files
+        max_workers: Concurrent extractions (default METHODOLOGY_WORKERS or 4)
     
     Returns:
         A chatbot function that can be used as a node in LangGraph
     """
+    max_workers = max_workers or int(os.environ.get("METHODOLOGY_WORKERS", 4))
+
     def chatbot(state_dict: State) -> State:
         """Methodology chatbot node that handles multimodal content (text + images)."""
-        # IMPORTANT: Methodology phase is independent of summary phase
-        # Clear all messages when entering methodology phase and reinitialize
-        all_messages = state_dict.get("messages", [])
-        # 优化：只在必要时读取state.json，优先使用内存中的状态
-        if "parsed_multimodal_content" not in state_dict or not state_dict.get("parsed_multimodal_content"):
-            try:
-                state_file = os.path.join(os.path.dirname(__file__), "..", "outputs/state.json")
-                if os.path.exists(state_file):
-                    with open(state_file, "r", encoding="utf-8") as f:
-                        new_state = json.loads(f.read())
-                        state_dict["parsed_multimodal_content"] = new_state.get("parsed_multimodal_content", [])
-            except Exception as e:
-                logger.warning(f"读取state.json失败，使用内存状态: {e}")
-        
-        # Simple check: if we have any methodology-related message
-        # Methodology messages are identified by:
-        # 1. HumanMessage with multimodal content (list format, even if no images)
-        # 2. The list format distinguishes it from summary phase (which uses string)
-        has_methodology_init = any(
-            isinstance(msg, HumanMessage) and 
-            isinstance(msg.content, list) and 
-            len(msg.content) > 0 and
-            isinstance(msg.content[0], dict) and msg.content[0].get("type") == "text"
-            for msg in all_messages
-        )
-        
-        # If methodology is already initialized, keep all messages
-        # Otherwise, clear all (from summary phase) and start fresh
-        if has_methodology_init:
-            messages = all_messages
-        else:
-            # Clear all messages and start fresh for methodology phase
-            messages = []
-            logger.info("🔬 开始提取Methodology")
-        
-        processed_papers = state_dict.get("processed_papers", set())
-        parsed_content = state_dict.get("parsed_multimodal_content", [])
-        
-        # Find next unprocessed paper with successful parsing
-        unprocessed_papers = [
-            item for item in parsed_content
-            if item.get("status") == "success" and 
-            os.path.basename(item.get("pdf_path", "")) not in processed_papers
-        ]
-        
-        # Initialize current_paper for first call if messages is empty
-        # Only initialize if messages is empty (fresh start or no methodology messages yet)
-        if not messages and unprocessed_papers:
-            current_paper = unprocessed_papers[0]
-            pdf_path = current_paper.get("pdf_path", "")
-            paper_id = os.path.splitext(os.path.basename(pdf_path))[0]
-            markdown_content = current_paper.get("content", "")
-            
-            # Save current_paper info to state_dict for later use
-            state_dict["current_paper"] = {
-                "paper_id": paper_id,
-                "pdf_path": pdf_path,
-                "content": markdown_content,
-                "figures": current_paper.get("figures", [])
-            }
-            logger.info(f"📄 准备处理论文: {paper_id}")
+        _load_parsed_content(state_dict)
         
-        # Handle case with no unprocessed papers
-        elif not unprocessed_papers and not messages:
+        # Methodology phase is independent of summary phase: start from a clean message list
+        queue = build_methodology_queue(state_dict)
+        if not queue:
             error_msg = "没有可处理的论文内容用于Methodology提取"
             logger.error(f"❌ {error_msg}")
             state_dict["errors"] = state_dict.get("errors", []) + [error_msg]
+            state_dict["methodology_queue"] = []
             return state_dict
         
+        parsed_content = state_dict.get("parsed_multimodal_content", [])
+        processed_papers = state_dict.get("processed_papers") or set()
+        errors = []
+        completed = {}
+        workers = min(max_workers, len(queue))
+        logger.info(f"🔬 开始提取Methodology: {len(queue)} 篇论文，并发 {workers}")
+        
         # Call multimodal LLM using call_multimodal_llm (similar to openlens-ai's approach)
         # This approach generates content first, then manually calls the tool to save it
-        try:
-            # Check if we have a current paper to process
-            current_paper_info = state_dict.get('current_paper', {})
-            
-            # If no current paper or current paper is None, fetch next unprocessed paper
-            if not current_paper_info:
-                # Recalculate unprocessed papers to get the latest state
-                parsed_content = state_dict.get("parsed_multimodal_content", [])
-                processed_papers = state_dict.get("processed_papers", set())
-                unprocessed_papers = [
-                    item for item in parsed_content
-                    if item.get("status") == "success" and 
-                    os.path.basename(item.get("pdf_path", "")) not in processed_papers
-                ]
-                
-                if unprocessed_papers:
-                    current_paper = unprocessed_papers[0]
-                    pdf_path = current_paper.get("pdf_path", "")
-                    paper_id = os.path.splitext(os.path.basename(pdf_path))[0]
-                    current_paper_info = {
-                        "paper_id": paper_id,
-                        "pdf_path": pdf_path,
-                        "content": current_paper.get("content", ""),
-                        "figures": current_paper.get("figures", [])
-                    }
-                    state_dict["current_paper"] = current_paper_info
-            
-            if not current_paper_info:
-                error_msg = "没有可处理的论文内容"
-                logger.error(f"❌ {error_msg}")
-                state_dict["errors"] = state_dict.get("errors", []) + [error_msg]
-                state_dict["messages"] = messages
-                return state_dict
-            
-            paper_id = current_paper_info.get("paper_id", "unknown")
-            markdown_content = current_paper_info.get("content", "")
-            figures = current_paper_info.get("figures", [])
-            
-            # Format prompt
-            figures_info = []
-            for idx, fig_path_rel in enumerate(figures[:6]): 
-                figures_info.append(f"Image {idx + 1}: {fig_path_rel}")
-            
-            formatted_prompt = prompt_template.format(
-                paper_id=paper_id,
-                markdown_content=markdown_content,
-                figures_info="\n".join(figures_info) if figures_info else "No image information"
-            )
-            
-            # Collect image paths for call_multimodal_llm
-            md_dir = md_output_dir.rstrip("/") if md_output_dir else "res/markdown"
-            base_path = Path(md_dir)
-            image_paths = []
-            for fig_path_rel in figures[:6]: 
-                fig_path = base_path / fig_path_rel
-                if fig_path.exists():
-                    image_paths.append(str(fig_path))
-            
-            # Call multimodal LLM using the common method (similar to openlens-ai)
-            logger.info("🤖 调用多模态模型生成Methodology...")
-            methodology_content = call_multimodal_llm(
-                llm=llm_with_tools,
-                prompt=formatted_prompt,
-                image_paths=image_paths,
-                logger_instance=logger
-            )
-            
-            # Filter out thinking content if present
-            if methodology_content:
-                import re
-                if "<think>" in methodology_content.lower() or "思考过程" in methodology_content or "thinking:" in methodology_content.lower():
-                    methodology_content = re.sub(r'<think>.*?</think>', '', methodology_content, flags=re.DOTALL | re.IGNORECASE)
-                    methodology_content = re.sub(r'思考过程[:：].*?\n', '', methodology_content, flags=re.DOTALL)
-                    methodology_content = re.sub(r'Thinking[:：].*?\n', '', methodology_content, flags=re.DOTALL | re.IGNORECASE)
-            
-            # Automatically call the tool to save the methodology content
-            from tools.methodology_tools import MethodologyWriterTool
-            tool = MethodologyWriterTool(save_path=methods_save_path)
-            try:
-                result = tool._run(methodology_content=methodology_content, paper_id=paper_id)
-                logger.info(f"✅ Methodology已保存: {paper_id}")
-                
-                # Add messages to state for tracking
-                messages.append(HumanMessage(content=formatted_prompt))
-                messages.append(AIMessage(content=methodology_content))
-                # Add ToolMessage to indicate tool was called
-                tool_message = ToolMessage(
-                    content=result,
-                    tool_call_id="auto_save_methodology",
-                    name="methodology_writer_tool"
-                )
-                messages.append(tool_message)
-                
-            except Exception as tool_error:
-                logger.error(f"❌ 保存Methodology失败: {tool_error}")
-                state_dict["errors"] = state_dict.get("errors", []) + [f"保存Methodology失败: {str(tool_error)}"]
-                
-            # Mark this paper as processed
-            processed_papers = state_dict.get("processed_papers", set())
-            processed_papers.add(os.path.basename(current_paper_info.get("pdf_path", "")))
-            state_dict["processed_papers"] = processed_papers
-            
-            # Clear current_paper to force fetching next unprocessed paper on next call
-            state_dict["current_paper"] = None
-            
-        except Exception as e:
-            logger.error(f"❌ 调用Multimodal LLM生成Methodology失败: {str(e)}")
-            state_dict["errors"] = state_dict.get("errors", []) + [f"调用Multimodal LLM生成Methodology失败: {str(e)}"]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_idx = {
+                executor.submit(
+                    extract_paper_methodology,
+                    llm=llm_with_tools,
+                    prompt_template=prompt_template,
+                    paper_info=paper_info_from_result(parsed_content[idx]),
+                    md_output_dir=md_output_dir,
+                    methods_save_path=methods_save_path
+                ): idx
+                for idx in queue
+            }
+            for future in as_completed(future_to_idx):
+                idx = future_to_idx[future]
+                paper = os.path.basename(parsed_content[idx].get("pdf_path", ""))
+                try:
+                    completed[idx] = future.result()
+                    if completed[idx][2] is None:
+                        errors.append(f"保存Methodology失败: {os.path.splitext(paper)[0]}")
+                except Exception as e:
+                    logger.error(f"❌ 调用Multimodal LLM生成Methodology失败 ({paper}): {str(e)}")
+                    errors.append(f"调用Multimodal LLM生成Methodology失败: {str(e)}")
+                # Mark this paper as processed (failed ones are reported in errors, not retried)
+                processed_papers.add(paper)
+        
+        # Add messages to state for tracking, in paper order
+        messages = []
+        for idx in sorted(completed):
+            formatted_prompt, methodology_content, result = completed[idx]
+            if result is None:
+                continue
+            messages.append(HumanMessage(content=formatted_prompt))
+            messages.append(AIMessage(content=methodology_content))
+            # Add ToolMessage to indicate tool was called
+            messages.append(ToolMessage(
+                content=result,
+                tool_call_id=f"auto_save_methodology_{idx}",
+                name="methodology_writer_tool"
+            ))
         
+        state_dict["processed_papers"] = processed_papers
+        state_dict["methodology_queue"] = []
+        state_dict["current_paper"] = None
+        if errors:
+            state_dict["errors"] = state_dict.get("errors", []) + errors
         state_dict["messages"] = messages
         return state_dict
     
@@ -9,6 +9,7 @@ import os
 import pandas as pd
 import json
 import re
+import uuid
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import ToolMessage, HumanMessage, AIMessage
@@ -26,7 +27,8 @@ def chatbot_with_context_manager(
     config: Config, llm: BaseChatModel, prompt: str,
     context_manage: Literal["token_cnt", "token_cnt_large", "last_message", "last_tool_message", "vector_search"] = "vector_search",
     only_last_human_message: bool = False,
-    calling_subgraph: str = ""
+    calling_subgraph: str = "",
+    idea_selector=None
 ):
     """
     创建一个带上下文管理功能的聊天机器人
@@ -43,6 +45,8 @@ def chatbot_with_context_manager(
     :type only_last_human_message: bool
     :param calling_subgraph: 说明
     :type calling_subgraph: str
+    :param idea_selector: 想法生成时并发生成多个候选并择优（tools/idea_selection.IdeaSelector），None 表示直接调用 llm
+    :type idea_selector: IdeaSelector
 
     :returns 聊天机器人函数
     """
@@ -271,8 +275,9 @@ def chatbot_with_context_manager(
                 logger.info("Only keep the last human message")
 
         logger.info(f"Message count to LLM: {len(message_to_llm)}, token count: {count_tokens_approximately(message_to_llm)}")
-        time_stamp = pd.Timestamp.now().strftime("%Y%m%d%H%M%S")
-        save_path = os.path.join(config.save_path, "llm_calls", f"{time_stamp}.json")
+        # unique per call: the speculative dataset search runs this chatbot concurrently with the main flow
+        time_stamp = pd.Timestamp.now().strftime("%Y%m%d%H%M%S%f")
+        save_path = os.path.join(config.save_path, "llm_calls", f"{time_stamp}_{uuid.uuid4().hex[:8]}.json")
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
         with open(save_path, "w") as f:
@@ -289,6 +294,8 @@ def chatbot_with_context_manager(
                 try:
                     if calling_subgraph == "dataset_search":
                         response = llm.invoke(this_prompt)
+                    elif idea_selector is not None:
+                        response = idea_selector.invoke(message_to_llm)
                     else:
                         response = llm.invoke(message_to_llm)
                     state["messages"].append(response)
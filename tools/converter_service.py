@@ -0,0 +1,228 @@
+"""
+常驻的文档转换服务
+
+- 进程内单例：按配置缓存 SegmentTool（docling DocumentConverter）和解析进程池，
+  同一进程内的多次工具调用只加载一次模型
+- 可选的本地守护进程：通过 Unix socket 接收转换任务，多个运行共享同一组已加载的模型
+
+启动守护进程:
+    python -m tools.converter_service --socket outputs/docling.sock
+客户端在设置 DOCLING_SERVICE_SOCKET 后自动走守护进程
+"""
+import os
+import json
+import atexit
+import socket
+import argparse
+import threading
+import socketserver
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "docling.sock")
+
+
+class ConverterService:
+    """进程内常驻的转换服务，缓存已加载模型的转换器和解析进程池"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segment_tools = {}
+        self._process_pools = {}
+
+    def segment_tool(self, enable_formula_enrichment: bool = False):
+        """获取（必要时构建）对应配置的 SegmentTool"""
+        with self._lock:
+            tool = self._segment_tools.get(enable_formula_enrichment)
+            if tool is None:
+                from tools.document_segment import SegmentTool
+                logger.info(f"⏳ 加载 docling 模型 (formula_enrichment={enable_formula_enrichment})")
+                tool = SegmentTool(enable_formula_enrichment=enable_formula_enrichment)
+                self._segment_tools[enable_formula_enrichment] = tool
+            return tool
+
+    def process_pool(self, max_workers: int, enable_formula_enrichment: bool, threads_per_worker: int) -> ProcessPoolExecutor:
+        """获取（必要时创建）常驻的解析进程池，工作进程在 initializer 中预加载模型"""
+        from tools.pdf_parser import _init_parse_worker
+        key = (max_workers, enable_formula_enrichment)
+        with self._lock:
+            pool = self._process_pools.get(key)
+            if pool is not None and getattr(pool, "_broken", False):
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = None
+            if pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_parse_worker,
+                    initargs=(enable_formula_enrichment, threads_per_worker)
+                )
+                self._process_pools[key] = pool
+            return pool
+
+    def discard_process_pool(self, max_workers: int, enable_formula_enrichment: bool):
+        """丢弃已损坏的进程池，下次调用时重建"""
+        with self._lock:
+            pool = self._process_pools.pop((max_workers, enable_formula_enrichment), None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def convert(self, pdf_files: List[str], md_output_dir: str, enable_formula_enrichment: bool = False,
+                max_workers: int = 4, use_cache: bool = True,
+                sections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        转换一组PDF
+
+        Args:
+            pdf_files: PDF文件路径列表
+            md_output_dir: Markdown输出目录
+            enable_formula_enrichment: 是否启用公式识别
+            max_workers: 最大并行数
+            use_cache: 是否使用解析缓存
+            sections: 只解析这些章节所在的页（None 表示整篇）
+
+        Returns:
+            每个PDF的解析结果
+        """
+        from tools.pdf_parser import PDFParser
+        parser = PDFParser(os.path.dirname(pdf_files[0]) if pdf_files else None, md_output_dir, enable_formula_enrichment)
+        return parser.parse_files(pdf_files, max_workers=max_workers, use_cache=use_cache, sections=sections)
+
+    def shutdown(self):
+        with self._lock:
+            pools = list(self._process_pools.values())
+            self._process_pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_converter_service() -> ConverterService:
+    """获取进程内单例转换服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConverterService()
+            atexit.register(_service.shutdown)
+        return _service
+
+
+# ===================== Unix socket 守护进程 =====================
+
+class _ConvertRequestHandler(socketserver.StreamRequestHandler):
+    """每个连接处理一行 JSON 请求，返回一行 JSON 响应"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            op = request.get("op")
+            if op == "ping":
+                response = {"status": "ok"}
+            elif op == "convert":
+                results = get_converter_service().convert(
+                    request["pdf_files"],
+                    request["md_output_dir"],
+                    enable_formula_enrichment=request.get("enable_formula_enrichment", False),
+                    max_workers=request.get("max_workers", 4),
+                    use_cache=request.get("use_cache", True),
+                    sections=request.get("sections")
+                )
+                # 结果中只有 markdown 句柄，全文由客户端按路径懒加载
+                response = {"status": "ok", "results": results}
+            else:
+                response = {"status": "error", "error": f"unknown op: {op}"}
+        except Exception as e:
+            logger.error(f"❌ 转换服务请求失败: {e}")
+            response = {"status": "error", "error": str(e)}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str = DEFAULT_SOCKET_PATH, preload: bool = True):
+    """启动守护进程，监听 Unix socket"""
+    socket_path = os.path.abspath(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    if preload:
+        get_converter_service().segment_tool(False)
+    with _ThreadingUnixServer(socket_path, _ConvertRequestHandler) as server:
+        logger.info(f"🚀 文档转换服务已启动: {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            get_converter_service().shutdown()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+class ConverterClient:
+    """转换守护进程的客户端"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None):
+        self.socket_path = os.path.abspath(socket_path)
+        self.timeout = timeout
+
+    def _request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout if timeout is not None else self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        response = json.loads(line.decode("utf-8"))
+        if response.get("status") != "ok":
+            raise RuntimeError(response.get("error", "converter service error"))
+        return response
+
+    def is_available(self) -> bool:
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            self._request({"op": "ping"}, timeout=2)
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def convert(self, pdf_files: List[str], md_output_dir: str, enable_formula_enrichment: bool = False,
+                max_workers: int = 4, use_cache: bool = True,
+                sections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        response = self._request({
+            "op": "convert",
+            "pdf_files": [os.path.abspath(p) for p in pdf_files],
+            "md_output_dir": os.path.abspath(md_output_dir),
+            "enable_formula_enrichment": enable_formula_enrichment,
+            "max_workers": max_workers,
+            "use_cache": use_cache,
+            "sections": sections,
+        })
+        return response["results"]
+
+
+def get_converter_client() -> Optional[ConverterClient]:
+    """设置了 DOCLING_SERVICE_SOCKET 且守护进程可用时返回客户端，否则返回 None"""
+    socket_path = os.environ.get("DOCLING_SERVICE_SOCKET")
+    if not socket_path:
+        return None
+    client = ConverterClient(socket_path)
+    if client.is_available():
+        return client
+    logger.warning(f"⚠️ 文档转换服务不可用 ({socket_path})，使用进程内转换")
+    return None
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="DeepScientist document conversion service")
+    arg_parser.add_argument("--socket", default=os.environ.get("DOCLING_SERVICE_SOCKET", DEFAULT_SOCKET_PATH))
+    arg_parser.add_argument("--no-preload", action="store_true", help="do not load docling models at startup")
+    args = arg_parser.parse_args()
+    serve(args.socket, preload=not args.no_preload)
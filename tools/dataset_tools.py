@@ -1,7 +1,8 @@
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field, PrivateAttr
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 import os
 import time
 from loguru import logger
@@ -23,6 +24,7 @@ except ImportError:
 
 # 确保导入的模块返回值匹配
 from utils.dataset_download import KaggleAuthenticator, KaggleSearcher, KaggleDownloader, DatasetInfo
+from utils.kaggle_registry import KaggleRegistry, get_kaggle_registry
 from utils.state import State
 
 # 极简配置（仅保留必要项）
@@ -31,6 +33,13 @@ class KaggleToolConfig:
     config_path: Optional[str] = None
     default_download_path: str = "./datasets"
     auto_extract: bool = True
+    # 关键词策略并发检索数与共享截止时间（秒）
+    search_workers: int = field(default_factory=lambda: int(os.environ.get("KAGGLE_SEARCH_WORKERS", 5)))
+    search_deadline: float = field(default_factory=lambda: float(os.environ.get("KAGGLE_SEARCH_DEADLINE", 60)))
+    # 结果得分（KaggleSearcher.score_dataset）不低于该值时停止等待其余检索；50 分即标题包含完整关键词
+    early_stop_score: float = field(default_factory=lambda: float(os.environ.get("KAGGLE_EARLY_STOP_SCORE", 50)))
+    # 前两个候选是否并发下载，取先完成且含有效CSV的一个
+    download_race: bool = field(default_factory=lambda: os.environ.get("KAGGLE_DOWNLOAD_RACE", "0") == "1")
 
 class KaggleDatasetInput(BaseModel):
     keyword: str = Field(description="搜索关键词（必填）")
@@ -44,6 +53,7 @@ class KaggleDatasetTool(BaseTool):
     _authenticator: KaggleAuthenticator = PrivateAttr()
     _searcher: KaggleSearcher = PrivateAttr()
     _downloader: KaggleDownloader = PrivateAttr()
+    _registry: Optional[KaggleRegistry] = PrivateAttr(default=None)
 
     def __init__(self, config: Optional[KaggleToolConfig] = None, **kwargs):
         super().__init__(** kwargs)
@@ -52,6 +62,7 @@ class KaggleDatasetTool(BaseTool):
             self._authenticator = KaggleAuthenticator(self._config.config_path)
             self._searcher = KaggleSearcher(self._authenticator)
             self._downloader = KaggleDownloader(self._authenticator)
+            self._registry = get_kaggle_registry()
             # 修复kaggle.json权限
             kaggle_json = Path.home() / ".kaggle" / "kaggle.json"
             if kaggle_json.exists():
@@ -59,17 +70,40 @@ class KaggleDatasetTool(BaseTool):
         except Exception as e:
             raise RuntimeError(f"Kaggle初始化失败：{e}")
 
-    @staticmethod
-    def _check_csv_exists(path: str) -> bool:
-        """检测是否有有效.csv文件"""
-        if not path:
-            return False
-        p = Path(path)
-        for csv_file in p.rglob("*.csv"):
-            if csv_file.is_file() and csv_file.stat().st_size > 100:
-                logger.info(f"✅ 找到有效CSV：{csv_file}")
-                return True
-        return False
+    def _csv_files(self, path: str) -> List[str]:
+        """有效 .csv 文件列表；已登记的目录直接读文件清单，否则遍历目录"""
+        if not path or not str(path).strip():
+            return []
+        record = self._registry.lookup_path(path) if self._registry is not None else None
+        if record is not None:
+            return [os.path.join(record["path"], rel_path) for rel_path in record["csv_files"]]
+        return [str(f) for f in Path(path).rglob("*.csv") if f.is_file() and f.stat().st_size > 100]
+
+    def _search(self, keyword: str, max_results: int) -> List[DatasetInfo]:
+        """关键词搜索；TTL 内搜索过的关键词直接读登记表"""
+        if self._registry is not None:
+            cached = self._registry.lookup_search(keyword, max_results)
+            if cached is not None:
+                logger.info(f"⚡ 关键词'{keyword}'命中本地搜索缓存")
+                return cached
+        datasets = self._searcher.search_by_keyword(keyword, max_results=max_results)
+        if self._registry is not None:
+            self._registry.record_search(keyword, max_results, datasets)
+        return datasets
+
+    def _download(self, dataset: DatasetInfo, download_path: str):
+        """下载数据集；同一版本已完整下载到该目录时直接返回"""
+        if self._registry is not None:
+            record = self._registry.lookup_download(dataset.ref, download_path, dataset.version)
+            if record is not None and record["csv_files"]:
+                logger.info(f"⚡ 数据集{dataset.ref}已在本地，跳过下载")
+                return True, f"数据集已在本地：{record['path']}（{len(record['files'])} 个文件）", Path(record["path"])
+        success, msg, output_path = self._downloader.download_dataset(
+            dataset.ref, download_path, self._config.auto_extract
+        )
+        if success and self._registry is not None:
+            self._registry.record_download(dataset.ref, output_path, dataset.version)
+        return success, msg, output_path
 
     @staticmethod
     def _optimize_keywords(keyword: str) -> List[str]:
@@ -153,44 +187,26 @@ class KaggleDatasetTool(BaseTool):
         logger.info(f"🔍 原始关键词：{keyword}")
         logger.info(f"📋 生成搜索策略：{keyword_strategies}")
 
-        # 3. 多级降级策略：依次尝试每个关键词
-        all_datasets = []
-        tried_keywords = []
-        
-        for search_keyword in keyword_strategies:
-            tried_keywords.append(search_keyword)
-            logger.info(f"🔎 尝试关键词：{search_keyword}")
+        # 3. 并发检索所有关键词策略（共享截止时间），出现高置信度匹配即停止等待
+        deadline = time.monotonic() + self._config.search_deadline
+        results = self._search_concurrently(keyword_strategies, 5, deadline, keyword)
+        tried_keywords = [kw for kw in keyword_strategies if kw in results]
+        all_datasets = [ds for kw in keyword_strategies for ds in results.get(kw) or []]
 
-            try:
-                # 每个关键词尝试获取5个结果
-                datasets = self._searcher.search_by_keyword(search_keyword, max_results=5)
-                if datasets:
-                    logger.info(f"✅ 关键词'{search_keyword}'找到{len(datasets)}个结果")
-                    all_datasets.extend(datasets)
-                    # 如果找到结果，继续尝试其他关键词以收集更多候选
-                else:
-                    logger.warning(f"⚠️ 关键词'{search_keyword}'无结果")
-            except Exception as e:
-                logger.warning(f"⚠️ 关键词'{search_keyword}'搜索出错：{e}")
-                continue
-        
-        # 4. 如果没有找到任何数据集，使用通用关键词
+        # 4. 如果没有找到任何数据集，使用通用关键词（同样并发，按列表顺序取第一个有结果的）
         if not all_datasets:
             logger.warning("⚠️ 所有策略均失败，尝试通用关键词")
             generic_keywords = ["data", "dataset", "csv", "finance", "stock", "market", "crypto"]
+            generic_results = self._search_concurrently(generic_keywords, 3, deadline)
             for gen_kw in generic_keywords:
-                try:
-                    datasets = self._searcher.search_by_keyword(gen_kw, max_results=3)
-                    if datasets:
-                        all_datasets.extend(datasets)
-                        logger.info(f"✅ 通用关键词'{gen_kw}'找到{len(datasets)}个结果")
-                        break
-                except Exception as e:
-                    continue
-        
+                if generic_results.get(gen_kw):
+                    all_datasets = generic_results[gen_kw]
+                    logger.info(f"✅ 通用关键词'{gen_kw}'找到{len(all_datasets)}个结果")
+                    break
+
         if not all_datasets:
-            raise RuntimeError(f"❌ 所有关键词策略均无检索结果。尝试的关键词：{tried_keywords}")
-        
+            raise RuntimeError(f"❌ 所有关键词策略均无检索结果。尝试的关键词：{keyword_strategies}")
+
         # 5. 去重数据集（基于ref）
         seen_refs = set()
         unique_datasets = []
@@ -198,40 +214,21 @@ class KaggleDatasetTool(BaseTool):
             if ds.ref not in seen_refs:
                 seen_refs.add(ds.ref)
                 unique_datasets.append(ds)
-        
+
         logger.info(f"📊 共找到{len(unique_datasets)}个唯一数据集")
-        
-        # 6. 选择最佳匹配（优先选择与关键词最相关的）
-        best_dataset = self._searcher.select_best_match(unique_datasets, keyword)
-        if not best_dataset:
-            # 如果选择失败，使用第一个
-            best_dataset = unique_datasets[0]
-        
-        logger.info(f"📥 选择数据集：{best_dataset.title} ({best_dataset.ref})")
-        
-        # 7. 下载该数据集
-        success, msg, output_path = self._downloader.download_dataset(
-            best_dataset.ref, download_path, self._config.auto_extract
-        )
-        
-        if not success:
-            # 如果第一个失败，尝试其他数据集
-            logger.warning(f"⚠️ 数据集{best_dataset.ref}下载失败，尝试其他数据集")
-            for dataset in unique_datasets[:5]:  # 最多尝试5个
-                if dataset.ref == best_dataset.ref:
-                    continue
-                logger.info(f"🔄 尝试下载：{dataset.ref}")
-                success, msg, output_path = self._downloader.download_dataset(
-                    dataset.ref, download_path, self._config.auto_extract
-                )
-                if success and self._check_csv_exists(output_path):
-                    best_dataset = dataset
-                    break
-        
+
+        # 6. 按与关键词的匹配度排序（得分相同保持检索顺序），最多尝试前5个
+        candidates = sorted(unique_datasets, key=lambda ds: self._searcher.score_dataset(ds, keyword),
+                            reverse=True)[:5]
+        logger.info(f"📥 选择数据集：{candidates[0].title} ({candidates[0].ref})")
+
+        # 7. 下载：第一个失败时依次尝试其他数据集（可选前两个并发竞速）
+        best_dataset, success, msg, output_path = self._download_first_valid(candidates, download_path)
+
         # 8. 检测CSV，成功则返回
-        if success and self._check_csv_exists(output_path):
-            csv_files = list(Path(output_path).rglob("*.csv"))
-            csv_file = csv_files[0] if csv_files else "未找到"
+        csv_files = self._csv_files(output_path) if success else []
+        if csv_files:
+            csv_file = csv_files[0]
             final_msg = f"""✅ 下载完成！
 - 原始关键词：{keyword}
 - 使用关键词：{tried_keywords}
@@ -247,6 +244,92 @@ class KaggleDatasetTool(BaseTool):
 - 数据集：{best_dataset.ref}
 - 原因：{msg}（未找到有效CSV）""")
 
+    def _search_concurrently(self, keywords: List[str], max_results: int, deadline: float,
+                             match_keyword: Optional[str] = None) -> Dict[str, List[DatasetInfo]]:
+        """
+        并发检索多个关键词
+
+        Args:
+            keywords: 关键词列表
+            max_results: 每个关键词的结果数
+            deadline: 截止时间（time.monotonic），到期后不再等待未返回的检索
+            match_keyword: 用于提前终止的原始关键词；任一结果得分达到 early_stop_score 即停止等待（None 表示等待全部）
+
+        Returns:
+            {关键词: 结果列表}，只包含截止前完成的检索（出错的关键词结果为空列表）
+        """
+        results = {}
+        if not keywords:
+            return results
+        executor = ThreadPoolExecutor(max_workers=min(self._config.search_workers, len(keywords)))
+        futures = {executor.submit(self._search, kw, max_results): kw for kw in keywords}
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+                search_keyword = futures[future]
+                try:
+                    datasets = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ 关键词'{search_keyword}'搜索出错：{e}")
+                    results[search_keyword] = []
+                    continue
+                results[search_keyword] = datasets
+                if not datasets:
+                    logger.warning(f"⚠️ 关键词'{search_keyword}'无结果")
+                    continue
+                logger.info(f"✅ 关键词'{search_keyword}'找到{len(datasets)}个结果")
+                if match_keyword is not None:
+                    best_score = max(self._searcher.score_dataset(ds, match_keyword) for ds in datasets)
+                    if best_score >= self._config.early_stop_score:
+                        logger.info(f"🎯 关键词'{search_keyword}'出现高置信度匹配（{best_score:.1f}分），停止等待其余检索")
+                        break
+        except FuturesTimeout:
+            pending = [kw for kw in keywords if kw not in results]
+            logger.warning(f"⏰ 数据集检索超时，未返回的关键词：{pending}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _download_first_valid(self, candidates: List[DatasetInfo], download_path: str):
+        """
+        按顺序下载候选数据集，返回第一个含有效CSV的结果
+
+        开启 download_race 时前两个候选并发下载（目录名不冲突时），取先完成且有效的一个；
+        落选的下载在后台完成后照常登记，之后可直接复用。
+
+        Returns:
+            (数据集, 是否成功, 消息, 输出目录)
+        """
+        remaining = list(candidates)
+        dataset, success, msg, output_path = remaining[0], False, "", " "
+        racers = remaining[:2]
+        if (self._config.download_race and len(racers) == 2
+                and racers[0].ref.split("/")[-1] != racers[1].ref.split("/")[-1]):
+            remaining = remaining[2:]
+            logger.info(f"🏁 并发下载：{[ds.ref for ds in racers]}")
+            executor = ThreadPoolExecutor(max_workers=2)
+            futures = {executor.submit(self._download, ds, download_path): ds for ds in racers}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        success, msg, output_path = future.result()
+                    except Exception as e:
+                        success, msg, output_path = False, f"下载失败: {e}", " "
+                    dataset = futures[future]
+                    if success and self._csv_files(output_path):
+                        return dataset, success, msg, output_path
+                    logger.warning(f"⚠️ 数据集{dataset.ref}下载失败或无有效CSV")
+            finally:
+                executor.shutdown(wait=False)
+
+        for dataset in remaining:
+            if dataset is not candidates[0]:
+                logger.info(f"🔄 尝试下载：{dataset.ref}")
+            success, msg, output_path = self._download(dataset, download_path)
+            if success and self._csv_files(output_path):
+                return dataset, success, msg, output_path
+            logger.warning(f"⚠️ 数据集{dataset.ref}下载失败，尝试其他数据集")
+        return dataset, success, msg, output_path
+
     async def _arun(self, **kwargs):
         import asyncio
         return await asyncio.get_event_loop().run_in_executor(None, lambda: self._run(** kwargs))
@@ -298,7 +381,7 @@ def create_kaggle_tool():
         state["download_status"] = result
 
         # 校验
-        if not dataset_tool._check_csv_exists(output_path):
+        if not dataset_tool._csv_files(output_path):
             raise RuntimeError("❌ 未找到有效CSV文件！")
         
         logger.info(f"✅ 数据集下载成功：{output_path}")
@@ -1,10 +1,14 @@
 import logging
+import threading
 from pathlib import Path
 from tqdm import tqdm
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling_core.types.doc import ImageRefMode, PictureItem, TableItem
+from tools.figure_export import FigureExporter
+from tools.page_render import PageRenderer
+from tools.pdf_triage import TIER_TEXT, TIER_FULL
 
 try:
     import fitz  # PyMuPDF
@@ -26,23 +30,62 @@ class SegmentTool:
         """
     
         使用 DocumentConverter 进行 PDF 转换，配置了图片和公式识别功能
+        各解析档位（见 tools/pdf_triage.py）的 DocumentConverter 按需构建并缓存
 
         参考: https://docling-project.github.io/docling/examples/export_figures/
 
         Args:
             enable_formula_enrichment: 是否启用公式识别（默认 False，因为非常慢）
         """
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.images_scale = IMAGE_RESOLUTION_SCALE
-        pipeline_options.generate_page_images = True                        # 生成页面图片
-        pipeline_options.generate_picture_images = True                     # 生成图片元素的图片
-        pipeline_options.do_formula_enrichment = enable_formula_enrichment  # 公式识别（启用会很慢）
+        self.enable_formula_enrichment = enable_formula_enrichment
+        self._converters = {}
+        self._converters_lock = threading.Lock()
+        self.figure_exporter = FigureExporter()
+    
+    @property
+    def converter(self) -> DocumentConverter:
+        """完整多模态流水线的转换器"""
+        return self.converter_for(TIER_FULL)
+    
+    def converter_for(self, tier: str) -> DocumentConverter:
+        """
+        获取某个解析档位的 DocumentConverter（text 档位不使用 docling）
         
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
+        Args:
+            tier: "layout"（不生成整页图片）或 "full"
+        """
+        if tier == TIER_TEXT:
+            raise ValueError("text 档位直接读取文本层，不使用 DocumentConverter")
+        with self._converters_lock:
+            converter = self._converters.get(tier)
+            if converter is None:
+                signature = self.pipeline_signature(self.enable_formula_enrichment, tier)
+                pipeline_options = PdfPipelineOptions()
+                pipeline_options.images_scale = signature["images_scale"]
+                pipeline_options.generate_page_images = signature["generate_page_images"]          # 生成页面图片
+                pipeline_options.generate_picture_images = signature["generate_picture_images"]    # 生成图片元素的图片
+                pipeline_options.do_formula_enrichment = signature["do_formula_enrichment"]        # 公式识别（启用会很慢）
+                
+                converter = DocumentConverter(
+                    format_options={
+                        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+                    }
+                )
+                self._converters[tier] = converter
+            return converter
+        
+    @staticmethod
+    def pipeline_signature(enable_formula_enrichment: bool = False, tier: str = TIER_FULL) -> dict:
+        """影响解析结果的流水线配置（记录在解析清单中，用于缓存校验）"""
+        if tier == TIER_TEXT:
+            return {"tier": TIER_TEXT}
+        return {
+            "tier": tier,
+            "images_scale": IMAGE_RESOLUTION_SCALE,
+            "generate_page_images": tier == TIER_FULL,
+            "generate_picture_images": True,
+            "do_formula_enrichment": enable_formula_enrichment,
+        }
         
     def convert_pdf_to_md(self, pdf_path: str, md_path:str):
         """
@@ -80,16 +123,12 @@ class SegmentTool:
                 conv_res = self.converter.convert(str(pdf_file))
                 
                 # export figures
-                self._export_figures(conv_res, figs_dir, file_stem)
+                figure_paths = self._export_figures(conv_res, figs_dir, file_stem)
                 
                 # 步骤4: 将文档导出为 Markdown
-                # 使用 REFERENCED 模式，图片会引用到相对路径 figs/ 目录
+                # 图片引用指向 figs/ 目录下已导出的文件
                 md_file = output_dir / f"{file_stem}.md"
-                conv_res.document.save_as_markdown(
-                    str(md_file), 
-                    image_mode=ImageRefMode.REFERENCED,
-                    artifacts_dir=figs_dir
-                )
+                self.export_markdown(conv_res, md_file, figure_paths)
                 
                 logging.info(f"✓ 完成: {md_file}")
                 
@@ -100,100 +139,37 @@ class SegmentTool:
                 continue
     
     def _export_figures(self, conv_res, figs_dir: Path, file_stem: str):
-        
-       # Save images of figures and tables
-        picture_counter = 0
-        table_counter = 0
-        
-        for element, _level in conv_res.document.iterate_items():
-            # 处理PictureItem
-            if isinstance(element, PictureItem):
-                picture_counter += 1
-                element_image_filename = figs_dir / f"{file_stem}_picture_{picture_counter}.png"
-                
-                try:
-                    img = element.get_image(conv_res.document)
-                    with element_image_filename.open("wb") as fp:
-                        img.save(fp, "PNG")
-                    logging.debug(f"  保存图片: {element_image_filename.name}")
-                except Exception as e:
-                    logging.warning(f"  提取图片失败 (picture {picture_counter}): {e}")
-            
-            # 处理TableItem
-            # elif isinstance(element, TableItem):
-            #     table_counter += 1
-            #     element_image_filename = figs_dir / f"{file_stem}_table_{table_counter}.png"
-                
-            #     try:
-            #         img = element.get_image(conv_res.document)
-            #         with element_image_filename.open("wb") as fp:
-            #             img.save(fp, "PNG")
-            #         logging.debug(f"  保存表格图片: {element_image_filename.name}")
-            #     except Exception as e:
-            #         logging.warning(f"  提取表格图片失败 (table {table_counter}): {e}")
-        
-        if picture_counter > 0:
-            logging.info(f"  共提取 {picture_counter} 张图片到 {figs_dir}")
+        """导出图片（并行编码、去重、缩略图），返回与每个 PictureItem 对应的图片路径"""
+        return self.figure_exporter.export(conv_res, figs_dir, file_stem)
+    
+    def export_markdown(self, conv_res, md_file: Path, figure_paths):
+        """导出 markdown，图片链接指向 _export_figures 已导出的文件"""
+        self.figure_exporter.write_markdown(conv_res, md_file, figure_paths)
     
-    def convert_pdf_pages_to_images(self, pdf_path: str, output_dir: str, dpi: int = 200):
+    def convert_pdf_pages_to_images(self, pdf_path: str, output_dir: str, dpi: int = 200,
+                                    pages=None, preview: bool = False, image_format: str = None):
         """
-        将PDF的每一页转换为图片并保存
+        将PDF的每一页转换为图片并保存（多进程并行渲染，已渲染的页会跳过）
         
         Args:
             pdf_path: PDF文件路径
             output_dir: 输出目录路径，图片将保存在该目录下的pages子目录中
             dpi: 图片分辨率，默认200（越高越清晰但文件越大）
+            pages: 只渲染这些页（1-based），None 表示全部
+            preview: 只渲染低分辨率预览（保存在 pages/preview/，几乎立即可用）
+            image_format: png / jpeg（默认 PAGE_IMAGE_FORMAT 或 png）
         
         Returns:
-            List[str]: 保存的图片文件路径列表
+            List[str]: 保存的图片文件路径列表（按页码排序）
         """
         if not PYMUPDF_AVAILABLE:
             raise ImportError("PyMuPDF未安装，无法使用PDF页面转图片功能。请运行: pip install PyMuPDF")
         
-        pdf_file = Path(pdf_path)
-        if not pdf_file.exists():
-            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
-        
-        # 创建输出目录
-        output_path = Path(output_dir)
-        pages_dir = output_path / "pages"
-        pages_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_stem = pdf_file.stem
-        saved_images = []
-        
         try:
-            # 打开PDF文件
-            doc = fitz.open(str(pdf_file))
-            total_pages = len(doc)
-            
-            logging.info(f"开始转换PDF页面为图片: {pdf_file.name} (共{total_pages}页)")
-            
-            # 计算缩放因子（dpi转换为缩放因子，72是PDF的标准DPI）
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            
-            # 遍历每一页
-            for page_num in tqdm(range(total_pages), desc="转换页面"):
-                page = doc[page_num]
-                
-                # 渲染页面为图片
-                pix = page.get_pixmap(matrix=mat)
-                
-                # 保存图片
-                image_filename = pages_dir / f"{file_stem}_page_{page_num + 1:03d}.png"
-                pix.save(str(image_filename))
-                saved_images.append(str(image_filename))
-                
-                logging.debug(f"  保存页面 {page_num + 1}: {image_filename.name}")
-            
-            doc.close()
-            logging.info(f"✓ 完成: 共转换{total_pages}页，图片保存在 {pages_dir}")
-            
+            renderer = PageRenderer(image_format=image_format)
+            return renderer.render_all(pdf_path, output_dir, dpi=dpi, pages=pages, preview=preview)
         except Exception as e:
             logging.error(f"转换PDF页面为图片时出错: {e}")
             import traceback
             logging.error(traceback.format_exc())
             raise
-        
-        return saved_images
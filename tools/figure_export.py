@@ -0,0 +1,202 @@
+"""
+文档图片导出
+
+- 图片在线程池中编码（Pillow 编码时释放 GIL），支持 PNG / WebP / JPEG 及目标质量
+- 跳过完全相同的重复图片；小图（logo、重复图标等）另按感知哈希（dHash）合并相近的，重复项引用首次导出的文件。
+  大图不做近似合并：同一坐标轴与版式的子图（如 3a / 3b）dHash 几乎相同，合并会让 markdown 链到错误的图
+- 为多模态 LLM 生成小尺寸缩略图（figs/thumbs/），原图保留全分辨率
+- markdown 以占位符导出后替换为已导出图片的链接，不再由 save_as_markdown 重复写一遍图片
+"""
+import os
+import re
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from loguru import logger
+from docling_core.types.doc import ImageRefMode, PictureItem
+
+IMAGE_PLACEHOLDER = "<!-- image -->"
+THUMBS_DIR = "thumbs"
+
+# 扩展名 -> Pillow 格式名
+_PIL_FORMATS = {"png": "PNG", "webp": "WEBP", "jpg": "JPEG", "jpeg": "JPEG"}
+IMAGE_SUFFIXES = tuple(f".{ext}" for ext in _PIL_FORMATS)
+
+
+def _dhash(img, hash_size: int = 8) -> int:
+    """差值哈希：缩放为 (hash_size+1) x hash_size 灰度图，比较相邻像素"""
+    small = img.convert("L").resize((hash_size + 1, hash_size))
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def _natural_key(path: Path):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path.name)]
+
+
+def list_figures(figs_dir: Path) -> List[Path]:
+    """列出目录下的图片文件（不含子目录中的缩略图/预览），按编号自然排序"""
+    if not figs_dir.exists():
+        return []
+    return sorted((p for p in figs_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES), key=_natural_key)
+
+
+def thumbnail_for(figure: Path) -> Optional[Path]:
+    """原图对应的缩略图（不存在时返回 None）"""
+    thumbs_dir = figure.parent / THUMBS_DIR
+    for suffix in IMAGE_SUFFIXES:
+        candidate = thumbs_dir / f"{figure.stem}{suffix}"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+class FigureExporter:
+    def __init__(self, image_format: str = None, quality: int = None, thumb_format: str = None,
+                 thumb_size: int = None, max_workers: int = None, dedup_threshold: int = None,
+                 dedup_max_side: int = None):
+        """
+        Args:
+            image_format: 原图格式 png / webp / jpeg（默认 FIGURE_FORMAT 或 webp）
+            quality: 有损格式的目标质量（默认 FIGURE_QUALITY 或 85）
+            thumb_format: 缩略图格式（默认 FIGURE_THUMB_FORMAT 或 jpeg，兼容各多模态接口）
+            thumb_size: 缩略图最长边像素（默认 FIGURE_THUMB_SIZE 或 512，0 表示不生成）
+            max_workers: 编码线程数（默认 FIGURE_EXPORT_WORKERS 或 min(4, CPU 数)）
+            dedup_threshold: dHash 汉明距离阈值，不超过即视为重复（默认 FIGURE_DEDUP_THRESHOLD 或 2，-1 关闭）
+            dedup_max_side: 只对最长边不超过该像素数的小图做 dHash 近似去重（默认 FIGURE_DEDUP_MAX_SIDE 或 160）
+        """
+        self.image_format = (image_format or os.environ.get("FIGURE_FORMAT", "webp")).lower()
+        self.thumb_format = (thumb_format or os.environ.get("FIGURE_THUMB_FORMAT", "jpeg")).lower()
+        for fmt in (self.image_format, self.thumb_format):
+            if fmt not in _PIL_FORMATS:
+                raise ValueError(f"不支持的图片格式: {fmt}")
+        self.quality = quality or int(os.environ.get("FIGURE_QUALITY", 85))
+        self.thumb_size = thumb_size if thumb_size is not None else int(os.environ.get("FIGURE_THUMB_SIZE", 512))
+        self.max_workers = max_workers or int(os.environ.get("FIGURE_EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.dedup_threshold = dedup_threshold if dedup_threshold is not None else \
+            int(os.environ.get("FIGURE_DEDUP_THRESHOLD", 2))
+        self.dedup_max_side = dedup_max_side if dedup_max_side is not None else \
+            int(os.environ.get("FIGURE_DEDUP_MAX_SIDE", 160))
+
+    def _save(self, img, path: Path, fmt: str):
+        pil_format = _PIL_FORMATS[fmt]
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        if pil_format == "PNG":
+            img.save(path, pil_format, optimize=False)
+        else:
+            img.save(path, pil_format, quality=self.quality)
+
+    def _encode(self, img, path: Path, thumb_path: Optional[Path]):
+        self._save(img, path, self.image_format)
+        if thumb_path is not None:
+            thumb = img.copy()
+            thumb.thumbnail((self.thumb_size, self.thumb_size))
+            self._save(thumb, thumb_path, self.thumb_format)
+
+    def _find_duplicate(self, img, digest: str, exact: dict, perceptual: list):
+        """
+        Returns:
+            (重复的已导出图片路径或 None, 本图的感知哈希记录)
+        """
+        if digest in exact:
+            return exact[digest], None
+        if self.dedup_threshold < 0 or max(img.size) > self.dedup_max_side:
+            return None, None
+        value = _dhash(img)
+        aspect = img.width / max(img.height, 1)
+        for other_value, other_aspect, other_path in perceptual:
+            # 只比较宽高比接近的图片，避免不同图表因版式相似被误判
+            if abs(aspect - other_aspect) <= 0.05 * other_aspect and \
+                    bin(value ^ other_value).count("1") <= self.dedup_threshold:
+                return other_path, None
+        return None, (value, aspect)
+
+    def export(self, conv_res, figs_dir: Path, file_stem: str) -> List[Optional[Path]]:
+        """
+        导出文档中的所有 PictureItem
+
+        Args:
+            conv_res: docling 转换结果
+            figs_dir: 图片输出目录
+            file_stem: 文件名前缀
+
+        Returns:
+            按文档顺序与每个 PictureItem 一一对应的图片路径；重复图片指向首次导出的文件，
+            提取失败的为 None
+        """
+        figs_dir = Path(figs_dir)
+        figs_dir.mkdir(parents=True, exist_ok=True)
+        thumbs_dir = figs_dir / THUMBS_DIR
+        if self.thumb_size > 0:
+            thumbs_dir.mkdir(parents=True, exist_ok=True)
+
+        paths = []
+        exact, perceptual = {}, []
+        picture_counter = 0
+        duplicate_count = 0
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for element, _level in conv_res.document.iterate_items():
+                if not isinstance(element, PictureItem):
+                    continue
+                try:
+                    img = element.get_image(conv_res.document)
+                except Exception as e:
+                    logger.warning(f"  提取图片失败: {e}")
+                    img = None
+                if img is None:
+                    paths.append(None)
+                    continue
+
+                digest = hashlib.sha1(img.tobytes()).hexdigest() + f"{img.size}"
+                duplicate, signature = self._find_duplicate(img, digest, exact, perceptual)
+                if duplicate is not None:
+                    duplicate_count += 1
+                    paths.append(duplicate)
+                    continue
+
+                picture_counter += 1
+                path = figs_dir / f"{file_stem}_picture_{picture_counter}.{self.image_format}"
+                exact[digest] = path
+                if signature is not None:
+                    perceptual.append((*signature, path))
+                paths.append(path)
+                thumb_path = thumbs_dir / f"{path.stem}.{self.thumb_format}" if self.thumb_size > 0 else None
+                futures.append((path, executor.submit(self._encode, img, path, thumb_path)))
+
+            for path, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"  保存图片失败 ({path.name}): {e}")
+                    paths = [None if p == path else p for p in paths]
+
+        if picture_counter > 0:
+            logger.info(f"  共导出 {picture_counter} 张图片到 {figs_dir}（跳过重复 {duplicate_count} 张）")
+        return paths
+
+    @staticmethod
+    def write_markdown(conv_res, md_file: Path, figure_paths: List[Optional[Path]]):
+        """以占位符导出 markdown，并按顺序替换为已导出图片的相对链接"""
+        md_file = Path(md_file)
+        markdown = conv_res.document.export_to_markdown(
+            image_mode=ImageRefMode.PLACEHOLDER,
+            image_placeholder=IMAGE_PLACEHOLDER
+        )
+        parts = markdown.split(IMAGE_PLACEHOLDER)
+        pieces = [parts[0]]
+        for idx, part in enumerate(parts[1:]):
+            path = figure_paths[idx] if idx < len(figure_paths) else None
+            if path is not None:
+                pieces.append(f"![Image]({os.path.relpath(path, md_file.parent)})")
+            pieces.append(part)
+        md_file.write_text("".join(pieces), encoding="utf-8")
@@ -0,0 +1,230 @@
+"""
+方法论提取用的图片排序与选择
+
+按目录顺序取前几张图常常选中 logo、小图标或附录里的图。这里对每张图打分：
+- 标题与附近正文中方法相关关键词的命中（架构图、流程图等）
+- 图片是否位于方法章节，或在方法章节中被引用（"Figure 3" / "Fig. 3"）
+- 图片尺寸与灰度熵（过小、信息量低的图多为图标/装饰）
+- 位于参考文献/附录之后的图降权
+然后在张数（top-k）与像素预算内选出得分最高的图
+"""
+import os
+import re
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from tools.parse_manifest import index_sections
+from tools.pdf_sections import HEADING_PATTERN, canonical_section
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# 方法相关关键词 -> 权重
+METHOD_KEYWORDS = {
+    "architecture": 3.0, "overview": 2.5, "framework": 2.5, "pipeline": 2.5, "proposed": 2.0,
+    "model": 1.5, "module": 1.5, "method": 1.5, "approach": 1.5, "algorithm": 1.5, "workflow": 2.0,
+    "encoder": 1.5, "decoder": 1.5, "attention": 1.0, "network": 1.0, "block": 1.0, "layer": 1.0,
+    "training": 1.0, "loss": 1.0, "objective": 1.0, "inference": 1.0, "flowchart": 2.0, "diagram": 1.5,
+    "illustration": 1.5, "schematic": 2.0, "structure": 1.0, "design": 1.0, "setup": 1.0,
+}
+# 多为结果展示/示例的关键词，轻微降权
+RESULT_KEYWORDS = {"qualitative": 1.0, "visualization": 0.5, "examples": 0.5, "failure": 0.5, "samples": 0.5}
+
+_IMAGE_LINK = re.compile(rb"!\[[^\]]*\]\(([^)\s]+)\)")
+# 标题行以 Figure N / Fig. N 开头（正文中的 "shown in Figure 2" 不算）
+_CAPTION = re.compile(r"^\s*(?:Figure|Fig\.)\s*(\d+)\s*[:.|]?\s*([^\n]{0,300})", re.IGNORECASE | re.MULTILINE)
+_WORD = re.compile(r"[a-z]+")
+
+# 附近正文窗口（字节）
+CONTEXT_WINDOW = 800
+# 任一边小于该像素数的图视为图标
+MIN_SIDE = 96
+
+
+def _keyword_score(text: str) -> float:
+    words = _WORD.findall(text.lower())
+    score = sum(METHOD_KEYWORDS.get(w, 0.0) for w in set(words))
+    score -= sum(RESULT_KEYWORDS.get(w, 0.0) for w in set(words))
+    return score
+
+
+def _image_size(path: Path) -> Optional[tuple]:
+    """只读文件头取宽高；无法读取时返回 None"""
+    if not PIL_AVAILABLE or not path.exists():
+        return None
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception as e:
+        logger.debug(f"读取图片失败 {path}: {e}")
+        return None
+
+
+def _image_stats(path: Path) -> Optional[Dict[str, float]]:
+    """宽、高与灰度直方图熵（bits）；无法读取时返回 None"""
+    if not PIL_AVAILABLE or not path.exists():
+        return None
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            gray = img.convert("L")
+            gray.thumbnail((128, 128))
+            histogram = gray.histogram()
+    except Exception as e:
+        logger.debug(f"读取图片失败 {path}: {e}")
+        return None
+    total = sum(histogram) or 1
+    entropy = -sum((n / total) * math.log2(n / total) for n in histogram if n)
+    return {"width": width, "height": height, "entropy": entropy}
+
+
+def _section_kinds(markdown: bytes) -> List[Dict[str, Any]]:
+    """章节字节区间 + 规范化章节名（method / references / appendix ...，无法识别的为 None）"""
+    sections = index_sections(markdown)
+    current = None
+    for section in sections:
+        match = HEADING_PATTERN.match(section["title"])
+        kind = canonical_section(match.group(1) if match else section["title"])
+        # 方法章节下未识别的小节沿用上一级章节
+        if kind is None and section["level"] > 2 and current is not None:
+            kind = current
+        elif kind is not None or section["level"] <= 2:
+            current = kind
+        section["kind"] = kind
+    return sections
+
+
+def _kind_at(sections: List[Dict[str, Any]], offset: int) -> Optional[str]:
+    for section in sections:
+        if section["start"] <= offset < section["end"]:
+            return section["kind"]
+    return None
+
+
+class FigureRanker:
+    def __init__(self, top_k: int = None, pixel_budget: int = None):
+        """
+        Args:
+            top_k: 最多选择的图片数（默认 FIGURE_TOP_K 或 6）
+            pixel_budget: 上传图片的总像素预算（默认 FIGURE_PIXEL_BUDGET 或 6 * 512 * 512；
+                多模态模型的图片 token 数大致与像素数成正比）
+        """
+        self.top_k = top_k or int(os.environ.get("FIGURE_TOP_K", 6))
+        self.pixel_budget = pixel_budget or int(os.environ.get("FIGURE_PIXEL_BUDGET", 6 * 512 * 512))
+
+    def score(self, markdown: str, figures: List[str], upload_paths: List[Path],
+              figure_paths: List[Path] = None) -> List[Dict[str, Any]]:
+        """
+        为每张图打分
+
+        Args:
+            markdown: 论文 markdown 全文（图片以 ![Image](相对路径) 链接）
+            figures: 图片路径（与解析结果中的 figures 一致）
+            upload_paths: 实际上传的文件（缩略图或原图），与 figures 一一对应
+            figure_paths: 原图文件，与 figures 一一对应，尺寸与熵按原图计算（默认 figures 本身）；
+                缩略图会把宽而矮的流程图缩到图标尺寸，不能用来打分
+
+        Returns:
+            [{"index", "figure", "upload_path", "score", "caption", "pixels": 原图像素数,
+              "upload_pixels": 上传文件像素数}]，顺序与 figures 一致
+        """
+        if figure_paths is None:
+            figure_paths = [Path(figure) for figure in figures]
+        data = markdown.encode("utf-8")
+        sections = _section_kinds(data)
+        # 图片名 -> (链接起点, 链接终点, 上一个链接终点, 下一个链接起点)；附近正文不跨越相邻的图片
+        matches = list(_IMAGE_LINK.finditer(data))
+        links = {}
+        for i, match in enumerate(matches):
+            name = os.path.basename(match.group(1).decode("utf-8", errors="replace"))
+            prev_end = matches[i - 1].end() if i > 0 else 0
+            next_start = matches[i + 1].start() if i + 1 < len(matches) else len(data)
+            links.setdefault(name, (match.start(), match.end(), prev_end, next_start))
+        method_text = " ".join(
+            data[s["start"]:s["end"]].decode("utf-8", errors="replace") for s in sections if s["kind"] == "method"
+        )
+
+        scored = []
+        for idx, (figure, figure_path, upload_path) in enumerate(zip(figures, figure_paths, upload_paths)):
+            score, caption, figure_number = 0.0, "", None
+            link = links.get(os.path.basename(figure))
+            if link is not None:
+                offset, link_end, prev_end, next_start = link
+                after = data[link_end:min(next_start, link_end + CONTEXT_WINDOW)].decode("utf-8", errors="replace")
+                before = data[max(prev_end, offset - CONTEXT_WINDOW):offset].decode("utf-8", errors="replace")
+                # docling 通常把标题放在图片之后，也可能紧挨在图片之前（只看前一行）
+                caption_match = _CAPTION.search(after) or _CAPTION.match(before.rstrip().rsplit("\n", 1)[-1])
+                if caption_match:
+                    figure_number, caption = caption_match.group(1), caption_match.group(0).strip()
+                    score += 2.0 * _keyword_score(caption)
+                score += 0.5 * _keyword_score(before + after)
+                kind = _kind_at(sections, offset)
+                if kind == "method":
+                    score += 4.0
+                elif kind in ("references", "appendix"):
+                    score -= 6.0
+            else:
+                # 正文中没有引用的图（通常是被去重或提取失败的残留）
+                score -= 2.0
+            if figure_number and re.search(rf"(?:Figure|Fig\.)\s*{figure_number}\b", method_text, re.IGNORECASE):
+                score += 3.0
+
+            stats = _image_stats(Path(figure_path))
+            pixels = 0
+            if stats:
+                pixels = stats["width"] * stats["height"]
+                if min(stats["width"], stats["height"]) < MIN_SIDE:
+                    score -= 8.0
+                # 熵低的多为纯色/图标；过高的多为照片类结果图
+                if stats["entropy"] < 2.5:
+                    score -= 4.0
+                elif stats["entropy"] > 7.0:
+                    score -= 1.0
+                # 大图信息量通常更多，对数加成
+                score += 0.5 * math.log2(max(pixels, 1) / (256 * 256)) if pixels > 256 * 256 else 0.0
+            # 像素预算按实际上传的文件计（多模态模型按收到的图片计 token）
+            upload_pixels = pixels
+            if Path(upload_path) != Path(figure_path):
+                size = _image_size(Path(upload_path))
+                upload_pixels = size[0] * size[1] if size else pixels
+            scored.append({
+                "index": idx, "figure": figure, "upload_path": upload_path, "score": score,
+                "caption": caption, "pixels": pixels, "upload_pixels": upload_pixels,
+            })
+        return scored
+
+    def select(self, markdown: str, figures: List[str], upload_paths: List[Path],
+               figure_paths: List[Path] = None) -> List[Dict[str, Any]]:
+        """
+        在 top-k 与像素预算内选出得分最高的图（参数见 score）
+
+        Returns:
+            选中的图（按文档顺序），字段同 score
+        """
+        # 同一文件（去重后多处引用）只上传一次
+        seen, candidates = set(), []
+        for entry in self.score(markdown, figures, upload_paths, figure_paths):
+            if entry["upload_path"] in seen or not Path(entry["upload_path"]).exists():
+                continue
+            seen.add(entry["upload_path"])
+            candidates.append(entry)
+
+        selected, budget = [], self.pixel_budget
+        for entry in sorted(candidates, key=lambda e: e["score"], reverse=True):
+            if len(selected) >= self.top_k:
+                break
+            if entry["upload_pixels"] > budget and selected:
+                continue
+            selected.append(entry)
+            budget -= entry["upload_pixels"]
+        selected.sort(key=lambda e: e["index"])
+        if figures:
+            logger.info(f"🖼️ 从 {len(figures)} 张图中选出 {len(selected)} 张: "
+                        f"{[Path(e['figure']).name for e in selected]}")
+        return selected
@@ -0,0 +1,174 @@
+"""
+Best-of-N 并行想法生成
+
+原先每轮只生成一个想法，被否决后再串行地重新生成。这里在一轮内并发生成 N 个候选
+（每个候选使用不同的 temperature / seed），用本地规则快速打分后选出最好的一个：
+- 新颖性：与本地摘要索引的最高相似度（tools/novelty），越低越好
+- 可行性：JSON 字段是否齐全、方法描述是否具体（长度适中、包含可执行的技术要素）
+- 数据可得性：是否指向公开数据集 / 常见数据源，或给出了明确的数据模态
+候选一旦达到提前终止阈值即返回，不再等待其余请求。
+"""
+import os
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from tools.novelty import get_novelty_checker
+from utils.rate_limit import get_provider_limiter
+
+IDEA_FIELDS = ("topic", "new_idea", "motivation", "methods_description")
+# 各项得分的权重
+SCORE_WEIGHTS = {"novelty": 0.5, "feasibility": 0.3, "dataset": 0.2}
+
+_JSON_BLOCK = re.compile(r"\{.*\}", re.DOTALL)
+_METHOD_TERMS = re.compile(
+    r"\b(?:loss|objective|encoder|decoder|module|layer|architecture|training|fine-tun\w*|regulari\w*|"
+    r"baseline|ablation|metric|evaluate|benchmark|optimi[sz]\w*|algorithm|pipeline|input|output)\b",
+    re.IGNORECASE
+)
+_DATASET_TERMS = re.compile(
+    r"\b(?:kaggle|uci|hugging ?face|imagenet|cifar|mnist|coco|glue|squad|mimic|openml|"
+    r"public(?:ly available)? (?:data(?:set)?s?|benchmarks?)|open[- ]source data(?:set)?s?|benchmark data(?:set)?s?)\b",
+    re.IGNORECASE
+)
+_DATA_MODALITY = re.compile(
+    r"\b(?:tabular|time[- ]series|csv|images?|text corpus|sensor|transactions?|records|survey|"
+    r"clinical|traffic|weather|stock|sales)\b",
+    re.IGNORECASE
+)
+
+
+def _response_text(response) -> str:
+    content = response.content if hasattr(response, "content") else response
+    text = content if isinstance(content, str) else str(content)
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE).strip()
+
+
+def parse_idea(text: str) -> Optional[Dict[str, str]]:
+    """解析想法 JSON（容忍前后的代码块标记等多余内容）；失败时返回 None"""
+    for candidate in (text, *(_JSON_BLOCK.findall(text)[:1])):
+        try:
+            parsed = json.loads(candidate)
+        except (ValueError, TypeError):
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+class IdeaSelector:
+    def __init__(self, llm, n: int = None, temperatures: List[float] = None, early_stop_score: float = None,
+                 max_workers: int = None, provider: str = None):
+        """
+        Args:
+            llm: 想法生成模型
+            n: 每轮候选数（默认 IDEA_BEST_OF_N 或 3）
+            temperatures: 各候选的 temperature（默认 IDEA_TEMPERATURES，或在 0.6 ~ 1.2 之间均匀分布）
+            early_stop_score: 候选总分不低于该值时立即返回（默认 IDEA_EARLY_STOP_SCORE，未设置时等待全部候选）
+            max_workers: 并发请求数（默认等于 n）
+            provider: 模型提供商，用于共享限流（默认 IDEA_PROVIDER 或 deepseek）
+        """
+        self.llm = llm
+        self.n = max(1, n or int(os.environ.get("IDEA_BEST_OF_N", 3)))
+        if temperatures is None and os.environ.get("IDEA_TEMPERATURES"):
+            temperatures = [float(t) for t in os.environ["IDEA_TEMPERATURES"].split(",")]
+        if not temperatures:
+            temperatures = [round(0.6 + 0.6 * i / max(self.n - 1, 1), 2) for i in range(self.n)]
+        self.temperatures = temperatures
+        if early_stop_score is None and os.environ.get("IDEA_EARLY_STOP_SCORE"):
+            early_stop_score = float(os.environ["IDEA_EARLY_STOP_SCORE"])
+        self.early_stop_score = early_stop_score
+        self.max_workers = max_workers or self.n
+        self.provider = provider or os.environ.get("IDEA_PROVIDER", "deepseek")
+
+    def _generate(self, messages: list, index: int):
+        temperature = self.temperatures[index % len(self.temperatures)]
+        llm = self.llm.bind(temperature=temperature, seed=index)
+        return get_provider_limiter(self.provider).call(llm.invoke, messages)
+
+    @staticmethod
+    def _feasibility(idea: Optional[Dict[str, str]], text: str) -> float:
+        if idea is None:
+            return 0.0
+        completeness = sum(bool(str(idea.get(field, "")).strip()) for field in IDEA_FIELDS) / len(IDEA_FIELDS)
+        methods = str(idea.get("methods_description", ""))
+        # 过短的方法描述不可执行，过长的往往堆砌了过多组件
+        length = min(len(methods) / 400, 1.0) if len(methods) < 3000 else max(0.4, 3000 / len(methods))
+        concreteness = min(len(set(m.lower() for m in _METHOD_TERMS.findall(methods))) / 5, 1.0)
+        return 0.4 * completeness + 0.3 * length + 0.3 * concreteness
+
+    @staticmethod
+    def _dataset(text: str) -> float:
+        if _DATASET_TERMS.search(text):
+            return 1.0
+        return 0.5 if _DATA_MODALITY.search(text) else 0.0
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """
+        为一个候选打分
+
+        Returns:
+            {"idea": 解析后的字段（失败为 None）, "novelty", "feasibility", "dataset", "total", "similar"}
+        """
+        idea = parse_idea(text)
+        idea_text = text
+        if idea is not None:
+            idea_text = "\n".join(str(idea.get(field, "")) for field in ("new_idea", "methods_description"))
+
+        novelty, similar = 0.5, []
+        checker = get_novelty_checker()
+        if checker is not None:
+            result = checker.check(idea_text)
+            if result["score"] is not None:
+                novelty, similar = 1.0 - max(result["score"], 0.0), result["similar"]
+
+        scores = {
+            "novelty": novelty,
+            "feasibility": self._feasibility(idea, text),
+            "dataset": self._dataset(text),
+        }
+        total = sum(SCORE_WEIGHTS[key] * value for key, value in scores.items())
+        return {"idea": idea, **scores, "total": total, "similar": similar}
+
+    def invoke(self, messages: list):
+        """
+        并发生成 N 个候选并返回得分最高者的原始响应（接口与 llm.invoke 一致）
+
+        Args:
+            messages: 发送给模型的消息
+
+        Returns:
+            得分最高的候选响应
+        """
+        best, best_score, candidates = None, None, 0
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, self.n))
+        try:
+            futures = {executor.submit(self._generate, messages, i): i for i in range(self.n)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logger.warning(f"候选想法 {index} 生成失败: {e}")
+                    continue
+                candidates += 1
+                scored = self.score(_response_text(response))
+                logger.info(f"💡 候选想法 {index}（temperature={self.temperatures[index % len(self.temperatures)]}）"
+                            f"得分 {scored['total']:.3f}: 新颖性 {scored['novelty']:.2f}，"
+                            f"可行性 {scored['feasibility']:.2f}，数据 {scored['dataset']:.2f}")
+                if best_score is None or scored["total"] > best_score["total"]:
+                    best, best_score = response, scored
+                if self.early_stop_score is not None and scored["total"] >= self.early_stop_score:
+                    logger.info(f"候选想法 {index} 达到提前终止阈值 {self.early_stop_score}")
+                    break
+        finally:
+            # 提前终止时不等待仍在进行的请求
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if best is None:
+            raise RuntimeError(f"{self.n} 个候选想法全部生成失败")
+        logger.info(f"✅ 从 {candidates} 个候选中选出想法，得分 {best_score['total']:.3f}")
+        return best
@@ -0,0 +1,146 @@
+"""
+按论文流式处理的文献解析流水线
+
+原先的子图按阶段整体推进：全部 PDF 解析完才开始总结，总结完才逐篇提取方法论。
+这里每篇论文独立地流过 解析 -> 方法论提取，阶段之间用有界队列衔接；
+总结阶段在论文就绪时逐篇接收，最后一篇到达后立即生成报告。
+CPU 密集的解析与网络密集的 LLM 调用因此可以重叠进行。
+
+    parse (进程池) --parsed_queue--> methodology workers (线程) --> results
+                   \\--summary_queue--> summary consumer
+"""
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from tools.pdf_parser import PDFParser
+
+# 队列结束标记
+_DONE = object()
+
+
+class LiteraturePipeline:
+    def __init__(self, pdf_parser: PDFParser,
+                 methodology_fn: Callable[[Dict[str, Any]], Any],
+                 summary_fn: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+                 summary_prepare_fn: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 parse_workers: int = 4, llm_workers: int = None, queue_size: int = None):
+        """
+        Args:
+            pdf_parser: PDF解析器
+            methodology_fn: 单篇论文的方法论提取（参数为解析结果），在工作线程中调用
+            summary_fn: 总结（参数为全部成功解析的结果），在所有论文就绪后调用一次
+            summary_prepare_fn: 单篇论文到达总结阶段时立即调用（如生成并缓存单篇笔记），失败只记录日志
+            parse_workers: 解析并行数
+            llm_workers: 方法论提取并行数（默认 LITERATURE_LLM_WORKERS 或 2）
+            queue_size: 阶段间队列容量（默认 LITERATURE_QUEUE_SIZE 或 4）
+        """
+        self.pdf_parser = pdf_parser
+        self.methodology_fn = methodology_fn
+        self.summary_fn = summary_fn
+        self.summary_prepare_fn = summary_prepare_fn
+        self.parse_workers = parse_workers
+        self.llm_workers = llm_workers or int(os.environ.get("LITERATURE_LLM_WORKERS", 2))
+        self.queue_size = queue_size or int(os.environ.get("LITERATURE_QUEUE_SIZE", 4))
+
+    def run(self, pdf_files: List[str], use_cache: bool = True) -> Dict[str, Any]:
+        """
+        运行流水线
+
+        Args:
+            pdf_files: PDF文件路径列表
+            use_cache: 是否使用解析缓存
+
+        Returns:
+            {"parsed": 解析结果列表, "methodologies": {pdf文件名: 提取结果}, "summary": 总结结果, "errors": [...]}
+        """
+        parsed_queue = queue.Queue(maxsize=self.queue_size)
+        # 总结阶段只收集结果（条目只含 markdown 句柄，很小），不限容量，避免逐篇预处理拖住解析
+        summary_queue = queue.Queue()
+        parsed, methodologies, errors = [], {}, []
+        summary_result = {}
+        lock = threading.Lock()
+
+        def parse_stage():
+            try:
+                for result in self.pdf_parser.iter_parse(pdf_files, max_workers=self.parse_workers,
+                                                         use_cache=use_cache):
+                    with lock:
+                        parsed.append(result)
+                    if result.get("status") != "success":
+                        with lock:
+                            errors.append(result.get("error", f"解析失败: {result.get('pdf_path')}"))
+                        continue
+                    # 有界队列：下游处理不过来时在这里等待
+                    parsed_queue.put(result)
+                    if self.summary_fn is not None:
+                        summary_queue.put(result)
+            except Exception as e:
+                logger.error(f"❌ 解析阶段失败: {e}")
+                with lock:
+                    errors.append(f"解析阶段失败: {e}")
+            finally:
+                for _ in range(self.llm_workers):
+                    parsed_queue.put(_DONE)
+                if self.summary_fn is not None:
+                    summary_queue.put(_DONE)
+
+        def methodology_stage():
+            while True:
+                result = parsed_queue.get()
+                if result is _DONE:
+                    return
+                paper = Path(result.get("pdf_path", "")).name
+                try:
+                    output = self.methodology_fn(result)
+                    with lock:
+                        methodologies[paper] = output
+                except Exception as e:
+                    logger.error(f"❌ 方法论提取失败 {paper}: {e}")
+                    with lock:
+                        errors.append(f"方法论提取失败 {paper}: {e}")
+
+        def summary_stage():
+            ready = []
+            while True:
+                result = summary_queue.get()
+                if result is _DONE:
+                    break
+                ready.append(result)
+                logger.info(f"📥 总结阶段已接收 {len(ready)} 篇论文")
+                if self.summary_prepare_fn is not None:
+                    try:
+                        self.summary_prepare_fn(result)
+                    except Exception as e:
+                        logger.warning(f"总结预处理失败 {Path(result.get('pdf_path', '')).name}: {e}")
+            if not ready:
+                return
+            try:
+                summary_result["value"] = self.summary_fn(ready)
+            except Exception as e:
+                logger.error(f"❌ 生成总结失败: {e}")
+                with lock:
+                    errors.append(f"生成总结失败: {e}")
+
+        threads = [threading.Thread(target=parse_stage, name="literature-parse", daemon=True)]
+        threads += [threading.Thread(target=methodology_stage, name=f"literature-methodology-{i}", daemon=True)
+                    for i in range(self.llm_workers)]
+        if self.summary_fn is not None:
+            threads.append(threading.Thread(target=summary_stage, name="literature-summary", daemon=True))
+
+        logger.info(f"🚀 流式文献解析: {len(pdf_files)} 篇论文，{self.llm_workers} 个方法论提取线程")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            "parsed": parsed,
+            "methodologies": methodologies,
+            "summary": summary_result.get("value"),
+            "errors": errors,
+        }
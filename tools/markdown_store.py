@@ -0,0 +1,123 @@
+"""
+解析结果 markdown 的懒加载读取
+
+state["parsed_multimodal_content"] 中只保存 markdown 句柄（路径、哈希、大小、章节偏移），
+需要全文或某一章节时再通过内存映射读取；最近使用的文档保留在 LRU 中，
+状态本身及其每一次序列化都不再随论文全文大小增长
+"""
+import os
+import mmap
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+DEFAULT_LRU_SIZE = 16
+
+
+def make_handle(markdown_file: Path, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据解析清单构造 markdown 句柄
+
+    Args:
+        markdown_file: markdown 文件路径
+        manifest: 该文档的解析清单
+
+    Returns:
+        {"path", "sha256", "size", "sections"}，path 为绝对路径
+    """
+    markdown = manifest.get("markdown", {})
+    return {
+        "path": str(Path(markdown_file).resolve()),
+        "sha256": markdown.get("sha256"),
+        "size": markdown.get("size", 0),
+        "sections": manifest.get("sections", []),
+    }
+
+
+class MarkdownStore:
+    """按路径内存映射 markdown 文件，保留最近使用的若干个映射"""
+
+    def __init__(self, capacity: int = None):
+        self.capacity = capacity or int(os.environ.get("MARKDOWN_LRU_SIZE", DEFAULT_LRU_SIZE))
+        self._lock = threading.Lock()
+        self._maps = OrderedDict()
+
+    def _get_map(self, path: str) -> Optional[mmap.mmap]:
+        """调用方须持有 self._lock：返回的映射可能在其他线程的调用中被淘汰并关闭"""
+        stat = os.stat(path)
+        if stat.st_size == 0:
+            return None
+        # 文件被重新解析替换后 size/mtime 变化，旧映射自然失效
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        mapped = self._maps.get(key)
+        if mapped is not None:
+            self._maps.move_to_end(key)
+            return mapped
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[key] = mapped
+        while len(self._maps) > self.capacity:
+            _, evicted = self._maps.popitem(last=False)
+            evicted.close()
+        return mapped
+
+    def read(self, path: str, start: int = 0, end: int = None) -> str:
+        """读取 [start, end) 字节范围内的文本"""
+        path = os.path.abspath(path)
+        # 在锁内拷贝出字节，解码放到锁外
+        with self._lock:
+            mapped = self._get_map(path)
+            if mapped is None:
+                return ""
+            data = mapped[start:end]
+        return data.decode("utf-8", errors="replace")
+
+    def read_section(self, handle: Dict[str, Any], title: str) -> str:
+        """按章节标题（不区分大小写的子串匹配）读取句柄中的某一节"""
+        title = title.lower()
+        for section in handle.get("sections", []):
+            if title in section.get("title", "").lower():
+                return self.read(handle["path"], section["start"], section["end"])
+        return ""
+
+    def clear(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_markdown_store() -> MarkdownStore:
+    """获取进程内共享的 MarkdownStore"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MarkdownStore()
+        return _default_store
+
+
+def resolve_content(item: Dict[str, Any]) -> str:
+    """
+    读取解析结果（或 current_paper）对应的 markdown 全文
+
+    兼容旧格式：条目中仍带 content 时直接返回
+    """
+    if not item:
+        return ""
+    if item.get("content"):
+        return item["content"]
+    handle = item.get("markdown")
+    if not handle or not handle.get("path"):
+        return ""
+    try:
+        return get_markdown_store().read(handle["path"])
+    except OSError as e:
+        logger.warning(f"读取 markdown 失败: {handle['path']}, {e}")
+        return ""
@@ -0,0 +1,192 @@
+"""
+本地新颖性检查
+
+原先每个新想法都要经过文献检索 LLM（完整的检索 + 工具调用循环）判断是否 HIGH_SIMILARITY，
+被否决后再重新生成，一个来回代价很高。这里先在本地打分：
+- 用哈希技巧（unigram + bigram，带符号哈希）把文本映射为定长向量，无需模型与网络
+- 对 PaperCache 中已检索过的论文摘要增量建立向量矩阵（NumPy，按批计算）
+- 想法与所有摘要做一次矩阵乘法得到余弦相似度，取 top-k
+
+得分高于 RETURN 阈值直接退回重新生成，其余交给 LLM 做文献核验。
+本地语料只是 PaperCache 累积的摘要（可能来自无关的历史运行），相似度低只说明"不在本地缓存中"，
+不代表新颖，所以默认不会跳过文献核验；CONTINUE（低于阈值直接放行）需显式开启 NOVELTY_ALLOW_CONTINUE=1。
+
+阈值按真实论文摘要与想法文本校准：改写自某篇论文的想法（附带常规的实验方法段落）
+与原摘要的相似度约 0.23 ~ 0.36，同领域但思路不同的想法约 0.06 ~ 0.14。
+"""
+import os
+import re
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from utils.paper_cache import PaperCache, get_paper_cache
+
+RETURN = "RETURN"
+VERIFY = "VERIFY"
+CONTINUE = "CONTINUE"
+
+_TOKEN = re.compile(r"[a-z][a-z0-9\-]+")
+_STOPWORDS = frozenset(
+    "the a an and or of to in on for with by from as at is are was were be been this that these those "
+    "we our us it its their they which can may also using use used based via into than then such "
+    "new novel propose proposed approach method methods paper study show results however while "
+    "both each more most other over under between within without through not only but".split()
+)
+
+
+def _features(text: str) -> List[str]:
+    words = [w.strip("-") for w in _TOKEN.findall(text.lower())]
+    words = [w for w in words if len(w) > 2 and w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = None):
+        """
+        Args:
+            dim: 向量维度（默认 NOVELTY_DIM 或 4096）
+        """
+        self.dim = dim or int(os.environ.get("NOVELTY_DIM", 4096))
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        # 最高位决定符号，抵消哈希碰撞带来的偏差
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        批量向量化
+
+        Returns:
+            (len(texts), dim) 的 float32 矩阵，每行 L2 归一化（空文本为零向量）
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in _features(text or ""):
+                bucket, sign = self._bucket(feature)
+                matrix[row, bucket] += sign
+        # 次线性词频，避免长摘要中的高频词主导
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class NoveltyChecker:
+    def __init__(self, paper_cache: PaperCache = None, embedder: HashingEmbedder = None,
+                 return_threshold: float = None, continue_threshold: float = None,
+                 allow_continue: bool = None, min_corpus: int = None, top_k: int = 5):
+        """
+        Args:
+            paper_cache: 摘要来源（默认进程内共享的 PaperCache）
+            embedder: 向量化器
+            return_threshold: 最高相似度不低于该值时判定为与已有工作高度重合（默认 NOVELTY_RETURN_THRESHOLD 或 0.25）
+            continue_threshold: 开启 allow_continue 时，最高相似度低于该值判定为新颖（默认 NOVELTY_CONTINUE_THRESHOLD 或 0.1）
+            allow_continue: 是否允许跳过 LLM 文献核验（默认 NOVELTY_ALLOW_CONTINUE=1 时开启，否则只会给出 RETURN / VERIFY）
+            min_corpus: 本地摘要少于该数量时不做判断，交给 LLM 核验（默认 NOVELTY_MIN_CORPUS 或 20）
+            top_k: 返回的最相似论文数
+        """
+        self.paper_cache = paper_cache
+        self.embedder = embedder or HashingEmbedder()
+        self.return_threshold = return_threshold if return_threshold is not None else \
+            float(os.environ.get("NOVELTY_RETURN_THRESHOLD", 0.25))
+        self.continue_threshold = continue_threshold if continue_threshold is not None else \
+            float(os.environ.get("NOVELTY_CONTINUE_THRESHOLD", 0.1))
+        self.allow_continue = allow_continue if allow_continue is not None else \
+            os.environ.get("NOVELTY_ALLOW_CONTINUE", "0") == "1"
+        self.min_corpus = min_corpus if min_corpus is not None else int(os.environ.get("NOVELTY_MIN_CORPUS", 20))
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._titles: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._synced_at = 0.0
+
+    def sync(self) -> int:
+        """
+        把 PaperCache 中新抓取的摘要加入向量矩阵
+
+        Returns:
+            新增或更新的论文数
+        """
+        cache = self.paper_cache or get_paper_cache()
+        if cache is None:
+            return 0
+        rows = cache.abstracts_since(self._synced_at)
+        if not rows:
+            return 0
+        vectors = self.embedder.embed([f"{title}\n{abstract}" for _, title, abstract, _ in rows])
+        with self._lock:
+            appended = []
+            for (paper_id, title, _, fetched_at), vector in zip(rows, vectors):
+                if paper_id in self._row:
+                    # 重新抓取的论文原地更新
+                    self._matrix[self._row[paper_id]] = vector
+                    self._titles[self._row[paper_id]] = title
+                else:
+                    self._row[paper_id] = len(self._ids)
+                    self._ids.append(paper_id)
+                    self._titles.append(title)
+                    appended.append(vector)
+                self._synced_at = max(self._synced_at, fetched_at)
+            if appended:
+                self._matrix = np.vstack([self._matrix, np.stack(appended)])
+        logger.info(f"🧮 新颖性索引: 新增 {len(rows)} 篇摘要，共 {len(self._ids)} 篇")
+        return len(rows)
+
+    def check(self, idea: str) -> Dict[str, Any]:
+        """
+        对想法做本地新颖性判断
+
+        Args:
+            idea: 想法文本
+
+        Returns:
+            {"verdict": RETURN / VERIFY / CONTINUE, "score": 最高相似度,
+             "similar": [{"paper_id", "title", "score"}]（按相似度降序）}
+        """
+        try:
+            self.sync()
+        except Exception as e:
+            logger.warning(f"同步新颖性索引失败: {e}")
+
+        with self._lock:
+            matrix, ids, titles = self._matrix, list(self._ids), list(self._titles)
+        query = self.embedder.embed([idea])[0]
+        if len(ids) < self.min_corpus or not query.any():
+            logger.info(f"本地摘要 {len(ids)} 篇，不足以判断新颖性，交给 LLM 核验")
+            return {"verdict": VERIFY, "score": None, "similar": []}
+
+        scores = matrix @ query
+        top = np.argsort(-scores)[:self.top_k]
+        similar = [{"paper_id": ids[i], "title": titles[i], "score": float(scores[i])} for i in top]
+        best = similar[0]["score"]
+        if best >= self.return_threshold:
+            verdict = RETURN
+        elif self.allow_continue and best < self.continue_threshold:
+            verdict = CONTINUE
+        else:
+            verdict = VERIFY
+        logger.info(f"🔍 本地新颖性: {verdict}（最高相似度 {best:.3f}，语料 {len(ids)} 篇）")
+        return {"verdict": verdict, "score": best, "similar": similar}
+
+
+_default_checker = None
+_default_checker_lock = threading.Lock()
+
+
+def get_novelty_checker() -> Optional[NoveltyChecker]:
+    """获取进程内共享的 NoveltyChecker；设置 NOVELTY_CHECK=0 时返回 None（始终交给 LLM 核验）"""
+    global _default_checker
+    if os.environ.get("NOVELTY_CHECK", "1") == "0":
+        return None
+    with _default_checker_lock:
+        if _default_checker is None:
+            _default_checker = NoveltyChecker()
+        return _default_checker
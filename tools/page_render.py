@@ -0,0 +1,206 @@
+"""
+PDF 页面并行渲染
+
+- 页码按连续区间切分到多个进程，每个进程自行打开文档渲染（PyMuPDF 对象不可跨进程传递）
+- 结果按完成顺序流式返回，PNG / JPEG 可选
+- 自适应 DPI：先在本进程快速渲染低分辨率预览，需要时再渲染高分辨率
+- pages/pages_manifest.json 记录已渲染的页面，源文件不变时跳过已渲染的页
+"""
+import os
+import json
+import atexit
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.paper_store import hash_file
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+PAGES_DIR = "pages"
+PREVIEW_DIR = "preview"
+PAGES_MANIFEST = "pages_manifest.json"
+# 文件名规则变化时递增（旧版本的清单可能指向已被其他 DPI 覆盖的文件，需要重新渲染）
+PAGES_MANIFEST_VERSION = 2
+DEFAULT_PREVIEW_DPI = 72
+
+
+def _page_filename(file_stem: str, page_num: int, dpi: int, fmt: str) -> str:
+    # 文件名带 DPI：同一页以不同 DPI 渲染时不会互相覆盖
+    return f"{file_stem}_page_{page_num:03d}_{dpi}dpi.{'jpg' if fmt in ('jpg', 'jpeg') else 'png'}"
+
+
+def _iter_render(doc, page_numbers: List[int], out_dir: str, file_stem: str,
+                 dpi: int, fmt: str, quality: int) -> Iterator[Tuple[int, str]]:
+    """在已打开的文档上逐页渲染（1-based），渲染一页返回一页"""
+    zoom = dpi / 72.0
+    matrix = fitz.Matrix(zoom, zoom)
+    for page_num in page_numbers:
+        pix = doc[page_num - 1].get_pixmap(matrix=matrix)
+        path = os.path.join(out_dir, _page_filename(file_stem, page_num, dpi, fmt))
+        if fmt in ("jpg", "jpeg"):
+            pix.save(path, jpg_quality=quality)
+        else:
+            pix.save(path)
+        yield page_num, path
+
+
+def _render_pages(pdf_path: str, page_numbers: List[int], out_dir: str, file_stem: str,
+                  dpi: int, fmt: str, quality: int) -> List[Tuple[int, str]]:
+    """渲染一段页码（1-based），在工作进程中执行"""
+    with fitz.open(pdf_path) as doc:
+        return list(_iter_render(doc, page_numbers, out_dir, file_stem, dpi, fmt, quality))
+
+
+def _chunk(pages: List[int], chunks: int) -> List[List[int]]:
+    size = max(1, -(-len(pages) // chunks))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _shutdown_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+
+
+# 只注册一次：进程池重建时不再为已关闭的旧池追加退出回调
+atexit.register(_shutdown_pool)
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """常驻的渲染进程池（跨调用复用，避免每次 spawn 的启动开销）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (_pool._max_workers != max_workers or getattr(_pool, "_broken", False)):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+class PageRenderer:
+    def __init__(self, max_workers: int = None, image_format: str = None, quality: int = None,
+                 preview_dpi: int = None, inline_pages: int = None):
+        """
+        Args:
+            max_workers: 渲染进程数（默认 PAGE_RENDER_WORKERS 或 CPU 数）
+            image_format: png / jpeg（默认 PAGE_IMAGE_FORMAT 或 png）
+            quality: JPEG 质量（默认 PAGE_IMAGE_QUALITY 或 85）
+            preview_dpi: 预览分辨率（默认 PAGE_PREVIEW_DPI 或 72）
+            inline_pages: 不超过该页数时直接在本进程渲染（默认 PAGE_RENDER_INLINE_PAGES 或 4）
+        """
+        if not PYMUPDF_AVAILABLE:
+            raise ImportError("PyMuPDF未安装，无法使用PDF页面转图片功能。请运行: pip install PyMuPDF")
+        self.max_workers = max_workers or int(os.environ.get("PAGE_RENDER_WORKERS", os.cpu_count() or 1))
+        self.image_format = (image_format or os.environ.get("PAGE_IMAGE_FORMAT", "png")).lower()
+        if self.image_format not in ("png", "jpg", "jpeg"):
+            raise ValueError(f"不支持的页面图片格式: {self.image_format}")
+        self.quality = quality or int(os.environ.get("PAGE_IMAGE_QUALITY", 85))
+        self.preview_dpi = preview_dpi or int(os.environ.get("PAGE_PREVIEW_DPI", DEFAULT_PREVIEW_DPI))
+        self.inline_pages = inline_pages if inline_pages is not None else \
+            int(os.environ.get("PAGE_RENDER_INLINE_PAGES", 4))
+
+    @staticmethod
+    def _load_manifest(pages_dir: Path, sha256: str) -> Dict:
+        try:
+            with open(pages_dir / PAGES_MANIFEST, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("source_sha256") == sha256 and manifest.get("version") == PAGES_MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": PAGES_MANIFEST_VERSION, "source_sha256": sha256, "renders": {}}
+
+    @staticmethod
+    def _write_manifest(pages_dir: Path, manifest: Dict):
+        path = pages_dir / PAGES_MANIFEST
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def render(self, pdf_path: str, output_dir: str, dpi: int = 200, pages: Optional[List[int]] = None,
+               preview: bool = False) -> Iterator[Tuple[int, str]]:
+        """
+        渲染页面，按完成顺序逐页返回
+
+        Args:
+            pdf_path: PDF文件路径
+            output_dir: 输出目录，图片保存在其下的 pages/（预览在 pages/preview/）
+            dpi: 高分辨率渲染的 DPI（preview=True 时忽略，使用预览 DPI）
+            pages: 需要的页码（1-based），None 表示全部
+            preview: 是否渲染低分辨率预览（在本进程直接渲染，几乎立即可用）
+
+        Yields:
+            (页码, 图片路径)，已渲染过的页先返回
+        """
+        pdf_file = Path(pdf_path)
+        if not pdf_file.exists():
+            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+
+        pages_dir = Path(output_dir) / PAGES_DIR
+        out_dir = pages_dir / PREVIEW_DIR if preview else pages_dir
+        out_dir.mkdir(parents=True, exist_ok=True)
+        dpi = self.preview_dpi if preview else dpi
+        fmt = "jpeg" if preview else self.image_format
+
+        with fitz.open(str(pdf_file)) as doc:
+            total_pages = len(doc)
+        pages = sorted(set(p for p in (pages or range(1, total_pages + 1)) if 1 <= p <= total_pages))
+
+        manifest = self._load_manifest(pages_dir, hash_file(str(pdf_file)))
+        key = f"{dpi}:{fmt}"
+        done = manifest["renders"].setdefault(key, {})
+        todo = []
+        for page_num in pages:
+            path = done.get(str(page_num))
+            if path and (pages_dir / path).exists():
+                yield page_num, str(pages_dir / path)
+            else:
+                todo.append(page_num)
+        if not todo:
+            return
+
+        logger.info(f"开始渲染PDF页面: {pdf_file.name} ({len(todo)}/{total_pages}页, {dpi}dpi)")
+        args = (str(pdf_file), str(out_dir), pdf_file.stem, dpi, fmt, self.quality)
+
+        def record(rendered):
+            for page_num, path in rendered:
+                done[str(page_num)] = str(Path(path).relative_to(pages_dir))
+            self._write_manifest(pages_dir, manifest)
+
+        if preview or len(todo) <= self.inline_pages or self.max_workers <= 1:
+            # 本进程渲染：整批只打开一次文档，仍逐页记录并返回
+            with fitz.open(args[0]) as doc:
+                for rendered in _iter_render(doc, todo, *args[1:]):
+                    record([rendered])
+                    yield rendered
+            return
+
+        # 每个进程分到约两段连续页码，兼顾负载均衡与打开文档的开销
+        pool = _get_pool(self.max_workers)
+        futures = [pool.submit(_render_pages, args[0], chunk, *args[1:])
+                   for chunk in _chunk(todo, self.max_workers * 2)]
+        for future in as_completed(futures):
+            rendered = future.result()
+            record(rendered)
+            yield from rendered
+        logger.info(f"✓ 完成: 共渲染{len(todo)}页，图片保存在 {out_dir}")
+
+    def render_all(self, pdf_path: str, output_dir: str, dpi: int = 200, pages: Optional[List[int]] = None,
+                   preview: bool = False) -> List[str]:
+        """渲染并按页码顺序返回全部图片路径"""
+        return [path for _, path in sorted(self.render(pdf_path, output_dir, dpi, pages, preview))]
@@ -37,3 +37,21 @@ class searhArxivTool(BaseTool):
     async def _arun(self, query: str = "", max_results: int = 10) -> List[Dict]:
         """Asynchronously execute arXiv search"""
         return await sync_to_async(self._run)(query, max_results)
+
+class fetchArxivByIdsInput(BaseModel):
+    "Input arguments for resolving known arXiv ids"
+    paper_ids: List[str] = Field(..., description="arXiv ids to look up (e.g. ['2401.12345', '1706.03762v7'])")
+
+class fetchArxivByIdsTool(BaseTool):
+    "Tool for resolving metadata of known arXiv ids in bulk"
+    name: str = "fetch_academicPapers_by_arXiv_ids"
+    description: str = "Fetch metadata (title, authors, abstract, ...) for papers whose arXiv ids are already known,\
+        e.g. ids found in previous search results or reference lists. Resolves many ids in one call"
+    args_schema: Type[BaseModel] = fetchArxivByIdsInput
+    def _run(self, paper_ids: List[str]) -> List[Dict]:
+        papers = arxiv_searcher.fetch_by_ids(paper_ids)
+        return [paper.to_dict() for paper in papers] if papers else []
+
+    async def _arun(self, paper_ids: List[str]) -> List[Dict]:
+        """Asynchronously resolve arXiv ids"""
+        return await sync_to_async(self._run)(paper_ids)
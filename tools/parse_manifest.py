@@ -0,0 +1,164 @@
+"""
+单篇文档的解析清单（manifest.json）
+
+清单记录源PDF的内容哈希、docling 版本、流水线配置、图片/页面列表、章节偏移和文件大小。
+缓存校验只需读取这一个小 JSON（源文件 size/mtime 未变时无需重新计算哈希），
+命中时也不必再遍历 figs/ 和 pages/ 目录。
+"""
+import os
+import re
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.paper_store import hash_file
+from tools.figure_export import list_figures, thumbnail_for
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+_HEADING_PATTERN = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
+_docling_version = None
+
+
+def docling_version() -> str:
+    global _docling_version
+    if _docling_version is None:
+        try:
+            from importlib.metadata import version
+            _docling_version = version("docling")
+        except Exception:
+            _docling_version = "unknown"
+    return _docling_version
+
+
+def index_sections(markdown: bytes) -> List[Dict[str, Any]]:
+    """
+    按 markdown 标题切分章节，记录每节的字节偏移
+
+    Args:
+        markdown: markdown 文件的原始字节
+
+    Returns:
+        [{"title", "level", "start", "end"}]，start/end 为字节偏移
+    """
+    headings = list(_HEADING_PATTERN.finditer(markdown))
+    sections = []
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(markdown)
+        sections.append({
+            "title": match.group(2).decode("utf-8", errors="replace").strip(),
+            "level": len(match.group(1)),
+            "start": match.start(),
+            "end": end,
+        })
+    return sections
+
+
+def _file_entries(paths: List[Path], output_dir: Path) -> List[Dict[str, Any]]:
+    return [{"path": str(p.relative_to(output_dir)), "size": p.stat().st_size} for p in paths]
+
+
+def _figure_entries(figs_dir: Path, output_dir: Path) -> List[Dict[str, Any]]:
+    figures = list_figures(figs_dir)
+    entries = _file_entries(figures, output_dir)
+    for figure, entry in zip(figures, entries):
+        thumb = thumbnail_for(figure)
+        if thumb is not None:
+            entry["thumb"] = str(thumb.relative_to(output_dir))
+    return entries
+
+
+def build_manifest(pdf_path: str, output_dir: Path, markdown_file: Path,
+                   pipeline_options: Dict[str, Any], **extra) -> Dict[str, Any]:
+    """
+    解析完成后生成清单（唯一一次遍历 figs/ 和 pages/ 目录）
+
+    Args:
+        pdf_path: 源PDF路径
+        output_dir: 该文档的输出目录
+        markdown_file: 导出的 markdown 文件
+        pipeline_options: 影响解析结果的流水线配置
+        extra: 其他需要记录的字段
+
+    Returns:
+        清单字典
+    """
+    stat = os.stat(pdf_path)
+    markdown_bytes = markdown_file.read_bytes() if markdown_file.exists() else b""
+    figs_dir = output_dir / "figs"
+    pages_dir = output_dir / "pages"
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": {
+            "path": os.path.abspath(pdf_path),
+            "sha256": hash_file(pdf_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        },
+        "docling_version": docling_version(),
+        "pipeline_options": pipeline_options,
+        "markdown": {
+            "path": str(markdown_file.relative_to(output_dir)),
+            "size": len(markdown_bytes),
+            "sha256": hashlib.sha256(markdown_bytes).hexdigest(),
+        },
+        "figures": _figure_entries(figs_dir, output_dir),
+        "page_images": _file_entries(list_figures(pages_dir), output_dir),
+        "sections": index_sections(markdown_bytes),
+        "created_at": time.time(),
+    }
+    manifest.update(extra)
+    return manifest
+
+
+def write_manifest(output_dir: Path, manifest: Dict[str, Any]):
+    """原子写入清单"""
+    path = Path(output_dir) / MANIFEST_FILE
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(output_dir: Path) -> Optional[Dict[str, Any]]:
+    path = Path(output_dir) / MANIFEST_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_manifest_valid(manifest: Optional[Dict[str, Any]], pdf_path: str, pipeline_options: Dict[str, Any],
+                      sha256: Optional[str] = None) -> bool:
+    """
+    校验清单是否仍然对应该PDF和当前配置
+
+    同一路径的源文件 size/mtime 与清单一致时直接认为内容未变；否则比较内容哈希，
+    因此重新下载或拷贝同一份PDF不会使缓存失效
+
+    Args:
+        manifest: 已读取的清单
+        pdf_path: 源PDF路径
+        pipeline_options: 当前流水线配置
+        sha256: 已知的源文件哈希（可选，避免重复计算）
+    """
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return False
+    if manifest.get("docling_version") != docling_version():
+        return False
+    if manifest.get("pipeline_options") != pipeline_options:
+        return False
+
+    source = manifest.get("source", {})
+    if sha256 is None:
+        stat = os.stat(pdf_path)
+        if (os.path.abspath(pdf_path) == source.get("path") and stat.st_size == source.get("size")
+                and stat.st_mtime_ns == source.get("mtime_ns")):
+            return True
+        sha256 = hash_file(pdf_path)
+    return sha256 == source.get("sha256")
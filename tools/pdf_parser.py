@@ -1,18 +1,68 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
 from pathlib import Path
 from tools.document_segment import SegmentTool
-from docling_core.types.doc import ImageRefMode
 from utils.state import State
 from common.utils import init_logger, get_pdf_files, ensure_dirs
+from utils.paper_store import get_paper_store, hash_file
+from tools.converter_service import get_converter_service
+from tools.parse_manifest import build_manifest, write_manifest, load_manifest, is_manifest_valid
+from tools.markdown_store import make_handle
+from tools.figure_export import list_figures, THUMBS_DIR
+from tools.pdf_sections import locate_sections, page_count, ranges_for_sections, subtract_ranges, merge_ranges
+from tools.pdf_triage import choose_tier, extract_text_markdown, triage_mode, TIER_TEXT, TIER_LAYOUT, TIER_FULL
 import os
+import shutil
 from loguru import logger
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
 from langchain_core.load import dumps, loads
 
 # logger = init_logger("pdf_parser_agent")
 
+# 限制每个解析进程内部的线程数，避免 N 个进程 x 全部核心的线程超额订阅
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# 每个工作进程内常驻的解析器（在 initializer 中构建一次，跨文档复用）
+_worker_parser = None
+
+
+def _init_parse_worker(enable_formula_enrichment: bool, threads_per_worker: int):
+    """进程池 initializer：限制线程数并预先加载 docling 模型"""
+    global _worker_parser
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads_per_worker)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    _worker_parser = PDFParser(None, None, enable_formula_enrichment)
+    # 触发模型加载，使第一个文档不再承担加载开销（大多数论文走 layout 档位）
+    _worker_parser.segment_tool.converter_for(TIER_LAYOUT)
+
+
+def _restore_env(saved_env: Dict[str, Any]):
+    for var, value in saved_env.items():
+        if value is None:
+            os.environ.pop(var, None)
+        else:
+            os.environ[var] = value
+
+
+def _parse_in_worker(pdf_path: str, md_output_dir: str, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    在工作进程中解析单个PDF
+    
+    只返回轻量的清单（路径、图片列表、markdown 句柄），不回传 docling 对象
+    """
+    try:
+        return _worker_parser._convert_single_pdf(pdf_path, md_output_dir, use_cache=False, sections=sections)
+    except Exception as e:
+        return PDFParser._failed_result(pdf_path, e)
+
+
 class PDFParser:
     def __init__(self, pdf_path, md_out_path, enable_formula_enrichment: bool = False):
         """
@@ -24,50 +74,204 @@ class PDFParser:
         ensure_dirs()
         self.pdf_dir = pdf_path
         self.md_output_dir = md_out_path
-        self.segment_tool = SegmentTool(enable_formula_enrichment=enable_formula_enrichment)
+        self.enable_formula_enrichment = enable_formula_enrichment
+        self._segment_tool = None
     
-    def _is_pdf_cached(self, pdf_path: str, md_output_dir: str) -> bool:
+    @property
+    def segment_tool(self) -> SegmentTool:
         """
-        检查PDF是否已经解析过（缓存检查）
+        按需获取 SegmentTool（进程池模式下主进程无需加载 docling 模型）
+        
+        同一进程内所有 PDFParser 共享常驻的转换服务中的 SegmentTool，模型只加载一次
+        """
+        if self._segment_tool is None:
+            self._segment_tool = get_converter_service().segment_tool(self.enable_formula_enrichment)
+        return self._segment_tool
+    
+    @staticmethod
+    def _failed_result(pdf_path: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "pdf_path": pdf_path,
+            "markdown_path": None,
+            "markdown": None,
+            "figures": [],
+            "thumbnails": [],
+            "page_images": [],
+            "status": "failed",
+            "error": str(error)
+        }
+    
+    def _pipeline_options_for(self, manifest: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """清单所记录档位的流水线配置；PDF_TRIAGE 固定档位时只接受该档位的解析结果"""
+        mode = triage_mode()
+        tier = mode if mode != "auto" else (manifest or {}).get("tier", TIER_FULL)
+        return SegmentTool.pipeline_signature(self.enable_formula_enrichment, tier)
+    
+    @staticmethod
+    def _covers(manifest: Dict[str, Any], sections: Optional[List[str]]) -> bool:
+        """清单中已解析的页是否覆盖本次请求（整篇或指定章节）"""
+        pages = manifest.get("pages")
+        if not pages:
+            return True
+        if sections:
+            requested = ranges_for_sections(pages.get("sections") or {}, sections, pages["total"])
+        else:
+            requested = [(1, pages["total"])]
+        return not subtract_ranges(requested, [tuple(r) for r in pages["parsed"]])
+    
+    def _find_cached_output(self, pdf_path: str, md_output_dir: str, sections: Optional[List[str]] = None):
+        """
+        查找可复用的解析输出目录（只读取清单，不遍历目录）
+        
+        先校验本次输出目录下的清单（源文件未变时无需计算哈希）；不一致时再按内容哈希
+        到论文库中查找相同内容在其他运行/流水线中的解析结果。按章节解析时还要求
+        已解析的页覆盖所请求的章节
+        
+        Returns:
+            (输出目录, 清单)；未命中时均为 None
+        """
+        pdf_file = Path(pdf_path)
+        if not pdf_file.exists():
+            return None, None
+        
+        output_dir = Path(md_output_dir) / pdf_file.stem
+        manifest = load_manifest(output_dir)
+        if (is_manifest_valid(manifest, str(pdf_file), self._pipeline_options_for(manifest))
+                and self._covers(manifest, sections)):
+            return output_dir, manifest
+        
+        store = get_paper_store()
+        if store:
+            sha256 = hash_file(str(pdf_file))
+            shared_dir = store.parsed_dir(sha256)
+            if shared_dir is not None and shared_dir != output_dir:
+                manifest = load_manifest(shared_dir)
+                if (is_manifest_valid(manifest, str(pdf_file), self._pipeline_options_for(manifest), sha256=sha256)
+                        and self._covers(manifest, sections)):
+                    return shared_dir, manifest
+        
+        logger.info(f"📄 未找到有效的解析清单: {pdf_file.name}")
+        return None, None
+    
+    def _is_pdf_cached(self, pdf_path: str, md_output_dir: str, sections: Optional[List[str]] = None) -> bool:
+        """
+        检查PDF是否已经解析过（按解析清单中的内容哈希和流水线配置，而非修改时间）
         
         Args:
             pdf_path: PDF文件路径
             md_output_dir: Markdown输出目录
+            sections: 只需要的章节（None 表示整篇）
         
         Returns:
-            True如果已缓存且PDF未修改，False否则
+            True如果存在有效的解析结果，False否则
         """
-        pdf_file = Path(pdf_path)
-        if not pdf_file.exists():
-            return False
+        output_dir, _ = self._find_cached_output(pdf_path, md_output_dir, sections)
+        return output_dir is not None
+    
+    @staticmethod
+    def _relative_or_absolute(path: Path, md_output_dir: str) -> str:
+        """输出目录内的文件返回相对路径，复用其他目录的结果时返回绝对路径"""
+        try:
+            return str(path.relative_to(Path(md_output_dir)))
+        except ValueError:
+            return str(path.resolve())
+    
+    def _collect_result(self, pdf_path: str, output_dir: Path, manifest: Dict[str, Any],
+                        md_output_dir: str, cached: bool) -> Dict[str, Any]:
+        """根据清单组装解析结果（图片/页面列表直接取自清单，markdown 只保存句柄，按需懒加载）"""
+        md_file = output_dir / manifest["markdown"]["path"]
+        figures = [self._relative_or_absolute(output_dir / f["path"], md_output_dir) for f in manifest["figures"]]
+        # 与 figures 一一对应的缩略图（多模态 LLM 上传用），旧清单中没有时为 None
+        thumbnails = [
+            self._relative_or_absolute(output_dir / f["thumb"], md_output_dir) if f.get("thumb") else None
+            for f in manifest["figures"]
+        ]
+        page_images_relative = [
+            self._relative_or_absolute(output_dir / f["path"], md_output_dir) for f in manifest["page_images"]
+        ]
         
-        file_stem = pdf_file.stem
-        output_dir = Path(md_output_dir) / file_stem
-        md_file = output_dir / f"{file_stem}.md"
+        return {
+            "pdf_path": pdf_path,
+            "markdown_path": self._relative_or_absolute(md_file, md_output_dir),
+            "markdown": make_handle(md_file, manifest),
+            "figures": figures,
+            "thumbnails": thumbnails,
+            "page_images": page_images_relative,
+            "status": "success",
+            "cached": cached
+        }
+    
+    def _convert_page_ranges(self, pdf_file: Path, output_dir: Path, sections: Optional[List[str]],
+                             partial: Optional[Dict[str, Any]], tier: str = TIER_FULL) -> Dict[str, Any]:
+        """
+        只对需要的页码范围运行 docling，每个范围导出一个 markdown 分块，再按页序拼接
         
-        # 如果markdown文件不存在，需要解析
-        if not md_file.exists():
-            return False
+        Args:
+            pdf_file: PDF文件
+            output_dir: 输出目录
+            sections: 需要的章节（None 表示补齐全部页面）
+            partial: 同一输出目录下已有的部分解析清单（增量补齐时复用其分块）
+            tier: 解析档位（text 档位直接按文本层导出分块）
         
-        # 检查PDF文件的修改时间
-        pdf_mtime = pdf_file.stat().st_mtime
-        md_mtime = md_file.stat().st_mtime
+        Returns:
+            清单中的 pages 字段
+        """
+        file_stem = pdf_file.stem
+        figs_dir = output_dir / "figs"
+        if partial:
+            pages = partial["pages"]
+            located, total = pages.get("sections") or {}, pages["total"]
+            covered = [tuple(r) for r in pages["parsed"]]
+            chunks = list(pages.get("chunks", []))
+        else:
+            # 廉价的文本层扫描，定位章节所在页
+            located, total = locate_sections(str(pdf_file)), page_count(str(pdf_file))
+            covered, chunks = [], []
+        
+        requested = ranges_for_sections(located, sections, total) if sections else [(1, total)]
+        missing = subtract_ranges(requested, covered)
+        logger.info(f"📑 {pdf_file.name}: 共{total}页，本次解析页码 {missing}（已解析 {covered}）")
+        
+        for start, end in missing:
+            chunk_stem = f"{file_stem}.p{start:03d}-{end:03d}"
+            # 分块与主 markdown 位于同一目录，图片引用路径在拼接后仍然有效
+            chunk_file = output_dir / f"{chunk_stem}.md"
+            if tier == TIER_TEXT:
+                extract_text_markdown(str(pdf_file), chunk_file, page_range=(start, end))
+            else:
+                conv_res = self.segment_tool.converter_for(tier).convert(str(pdf_file), page_range=(start, end))
+                figure_paths = self.segment_tool._export_figures(conv_res, figs_dir, chunk_stem.replace(".", "_"))
+                self.segment_tool.export_markdown(conv_res, chunk_file, figure_paths)
+            chunks.append({"pages": [start, end], "path": chunk_file.name})
         
-        # 如果PDF比markdown新，需要重新解析
-        if pdf_mtime > md_mtime:
-            logger.info(f"📄 PDF已更新，需要重新解析: {pdf_file.name}")
-            return False
+        chunks.sort(key=lambda chunk: chunk["pages"][0])
+        md_file = output_dir / f"{file_stem}.md"
+        # 先写临时文件再替换：旧的 markdown 可能正被 MarkdownStore 内存映射，原地截断会让读取方 SIGBUS
+        tmp_file = md_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as out:
+            for chunk in chunks:
+                out.write((output_dir / chunk["path"]).read_text(encoding="utf-8"))
+                out.write("\n\n")
+        os.replace(tmp_file, md_file)
         
-        return True
+        return {
+            "total": total,
+            "parsed": [list(r) for r in merge_ranges(covered + missing)],
+            "sections": located,
+            "chunks": chunks,
+        }
     
-    def _convert_single_pdf(self, pdf_path: str, md_output_dir: str, use_cache: bool = True) -> Dict[str, Any]:
+    def _convert_single_pdf(self, pdf_path: str, md_output_dir: str, use_cache: bool = True,
+                            sections: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         转换单个PDF文件为Markdown
         
         Args:
             pdf_path: PDF文件路径
             md_output_dir: Markdown输出目录
-            use_cache: 是否使用缓存（如果已解析过则跳过）
+            use_cache: 是否使用缓存（如果相同内容已解析过则跳过）
+            sections: 只解析这些章节所在的页（如 ["abstract", "introduction", "method"]），
+                None 表示整篇；已部分解析的文档只补齐缺少的页
         
         Returns:
             Dict包含转换结果信息
@@ -76,124 +280,182 @@ class PDFParser:
         if not pdf_file.exists():
             raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
         
+        # 检查缓存
+        if use_cache:
+            cached_dir, manifest = self._find_cached_output(pdf_path, md_output_dir, sections)
+            if cached_dir is not None:
+                logger.info(f"⚡ 使用缓存: {pdf_file.name} (跳过解析)")
+                return self._collect_result(pdf_path, cached_dir, manifest, md_output_dir, cached=True)
+        
         file_stem = pdf_file.stem
         output_dir = Path(md_output_dir) / file_stem
         output_dir.mkdir(parents=True, exist_ok=True)
         figs_dir = output_dir / "figs"
         figs_dir.mkdir(parents=True, exist_ok=True)
         
-        # 检查缓存
-        if use_cache and self._is_pdf_cached(pdf_path, md_output_dir):
-            logger.info(f"⚡ 使用缓存: {pdf_file.name} (跳过解析)")
-            md_file = output_dir / f"{file_stem}.md"
-            content = ""
-            if md_file.exists():
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            
-            figures = []
-            if figs_dir.exists():
-                for f in sorted(figs_dir.glob("*.png")):
-                    figures.append(str(f.relative_to(Path(md_output_dir))))
-            
-            page_images_relative = []
-            pages_dir = output_dir / "pages"
-            if pages_dir.exists():
-                for f in sorted(pages_dir.glob("*.png")):
-                    page_images_relative.append(str(f.relative_to(Path(md_output_dir))))
-            
-            md_path_relative = None
-            if md_file.exists():
-                md_path_relative = str(md_file.relative_to(Path(md_output_dir)))
-            
-            return {
-                "pdf_path": pdf_path,
-                "markdown_path": md_path_relative,
-                "content": content,
-                "figures": figures,
-                "page_images": page_images_relative,
-                "status": "success",
-                "cached": True
-            }
-        
         logger.info(f"🔄 正在处理: {pdf_file.name} -> {output_dir}")
         
-        # 转换PDF
-        conv_res = self.segment_tool.converter.convert(str(pdf_file))
-        self.segment_tool._export_figures(conv_res, figs_dir, file_stem)
+        # 同一输出目录下已有按章节解析的部分结果时，增量补齐
+        partial = load_manifest(output_dir)
+        if not (partial and partial.get("pages", {}).get("chunks")
+                and is_manifest_valid(partial, str(pdf_file), self._pipeline_options_for(partial))):
+            partial = None
         
-        # 将PDF每一页转换为图片（已注释，因为很慢）
-        page_images = []
+        # 分级：按文本层质量和图表数量选择解析档位（增量补齐沿用已有档位）
+        if partial:
+            tier, triage = partial.get("tier", TIER_FULL), partial.get("triage", {})
+        else:
+            tier, triage = choose_tier(str(pdf_file), self.enable_formula_enrichment)
         
-        # 导出Markdown
         md_file = output_dir / f"{file_stem}.md"
-        conv_res.document.save_as_markdown(
-            str(md_file),
-            image_mode=ImageRefMode.REFERENCED,
-            artifacts_dir=figs_dir
+        # 整篇解析同样先写临时文件再替换（原因见 _convert_page_ranges）
+        tmp_md_file = md_file.with_suffix(f".{os.getpid()}.tmp")
+        if not partial:
+            # 整篇重新解析时清掉旧的图片，避免格式/编号变化后残留的文件进入清单
+            for stale in list_figures(figs_dir):
+                stale.unlink()
+            shutil.rmtree(figs_dir / THUMBS_DIR, ignore_errors=True)
+        
+        if sections or partial:
+            pages = self._convert_page_ranges(pdf_file, output_dir, sections, partial, tier)
+        elif tier == TIER_TEXT:
+            # 快速档位：文本层直接导出，不跑 docling
+            extract_text_markdown(str(pdf_file), tmp_md_file)
+            os.replace(tmp_md_file, md_file)
+            total = triage.get("pages") or page_count(str(pdf_file))
+            pages = {"total": total, "parsed": [[1, total]]}
+        else:
+            # 转换PDF
+            conv_res = self.segment_tool.converter_for(tier).convert(str(pdf_file))
+            figure_paths = self.segment_tool._export_figures(conv_res, figs_dir, file_stem)
+
+            # 导出Markdown
+            self.segment_tool.export_markdown(conv_res, tmp_md_file, figure_paths)
+            os.replace(tmp_md_file, md_file)
+            total = len(conv_res.document.pages)
+            pages = {"total": total, "parsed": [[1, total]]}
+        
+        # 写入解析清单（内容哈希、docling 版本、解析档位及流水线配置、已解析页码、图片/页面列表、章节偏移）
+        manifest = build_manifest(
+            str(pdf_file), output_dir, md_file,
+            SegmentTool.pipeline_signature(self.enable_formula_enrichment, tier),
+            pages=pages, tier=tier, triage=triage
         )
+        write_manifest(output_dir, manifest)
+        store = get_paper_store()
+        if store:
+            store.put_file(str(pdf_file))
+            store.record_parse(manifest["source"]["sha256"], str(output_dir))
         
-        content = ""
-        if md_file.exists():
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-        
-        figures = []
-        if figs_dir.exists():
-            for f in sorted(figs_dir.glob("*.png")):
-                figures.append(str(f.relative_to(Path(md_output_dir))))
-        
-        page_images_relative = []
-        pages_dir = output_dir / "pages"
-        if pages_dir.exists():
-            for f in sorted(pages_dir.glob("*.png")):
-                page_images_relative.append(str(f.relative_to(Path(md_output_dir))))
-        
-        md_path_relative = None
-        if md_file.exists():
-            md_path_relative = str(md_file.relative_to(Path(md_output_dir)))
-        
-        return {
-            "pdf_path": pdf_path,
-            "markdown_path": md_path_relative,
-            "content": content,
-            "figures": figures,
-            "page_images": page_images_relative,
-            "status": "success",
-            "cached": False
+        return self._collect_result(pdf_path, output_dir, manifest, md_output_dir, cached=False)
+    
+    def _iter_completed(self, future_to_pdf: Dict[Any, str], on_broken_pool=None,
+                        executor: ThreadPoolExecutor = None) -> Iterator[Dict[str, Any]]:
+        """按完成顺序返回已提交任务的解析结果"""
+        try:
+            for future in as_completed(future_to_pdf):
+                pdf_path = future_to_pdf[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    if on_broken_pool:
+                        on_broken_pool()
+                    result = self._failed_result(pdf_path, e)
+                except Exception as e:
+                    logger.error(f"❌ 处理 {Path(pdf_path).name} 时出错: {e}")
+                    result = self._failed_result(pdf_path, e)
+                if result.get("status") == "success":
+                    logger.info(f"✓ 成功解析: {Path(pdf_path).name}")
+                else:
+                    logger.error(f"❌ 解析{pdf_path}失败: {result.get('error')}")
+                yield result
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+    
+    def _iter_with_threads(self, pdf_files: List[str], max_workers: int,
+                           sections: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """线程池后端：共享同一个 SegmentTool（适合单文件或调试）；任务立即提交，结果惰性返回"""
+        logger.info(f"🔄 需要解析 {len(pdf_files)} 个文件（线程池，最大线程数: {max_workers}）")
+        
+        def parse_single(pdf_path):
+            """单个PDF解析任务"""
+            try:
+                return self._convert_single_pdf(pdf_path, self.md_output_dir, use_cache=False, sections=sections)
+            except Exception as e:
+                logger.opt(exception=True).debug(f"解析{pdf_path}异常")
+                return self._failed_result(pdf_path, e)
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        future_to_pdf = {
+            executor.submit(parse_single, pdf_path): pdf_path
+            for pdf_path in pdf_files
         }
+        return self._iter_completed(future_to_pdf, executor=executor)
     
-    def run(self, state: State, max_workers: int = 4, use_cache: bool = True) -> State:
+    def _iter_with_processes(self, pdf_files: List[str], max_workers: int,
+                             sections: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
         """
-        执行PDF解析流程（支持并行处理和缓存）
+        进程池后端：每个工作进程在 initializer 中构建一次 DocumentConverter 并常驻，
+        docling 的版面/表格模型不再受 GIL 限制，吞吐随核数扩展；任务立即提交，结果惰性返回
+        """
+        max_workers = max(1, min(max_workers, len(pdf_files)))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
+        logger.info(f"🔄 需要解析 {len(pdf_files)} 个文件（进程池，进程数: {max_workers}，每进程线程数: {threads_per_worker}）")
+        
+        # spawn 出的子进程继承当前环境变量，在提交任务期间临时设置线程数上限
+        saved_env = {var: os.environ.get(var) for var in _THREAD_ENV_VARS}
+        for var in _THREAD_ENV_VARS:
+            os.environ[var] = str(threads_per_worker)
+        
+        service = get_converter_service()
+        try:
+            # 进程池由转换服务常驻持有，工作进程及其加载的模型跨调用复用
+            executor = service.process_pool(max_workers, self.enable_formula_enrichment, threads_per_worker)
+            future_to_pdf = {
+                executor.submit(_parse_in_worker, pdf_path, self.md_output_dir, sections): pdf_path
+                for pdf_path in pdf_files
+            }
+        finally:
+            # 子进程已全部启动，恢复主进程环境
+            _restore_env(saved_env)
+        
+        return self._iter_completed(
+            future_to_pdf,
+            on_broken_pool=lambda: service.discard_process_pool(max_workers, self.enable_formula_enrichment)
+        )
+    
+    def iter_parse(self, pdf_files: List[str], max_workers: int = 4, use_cache: bool = True,
+                   backend: str = None, sections: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        解析一组PDF文件，按完成顺序逐个返回结果（缓存命中的先返回，其余并行解析）
+        
+        下游可以在某篇论文解析完成后立即开始处理，而不必等待最慢的一篇
         
         Args:
-            state: 状态字典
-            max_workers: 最大并行工作线程数（默认4）
+            pdf_files: PDF文件路径列表
+            max_workers: 最大并行工作进程/线程数（默认4）
             use_cache: 是否使用缓存（默认True）
+            backend: "process"（进程池，默认，可用 PDF_PARSE_BACKEND 配置）或 "thread"
+            sections: 只解析这些章节所在的页（默认整篇，可用 PDF_PARSE_SECTIONS 配置，逗号分隔）
         
-        Returns:
-            更新后的状态字典
+        Yields:
+            每个PDF的解析结果
         """
-        logger.info("🚀 开始PDF解析流程（并行模式）")
-        
-        pdf_files = state.get("downloaded_papers", [])
-        if not pdf_files:
-            logger.warning("⚠️ 未找到需要解析的PDF文件")
-            return state
-        
-        logger.info(f"📚 发现 {len(pdf_files)} 个PDF文件")
+        if sections is None:
+            sections = [s.strip() for s in os.environ.get("PDF_PARSE_SECTIONS", "").split(",") if s.strip()] or None
         
         # 先检查缓存，分离需要解析和已缓存的文件
         files_to_parse = []
         cached_results = []
         
         for pdf_path in pdf_files:
-            if use_cache and self._is_pdf_cached(pdf_path, self.md_output_dir):
+            if use_cache and self._is_pdf_cached(pdf_path, self.md_output_dir, sections):
                 # 直接从缓存加载
                 try:
-                    result = self._convert_single_pdf(pdf_path, self.md_output_dir, use_cache=True)
-                    cached_results.append(result)
+                    cached_results.append(
+                        self._convert_single_pdf(pdf_path, self.md_output_dir, use_cache=True, sections=sections)
+                    )
                     logger.info(f"⚡ 从缓存加载: {Path(pdf_path).name}")
                 except Exception as e:
                     logger.warning(f"⚠️ 缓存加载失败，将重新解析: {Path(pdf_path).name}, 错误: {e}")
@@ -201,57 +463,39 @@ class PDFParser:
             else:
                 files_to_parse.append(pdf_path)
         
-        parsed_results = cached_results.copy()
-        
-        # 并行处理需要解析的文件
+        # 先提交需要解析的文件，再返回缓存结果，下游处理缓存结果时解析已在并行进行
+        pending = iter(())
         if files_to_parse:
-            logger.info(f"🔄 需要解析 {len(files_to_parse)} 个文件（并行处理，最大线程数: {max_workers}）")
-            
-            def parse_single(pdf_path):
-                """单个PDF解析任务"""
-                try:
-                    result = self._convert_single_pdf(pdf_path, self.md_output_dir, use_cache=False)
-                    logger.info(f"✓ 成功解析: {Path(pdf_path).name}")
-                    return result
-                except Exception as e:
-                    error_msg = f"解析{pdf_path}失败: {str(e)}"
-                    logger.error(f"❌ {error_msg}", exc_info=True)
-                    return {
-                        "pdf_path": pdf_path,
-                        "markdown_path": None,
-                        "content": "",
-                        "figures": [],
-                        "page_images": [],
-                        "status": "failed",
-                        "error": str(e)
-                    }
-            
-            # 使用线程池并行处理
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # 提交所有任务
-                future_to_pdf = {
-                    executor.submit(parse_single, pdf_path): pdf_path 
-                    for pdf_path in files_to_parse
-                }
-                
-                # 收集结果
-                for future in as_completed(future_to_pdf):
-                    pdf_path = future_to_pdf[future]
-                    try:
-                        result = future.result()
-                        parsed_results.append(result)
-                    except Exception as e:
-                        logger.error(f"❌ 处理 {Path(pdf_path).name} 时出错: {e}")
-                parsed_results.append({
-                    "pdf_path": pdf_path,
-                    "markdown_path": None,
-                    "content": "",
-                    "figures": [],
-                    "page_images": [],
-                    "status": "failed",
-                    "error": str(e)
-                })
+            backend = backend or os.environ.get("PDF_PARSE_BACKEND", "process")
+            if backend == "process" and len(files_to_parse) > 1:
+                pending = self._iter_with_processes(files_to_parse, max_workers, sections)
+            else:
+                pending = self._iter_with_threads(files_to_parse, max_workers, sections)
+        
+        yield from cached_results
+        yield from pending
+    
+    def parse_files(self, pdf_files: List[str], max_workers: int = 4, use_cache: bool = True,
+                    backend: str = None, sections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        解析一组PDF文件（先查缓存，其余并行解析）
+        
+        Args:
+            pdf_files: PDF文件路径列表
+            max_workers: 最大并行工作进程/线程数（默认4）
+            use_cache: 是否使用缓存（默认True）
+            backend: "process"（进程池，默认，可用 PDF_PARSE_BACKEND 配置）或 "thread"
+            sections: 只解析这些章节所在的页（默认整篇，可用 PDF_PARSE_SECTIONS 配置，逗号分隔）
         
+        Returns:
+            每个PDF的解析结果
+        """
+        return list(self.iter_parse(pdf_files, max_workers=max_workers, use_cache=use_cache,
+                                    backend=backend, sections=sections))
+    
+    @staticmethod
+    def apply_results(state: State, parsed_results: List[Dict[str, Any]]) -> State:
+        """把解析结果合并进状态（parsed_multimodal_content / errors）"""
         # 更新状态
         if "parsed_multimodal_content" in state and state["parsed_multimodal_content"]:
             state["parsed_multimodal_content"].extend(parsed_results)
@@ -272,3 +516,31 @@ class PDFParser:
         logger.info(f"✅ PDF解析完成: 成功 {success_count}/{len(parsed_results)} 个文件 (其中 {cached_count} 个使用缓存)")
         
         return state
+    
+    def run(self, state: State, max_workers: int = 4, use_cache: bool = True, backend: str = None,
+            sections: Optional[List[str]] = None) -> State:
+        """
+        执行PDF解析流程（支持并行处理和缓存）
+        
+        Args:
+            state: 状态字典
+            max_workers: 最大并行工作进程/线程数（默认4）
+            use_cache: 是否使用缓存（默认True）
+            backend: "process"（进程池，默认，可用 PDF_PARSE_BACKEND 配置）或 "thread"
+            sections: 只解析这些章节所在的页（None 表示整篇）
+        
+        Returns:
+            更新后的状态字典
+        """
+        logger.info("🚀 开始PDF解析流程（并行模式）")
+        
+        pdf_files = state.get("downloaded_papers", [])
+        if not pdf_files:
+            logger.warning("⚠️ 未找到需要解析的PDF文件")
+            return state
+        
+        logger.info(f"📚 发现 {len(pdf_files)} 个PDF文件")
+        
+        parsed_results = self.parse_files(pdf_files, max_workers=max_workers, use_cache=use_cache,
+                                          backend=backend, sections=sections)
+        return self.apply_results(state, parsed_results)
@@ -1,16 +1,19 @@
 """PDF parser tools for literature parsing workflow"""
 import os
 import logging
-from typing import Optional, Type
+from typing import List, Optional, Type
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from tools.pdf_parser import PDFParser
+from tools.converter_service import get_converter_client
 from common.utils import get_pdf_files
 from utils.state import State
-import json
-from langchain_core.load import dumps, loads
+from utils.artifact_store import get_artifact_store, tool_call_key
 from loguru import logger
 
+# 解析结果写入产物存储的键（按 tool_call_id 区分，见 tool_call_key；由 SimpleToolNode._handle_tool_result 取回并合并进状态）
+PARSE_RESULT_KEYS = ("parsed_multimodal_content", "downloaded_papers", "errors")
+
 # Suppress docling INFO logs - only show WARNING and above
 logging.getLogger("docling").setLevel(logging.WARNING)
 logging.getLogger("docling_core").setLevel(logging.WARNING)
@@ -29,6 +32,13 @@ class PDFParserToolInput(BaseModel):
         default=False,
         description="Whether to enable formula enrichment (default False, as it's very slow)."
     )
+    sections: Optional[List[str]] = Field(
+        default=None,
+        description=(
+            "Only parse the pages covering these sections, e.g. [\"abstract\", \"introduction\", \"method\"]. "
+            "Omit to parse the whole paper. Remaining pages can be filled in by a later call."
+        )
+    )
 
 
 class PDFParserTool(BaseTool):
@@ -38,7 +48,8 @@ class PDFParserTool(BaseTool):
         "A tool that parses PDF files and converts them to markdown format with extracted images. "
         "You MUST use this tool to parse PDF files before generating summaries. "
         "Required parameter: pdf_path (path to PDF file or directory containing PDF files). "
-        "Optional parameter: enable_formula_enrichment (default False, as it's very slow)."
+        "Optional parameters: enable_formula_enrichment (default False, as it's very slow), "
+        "sections (only parse the pages of the listed sections, e.g. abstract/introduction/method)."
     )
     args_schema: Type[BaseModel] = PDFParserToolInput
     state: dict = dict()
@@ -49,12 +60,17 @@ class PDFParserTool(BaseTool):
         super(PDFParserTool, self).__init__()
         self.pdf_dir = pdf_dir
         self.md_output_dir = md_output_dir
-        self.state = state  # Store parsed state for tool node to access
+        self.state = state  # 保留兼容；解析结果按运行写入产物存储（utils/artifact_store）
         os.makedirs(self.pdf_dir, exist_ok=True)
         os.makedirs(self.md_output_dir, exist_ok=True)
 
-    def _run(self, pdf_path: str, enable_formula_enrichment: bool = False) -> str:
+    def _run(self, pdf_path: str, enable_formula_enrichment: bool = False, sections: Optional[List[str]] = None) -> str:
         """Parse PDF file(s) and convert to markdown format."""
+        # 结果写到本次调用专属的 key，同一消息中的多个解析调用互不覆盖；
+        # 未绑定 tool_call_id 时退回共享 key，先清掉旧结果，本次失败时节点不会误取
+        store = get_artifact_store()
+        for key in PARSE_RESULT_KEYS:
+            store.delete(tool_call_key(key))
         try:
             # If pdf_path is a file, use it directly; if it's a directory, use it as pdf_dir
             if os.path.isfile(pdf_path):
@@ -77,42 +93,30 @@ class PDFParserTool(BaseTool):
             
             logger.info(f"📚 发现 {len(pdf_files)} 个PDF文件")
 
+            # PDFParser 构造很轻，docling 模型由常驻的转换服务持有，跨调用只加载一次
             pdf_parser = PDFParser(actual_pdf_dir, self.md_output_dir, enable_formula_enrichment)
-            self.state["downloaded_papers"] = pdf_files
+            # 每次调用使用独立的状态，结果写入本次运行的产物存储（并发运行互不覆盖）
+            state = {"downloaded_papers": pdf_files, "errors": []}
 
             # Run parser with parallel processing and caching
             # 使用并行处理和缓存来加速
             max_workers = min(4, len(pdf_files))  # 最多4个并行线程
-            self.state = pdf_parser.run(self.state, max_workers=max_workers, use_cache=True)
-            success_count = sum(1 for r in self.state["parsed_multimodal_content"] if r.get("status") == "success")
-            result_msg = f"Successfully parsed {success_count}/{len(self.state['parsed_multimodal_content'])} PDF file(s). "
+            client = get_converter_client()
+            if client is not None:
+                # 本地守护进程可用时，由其转换（多个运行共享已加载的模型）
+                results = client.convert(pdf_files, self.md_output_dir, enable_formula_enrichment,
+                                         max_workers=max_workers, use_cache=True, sections=sections)
+                state = pdf_parser.apply_results(state, results)
+            else:
+                state = pdf_parser.run(state, max_workers=max_workers, use_cache=True, sections=sections)
+            success_count = sum(1 for r in state["parsed_multimodal_content"] if r.get("status") == "success")
+            result_msg = f"Successfully parsed {success_count}/{len(state['parsed_multimodal_content'])} PDF file(s). "
             result_msg += f"Markdown files saved to {self.md_output_dir}"
-            
-            # Prepare state for serialization: convert set to list
-            state_to_save = dict(self.state)
-            if "processed_papers" in state_to_save and isinstance(state_to_save["processed_papers"], set):
-                state_to_save["processed_papers"] = list(state_to_save["processed_papers"])
-            
-            # Save state to file
-            state_file_path = os.path.join(os.path.dirname(__file__), "..", "outputs", "state.json")
-            state_file_path = os.path.abspath(state_file_path)  # Get absolute path
-            os.makedirs(os.path.dirname(state_file_path), exist_ok=True)
-            
-            try:
-                with open(state_file_path, "w", encoding="utf-8") as f:
-                    f.write(dumps(state_to_save, indent=2))
-                logger.info(f"✅ State stored successfully to {state_file_path}")
-            except Exception as save_error:
-                logger.error(f"❌ Failed to save state with dumps: {str(save_error)}")
-                logger.exception(save_error)  # Log full traceback
-                # Try with json.dump as fallback (may fail if state contains non-serializable objects)
-                try:
-                    with open(state_file_path, "w", encoding="utf-8") as f:
-                        json.dump(state_to_save, f, indent=2, default=str, ensure_ascii=False)
-                    logger.info(f"✅ State stored using json.dump fallback")
-                except Exception as fallback_error:
-                    logger.error(f"❌ Failed to save state even with fallback: {str(fallback_error)}")
-                    logger.exception(fallback_error)  # Log full traceback
+
+            store.put(tool_call_key("downloaded_papers"), pdf_files)
+            store.put(tool_call_key("parsed_multimodal_content"), state["parsed_multimodal_content"])
+            store.put(tool_call_key("errors"), state["errors"])
+            logger.info(f"✅ 解析结果已写入产物存储 (run_id: {store.run_id})")
             return result_msg
         except Exception as e:
             try:
@@ -0,0 +1,165 @@
+"""
+基于文本层的章节定位（不跑 docling，只读取 PDF 自带的文本/目录）
+
+用于按章节解析：先用这一轮廉价的扫描找到各章节所在页，再只对需要的页码范围
+运行 docling 的版面/表格/图片流水线
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.search_utils import iter_pdf_pages
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# 规范化章节名 -> 可能出现的标题写法（小写）
+SECTION_ALIASES = {
+    "abstract": ("abstract",),
+    "introduction": ("introduction",),
+    "related_work": ("related work", "background", "preliminaries", "preliminary"),
+    "method": ("method", "methods", "methodology", "approach", "proposed method", "our approach",
+               "model", "framework"),
+    "experiments": ("experiment", "experiments", "evaluation", "experimental results", "results"),
+    "conclusion": ("conclusion", "conclusions", "discussion"),
+    "references": ("references", "bibliography"),
+    "appendix": ("appendix", "appendices", "supplementary material"),
+}
+
+# 章节编号（1 / 1. / 2.3 / IV. / A.）+ 标题
+HEADING_PATTERN = re.compile(
+    r"^\s*(?:(?:\d+(?:\.\d+)*|[IVX]+|[A-H])\.?\s+)?([A-Za-z][A-Za-z \-:&]{2,60}?)\s*:?\s*$"
+)
+
+PageRange = Tuple[int, int]
+
+
+def page_count(pdf_path: str) -> int:
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+    from PyPDF2 import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+
+def canonical_section(title: str) -> Optional[str]:
+    title = " ".join(title.lower().split())
+    for key, aliases in SECTION_ALIASES.items():
+        for alias in aliases:
+            # 允许 "Method: xxx" / "Proposed Method and Analysis" 这类稍长的标题
+            if title == alias or (title.startswith(alias + " ") and len(title) <= len(alias) + 30):
+                return key
+    return None
+
+
+def _sections_from_toc(pdf_path: str) -> Dict[str, int]:
+    if not PYMUPDF_AVAILABLE:
+        return {}
+    with fitz.open(pdf_path) as doc:
+        toc = doc.get_toc(simple=True)
+    pages = {}
+    for level, title, page in toc:
+        if level > 2 or page < 1:
+            continue
+        match = HEADING_PATTERN.match(title)
+        key = canonical_section(match.group(1) if match else title)
+        if key and key not in pages:
+            pages[key] = page
+    return pages
+
+
+def locate_sections(pdf_path: str) -> Dict[str, int]:
+    """
+    定位各章节的起始页（1-based）
+
+    优先使用 PDF 自带的目录（书签），没有目录时逐页扫描文本层中的标题行
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        {规范化章节名: 起始页}，只包含找到的章节
+    """
+    pages = _sections_from_toc(pdf_path)
+    if len(pages) >= 2:
+        return pages
+
+    pages = {}
+    for page_num, text in enumerate(iter_pdf_pages(pdf_path), start=1):
+        for line in text.splitlines():
+            if len(line) > 80:
+                continue
+            match = HEADING_PATTERN.match(line)
+            if not match:
+                continue
+            key = canonical_section(match.group(1))
+            if key and key not in pages:
+                pages[key] = page_num
+    # 摘要总在第一页附近，没有单独的标题时也从第一页开始
+    pages.setdefault("abstract", 1)
+    return pages
+
+
+def merge_ranges(ranges: List[PageRange]) -> List[PageRange]:
+    """合并重叠或相邻的页码范围（闭区间）"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(ranges: List[PageRange], covered: List[PageRange]) -> List[PageRange]:
+    """从 ranges 中去掉已覆盖的页，返回剩余的页码范围"""
+    remaining = []
+    for start, end in merge_ranges(ranges):
+        cursor = start
+        for c_start, c_end in merge_ranges(covered):
+            if c_end < cursor or c_start > end:
+                continue
+            if c_start > cursor:
+                remaining.append((cursor, c_start - 1))
+            cursor = max(cursor, c_end + 1)
+        if cursor <= end:
+            remaining.append((cursor, end))
+    return remaining
+
+
+def ranges_for_sections(located: Dict[str, int], sections: List[str], total: int) -> List[PageRange]:
+    """
+    计算请求的章节对应的页码范围
+
+    每个章节从其起始页延伸到下一个已定位章节的起始页（章节边界常在页中间，因此包含该页）；
+    找不到的章节退化为参考文献之前的全部正文
+
+    Args:
+        located: locate_sections 的结果
+        sections: 规范化章节名列表，如 ["abstract", "introduction", "method"]
+        total: 总页数
+
+    Returns:
+        合并后的页码范围列表（1-based 闭区间）
+    """
+    starts = sorted(set(located.values()))
+    body_end = total
+    if located.get("references", 0) > 1:
+        body_end = located["references"]
+
+    ranges = []
+    for section in sections:
+        key = section.strip().lower().replace(" ", "_")
+        if key not in located:
+            logger.info(f"📑 未定位到章节 {section}，使用正文全部页面")
+            ranges.append((1, body_end))
+            continue
+        start = min(located[key], total)
+        following = [page for page in starts if page > start]
+        end = following[0] if following else body_end
+        ranges.append((start, max(start, min(end, total))))
+    return merge_ranges(ranges)
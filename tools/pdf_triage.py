@@ -0,0 +1,152 @@
+"""
+PDF 分级解析（triage）
+
+解析前用 PyMuPDF 廉价地检查每个 PDF（文本层覆盖率、位图数量、图/表标题数量），
+选择解析档位：
+- text:   文本层完整且没有图表，直接按文本层导出 markdown，不跑 docling
+- layout: 文本层完整但有图表，docling 版面/表格流水线，不保留整页图片
+- full:   文本层缺失或质量差（扫描件等），完整的多模态流水线
+"""
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from tools.pdf_sections import HEADING_PATTERN, canonical_section
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+TIER_TEXT = "text"
+TIER_LAYOUT = "layout"
+TIER_FULL = "full"
+TIERS = (TIER_TEXT, TIER_LAYOUT, TIER_FULL)
+
+# 每页至少这么多字符才算有文本层
+MIN_PAGE_CHARS = 200
+# 有文本层的页占比不低于该值才走快速档位
+MIN_TEXT_COVERAGE = 0.9
+# 小于该尺寸（像素）的位图视为 logo/图标，不计入图片数
+MIN_IMAGE_SIDE = 64
+
+_FIGURE_CAPTION = re.compile(r"^\s*(?:Figure|Fig\.)\s*\d+", re.IGNORECASE | re.MULTILINE)
+_TABLE_CAPTION = re.compile(r"^\s*Table\s*\d+", re.IGNORECASE | re.MULTILINE)
+# 编号的小节标题，如 "3.2 Training Objective"
+_NUMBERED_HEADING = re.compile(r"^\s*(\d+(?:\.\d+){0,2})\.?\s+([A-Z][^\n]{2,80})$")
+
+
+def triage_mode() -> str:
+    """PDF_TRIAGE: auto（默认，按文档自动选择）或固定档位 text / layout / full"""
+    mode = os.environ.get("PDF_TRIAGE", "auto").lower()
+    return mode if mode in TIERS else "auto"
+
+
+def inspect_pdf(pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """
+    统计文本层覆盖率、位图数量、图/表标题数量
+
+    Args:
+        pdf_path: PDF文件路径
+        page_range: 只统计这些页（1-based 闭区间）
+
+    Returns:
+        {"pages", "text_pages", "text_coverage", "images", "figure_captions", "table_captions"}
+    """
+    stats = {"pages": 0, "text_pages": 0, "images": 0, "figure_captions": 0, "table_captions": 0}
+    with fitz.open(pdf_path) as doc:
+        start, end = page_range or (1, len(doc))
+        for page_num in range(start - 1, min(end, len(doc))):
+            page = doc[page_num]
+            text = page.get_text("text")
+            stats["pages"] += 1
+            if len(text.strip()) >= MIN_PAGE_CHARS:
+                stats["text_pages"] += 1
+            stats["figure_captions"] += len(_FIGURE_CAPTION.findall(text))
+            stats["table_captions"] += len(_TABLE_CAPTION.findall(text))
+            for image in page.get_images(full=True):
+                # (xref, smask, width, height, ...)
+                if image[2] >= MIN_IMAGE_SIDE and image[3] >= MIN_IMAGE_SIDE:
+                    stats["images"] += 1
+    stats["text_coverage"] = stats["text_pages"] / stats["pages"] if stats["pages"] else 0.0
+    return stats
+
+
+def choose_tier(pdf_path: str, enable_formula_enrichment: bool = False,
+                page_range: Optional[Tuple[int, int]] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    为PDF选择解析档位
+
+    Args:
+        pdf_path: PDF文件路径
+        enable_formula_enrichment: 启用公式识别时不走纯文本档位（公式需要 docling 识别）
+        page_range: 只考虑这些页
+
+    Returns:
+        (档位, 统计信息)
+    """
+    mode = triage_mode()
+    if not PYMUPDF_AVAILABLE:
+        return (TIER_FULL if mode in ("auto", TIER_TEXT) else mode), {"reason": "PyMuPDF unavailable"}
+    if mode != "auto":
+        return mode, {"mode": mode}
+
+    try:
+        stats = inspect_pdf(pdf_path, page_range)
+    except Exception as e:
+        logger.warning(f"PDF 分级检查失败，使用完整流水线: {e}")
+        return TIER_FULL, {"reason": str(e)}
+
+    if stats["text_coverage"] < MIN_TEXT_COVERAGE:
+        tier = TIER_FULL
+    elif stats["images"] or stats["figure_captions"] or stats["table_captions"] or enable_formula_enrichment:
+        tier = TIER_LAYOUT
+    else:
+        tier = TIER_TEXT
+    logger.info(f"📋 {Path(pdf_path).name}: 档位 {tier} (文本层 {stats['text_coverage']:.0%}, "
+                f"图片 {stats['images']}, 图标题 {stats['figure_captions']}, 表标题 {stats['table_captions']})")
+    return tier, stats
+
+
+def _block_to_markdown(text: str) -> str:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return ""
+    if len(lines) == 1 and len(lines[0]) <= 80:
+        line = lines[0]
+        numbered = _NUMBERED_HEADING.match(line)
+        if numbered:
+            level = min(numbered.group(1).count(".") + 2, 4)
+            return f"{'#' * level} {line}"
+        match = HEADING_PATTERN.match(line)
+        if match and canonical_section(match.group(1)):
+            return f"## {line}"
+    # 合并被换行拆开的单词
+    return re.sub(r"(?<=[a-z])-\s+(?=[a-z])", "", " ".join(lines))
+
+
+def extract_text_markdown(pdf_path: str, md_file: Path, page_range: Optional[Tuple[int, int]] = None):
+    """
+    快速档位：直接按文本层导出 markdown（按文本块分段，章节标题转为 markdown 标题）
+
+    Args:
+        pdf_path: PDF文件路径
+        md_file: 输出的 markdown 文件
+        page_range: 只导出这些页（1-based 闭区间）
+    """
+    paragraphs = []
+    with fitz.open(pdf_path) as doc:
+        start, end = page_range or (1, len(doc))
+        for page_num in range(start - 1, min(end, len(doc))):
+            # blocks: (x0, y0, x1, y1, text, block_no, block_type)，block_type 0 为文本
+            for block in doc[page_num].get_text("blocks", sort=True):
+                if block[6] != 0:
+                    continue
+                paragraph = _block_to_markdown(block[4])
+                if paragraph:
+                    paragraphs.append(paragraph)
+    Path(md_file).write_text("\n\n".join(paragraphs) + "\n", encoding="utf-8")
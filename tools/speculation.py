@@ -0,0 +1,114 @@
+"""
+推测式数据集检索
+
+数据集检索与下载只依赖想法本身，与文献核验的结论无关。想法一产生就在后台线程中
+对状态副本执行 数据集检索 -> 下载，与文献核验并行；流程走到数据集阶段时：
+- 后台任务对应的仍是当前想法：等待它完成并合并结果，省去一整段串行耗时
+- 想法已被否决并重新生成：旧任务的结果直接丢弃；检索完成时已被丢弃的任务不再下载
+  （已开始的下载无法中断，只是不再使用）
+后台任务失败时由数据集阶段按原流程串行重做。
+"""
+import os
+import copy
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+# 合并回主状态的字段（消息另行追加）
+RESULT_KEYS = ("dataset", "input_data_path", "dataset_url", "download_status")
+# 数据集检索子图（track_node_call）原地修改的可变字段，状态副本中深拷贝，不与主线程共享
+MUTABLE_KEYS = ("node_call_stack", "resume_node_call_stack")
+
+
+def _idea_key(state: Dict[str, Any]) -> str:
+    return hashlib.sha1(str(state.get("new_idea") or "").encode("utf-8")).hexdigest()
+
+
+class SpeculativeDatasetSearch:
+    def __init__(self, search_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 download_fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        """
+        Args:
+            search_fn: 数据集检索节点（写入 state["dataset"]）
+            download_fn: 数据集下载节点（写入 state["input_data_path"] 等）
+        """
+        self.search_fn = search_fn
+        self.download_fn = download_fn
+        self._lock = threading.Lock()
+        self._job: Optional[Dict[str, Any]] = None
+
+    def start(self, state: Dict[str, Any]):
+        """为当前想法启动后台检索；同一想法已有任务时不重复启动"""
+        key = _idea_key(state)
+        with self._lock:
+            if self._job is not None:
+                if self._job["key"] == key:
+                    return
+                logger.info("💨 想法已变化，丢弃上一轮推测的数据集检索")
+            # 状态副本：消息列表单独复制；节点快照（track_node_call）写到单独的目录，避免与主流程并发写同一文件
+            # 模型调用记录与前端消息仍写在 config.save_path 下，由各自的写入方保证并发安全
+            spec_state = dict(state)
+            spec_state["messages"] = list(state.get("messages") or [])
+            for mutable_key in MUTABLE_KEYS:
+                if mutable_key in state:
+                    spec_state[mutable_key] = copy.deepcopy(state[mutable_key])
+            if state.get("save_path"):
+                spec_state["save_path"] = os.path.join(state["save_path"], "speculative")
+                os.makedirs(spec_state["save_path"], exist_ok=True)
+            job = {"key": key, "state": spec_state, "base_len": len(spec_state["messages"]),
+                   "done": threading.Event(), "error": None}
+            job["thread"] = threading.Thread(target=self._run, args=(job,), name="dataset-speculation", daemon=True)
+            self._job = job
+        logger.info("🚀 推测式数据集检索已启动（与文献核验并行）")
+        job["thread"].start()
+
+    def _run(self, job: Dict[str, Any]):
+        try:
+            job["state"] = self.search_fn(job["state"])
+            # 检索期间想法可能已被否决：旧任务不再下载，避免与新任务写同一下载目录
+            with self._lock:
+                if self._job is not job:
+                    logger.info("💨 推测的数据集检索已被丢弃，跳过下载")
+                    return
+            job["state"] = self.download_fn(job["state"])
+        except Exception as e:
+            logger.warning(f"推测式数据集检索失败，将在数据集阶段重试: {e}")
+            job["error"] = e
+        finally:
+            job["done"].set()
+
+    def discard(self):
+        with self._lock:
+            self._job = None
+
+    def take(self, state: Dict[str, Any]) -> bool:
+        """
+        若后台任务对应当前想法，等待其完成并把结果合并进 state
+
+        Returns:
+            是否使用了推测结果（False 时调用方按原流程检索与下载）
+        """
+        with self._lock:
+            job = self._job
+            if job is None or job["key"] != _idea_key(state):
+                self._job = None
+                return False
+        # 等待期间任务仍登记为当前任务，_run 据此继续下载
+        if not job["done"].is_set():
+            logger.info("⏳ 等待推测式数据集检索完成")
+        job["done"].wait()
+        with self._lock:
+            if self._job is job:
+                self._job = None
+        spec_state = job["state"]
+        if job["error"] is not None or not spec_state.get("input_data_path"):
+            return False
+
+        for key in RESULT_KEYS:
+            if key in spec_state:
+                state[key] = spec_state[key]
+        state["messages"].extend(spec_state["messages"][job["base_len"]:])
+        logger.info(f"✅ 使用推测式检索的数据集: {state.get('input_data_path')}")
+        return True
@@ -0,0 +1,149 @@
+"""
+Map-reduce 文献总结
+
+原先总结阶段把所有论文全文拼接进一个 prompt，prompt 长度、延迟和截断风险随论文数线性增长。这里改为：
+- map：每篇论文单独生成结构化笔记（并发，受提供商限制器约束），按 (论文哈希, prompt 版本) 缓存
+- reduce：笔记数超过 fan-in 时按组合并（树形归约，每层并发），直到不超过 fan-in
+- 最终由原有的总结 prompt 把笔记写成 SummaryWriterTool 需要的 Introduction / Related Works 报告
+"""
+import os
+import re
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from langchain_core.messages import HumanMessage
+
+from tools.markdown_store import resolve_content
+from utils.rate_limit import get_provider_limiter
+
+PROMPT_DIR = os.path.join(os.path.dirname(__file__), "..", "prompt")
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "summaries")
+
+# 参考文献之后的内容对总结没有帮助，map 前截掉
+_REFERENCES_HEADING = re.compile(r"^#{1,3}\s*(?:\d+\.?\s*)?(?:references|bibliography)\s*$",
+                                 re.IGNORECASE | re.MULTILINE)
+
+
+def _load_prompt(name: str) -> str:
+    with open(os.path.join(PROMPT_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _response_text(response) -> str:
+    content = response.content if hasattr(response, "content") else response
+    text = content if isinstance(content, str) else str(content)
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE).strip()
+
+
+class MapReduceSummarizer:
+    def __init__(self, llm, map_prompt: str = None, merge_prompt: str = None, fan_in: int = None,
+                 max_workers: int = None, max_paper_chars: int = None, cache_dir: str = None,
+                 provider: str = None):
+        """
+        Args:
+            llm: 语言模型（不要绑定工具，map / merge 只需要文本输出）
+            map_prompt: 单篇笔记 prompt，含 {paper_id} {paper_content}（默认 prompt/paperSummaryMap.md）
+            merge_prompt: 合并笔记 prompt，含 {notes}（默认 prompt/paperSummaryMerge.md）
+            fan_in: 每次合并/最终总结最多接收的笔记数（默认 SUMMARY_FAN_IN 或 8）
+            max_workers: 并发调用数（默认 SUMMARY_MAP_WORKERS 或 4）
+            max_paper_chars: 单篇论文送入 map 的最大字符数（默认 SUMMARY_MAP_MAX_CHARS 或 60000）
+            cache_dir: 笔记缓存目录（默认 SUMMARY_CACHE_DIR 或 outputs/cache/summaries）
+            provider: 模型提供商，用于共享限流（默认 SUMMARY_PROVIDER 或 deepseek）
+        """
+        self.llm = llm
+        self.map_prompt = map_prompt or _load_prompt("paperSummaryMap.md")
+        self.merge_prompt = merge_prompt or _load_prompt("paperSummaryMerge.md")
+        self.fan_in = max(2, fan_in or int(os.environ.get("SUMMARY_FAN_IN", 8)))
+        self.max_workers = max_workers or int(os.environ.get("SUMMARY_MAP_WORKERS", 4))
+        self.max_paper_chars = max_paper_chars or int(os.environ.get("SUMMARY_MAP_MAX_CHARS", 60000))
+        self.cache_dir = Path(cache_dir or os.environ.get("SUMMARY_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.provider = provider or os.environ.get("SUMMARY_PROVIDER", "deepseek")
+        # prompt 改动后旧笔记自动失效
+        self.prompt_version = hashlib.sha1(self.map_prompt.encode("utf-8")).hexdigest()[:12]
+
+    def _invoke(self, prompt: str) -> str:
+        response = get_provider_limiter(self.provider).call(self.llm.invoke, [HumanMessage(content=prompt)])
+        return _response_text(response)
+
+    def _paper_text(self, item: Dict[str, Any]) -> str:
+        text = resolve_content(item)
+        match = _REFERENCES_HEADING.search(text)
+        if match and match.start() > len(text) // 3:
+            text = text[:match.start()]
+        return text[:self.max_paper_chars]
+
+    def summarize_paper(self, item: Dict[str, Any]) -> Optional[str]:
+        """
+        生成（或从缓存读取）单篇论文的笔记
+
+        Args:
+            item: 解析结果（parsed_multimodal_content 中的一项）
+
+        Returns:
+            笔记文本；论文没有可用内容时返回 None
+        """
+        paper_id = os.path.splitext(os.path.basename(item.get("pdf_path", "")))[0] or "unknown"
+        handle = item.get("markdown") or {}
+        text = None
+        paper_hash = handle.get("sha256")
+        if not paper_hash:
+            text = self._paper_text(item)
+            if not text:
+                return None
+            paper_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        cache_file = self.cache_dir / f"{paper_hash}_{self.prompt_version}.md"
+        if cache_file.exists():
+            logger.info(f"⚡ 论文笔记命中缓存: {paper_id}")
+            return cache_file.read_text(encoding="utf-8")
+
+        text = text if text is not None else self._paper_text(item)
+        if not text:
+            return None
+        notes = self._invoke(self.map_prompt.format(paper_id=paper_id, paper_content=text))
+        tmp_path = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(notes, encoding="utf-8")
+        os.replace(tmp_path, cache_file)
+        logger.info(f"📝 论文笔记已生成: {paper_id}")
+        return notes
+
+    def map(self, parsed_items: List[Dict[str, Any]]) -> List[str]:
+        """并发生成所有成功解析的论文的笔记（按输入顺序返回，失败的跳过）"""
+        items = [item for item in parsed_items if item.get("status") == "success"]
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = [executor.submit(self.summarize_paper, item) for item in items]
+        notes = []
+        for item, future in zip(items, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"❌ 生成论文笔记失败 {os.path.basename(item.get('pdf_path', ''))}: {e}")
+                continue
+            if result:
+                notes.append(result)
+        return notes
+
+    def reduce(self, notes: List[str]) -> List[str]:
+        """树形归约：每 fan_in 条笔记合并为一条，直到不超过 fan_in"""
+        level = 0
+        while len(notes) > self.fan_in:
+            level += 1
+            groups = [notes[i:i + self.fan_in] for i in range(0, len(notes), self.fan_in)]
+            logger.info(f"🔗 合并笔记（第 {level} 层）: {len(notes)} -> {len(groups)}")
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+                notes = list(executor.map(
+                    lambda group: group[0] if len(group) == 1 else
+                    self._invoke(self.merge_prompt.format(notes="\n\n---\n\n".join(group))),
+                    groups
+                ))
+        return notes
+
+    def literature_content(self, parsed_items: List[Dict[str, Any]]) -> str:
+        """map + reduce，返回可直接填入总结 prompt {literature_content} 的笔记"""
+        return "\n\n---\n\n".join(self.reduce(self.map(parsed_items)))
@@ -0,0 +1,208 @@
+"""
+按运行（run_id）隔离的产物存储
+
+节点之间通过 key 读写中间产物（如 parsed_multimodal_content），不再整体序列化状态到
+共享的 outputs/state.json：
+- 默认只保存在进程内存中
+- 序列化后超过 ARTIFACT_SPILL_BYTES（默认 0，不溢出）的值写入 SQLite，内存中不再保留
+- 每个运行有独立的命名空间，并发运行互不覆盖
+
+工具在 SimpleToolNode 中执行时，当前运行的 run_id 通过 bind_run 绑定到上下文，
+工具内部调用 get_artifact_store() 即可拿到本次运行的存储；当前工具调用的 tool_call_id
+通过 bind_tool_call 绑定，同一消息中并发的多个调用据此把结果写到各自的 key 下
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from langchain_core.load import dumps, loads
+
+DEFAULT_SPILL_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "artifacts.sqlite")
+
+_current_run_id = contextvars.ContextVar("artifact_run_id", default=None)
+_current_tool_call_id = contextvars.ContextVar("artifact_tool_call_id", default=None)
+# 溢出到 SQLite 的值在内存中的占位
+_SPILLED = object()
+
+
+def new_run_id() -> str:
+    return f"run_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def ensure_run_id(state: Dict[str, Any]) -> str:
+    """返回状态中的 run_id，没有时生成一个并写回状态"""
+    if not state.get("run_id"):
+        state["run_id"] = new_run_id()
+    return state["run_id"]
+
+
+@contextmanager
+def bind_run(run_id: str):
+    """在当前上下文中绑定 run_id（供不接收 state 的工具使用）"""
+    token = _current_run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _current_run_id.reset(token)
+
+
+@contextmanager
+def bind_tool_call(tool_call_id: Optional[str]):
+    """在当前上下文中绑定 tool_call_id（供工具把结果写到本次调用专属的 key）"""
+    token = _current_tool_call_id.set(tool_call_id or None)
+    try:
+        yield
+    finally:
+        _current_tool_call_id.reset(token)
+
+
+def tool_call_key(key: str, tool_call_id: str = None) -> str:
+    """
+    本次工具调用专属的产物 key
+
+    Args:
+        key: 产物名
+        tool_call_id: 工具调用 ID（默认 bind_tool_call 绑定的当前调用；都没有时返回 key 本身）
+    """
+    tool_call_id = tool_call_id or _current_tool_call_id.get()
+    return f"{key}@{tool_call_id}" if tool_call_id else key
+
+
+class _SpillDB:
+    """所有运行共享的 SQLite 溢出库"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "run_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (run_id, key))"
+            )
+
+    def put(self, run_id: str, key: str, payload: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (run_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, key, payload, time.time())
+            )
+
+    def get(self, run_id: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE run_id = ? AND key = ?", (run_id, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, run_id: str, key: str = None):
+        with self._lock, self._conn:
+            if key is None:
+                self._conn.execute("DELETE FROM artifacts WHERE run_id = ?", (run_id,))
+            else:
+                self._conn.execute("DELETE FROM artifacts WHERE run_id = ? AND key = ?", (run_id, key))
+
+
+class ArtifactStore:
+    def __init__(self, run_id: str, spill_bytes: int = None, spill_path: str = None):
+        """
+        Args:
+            run_id: 运行 ID
+            spill_bytes: 序列化后超过该大小的值写入 SQLite（默认 ARTIFACT_SPILL_BYTES 或 0，表示不溢出）
+            spill_path: SQLite 文件路径（默认 ARTIFACT_STORE_PATH 或 outputs/cache/artifacts.sqlite）
+        """
+        self.run_id = run_id
+        self.spill_bytes = spill_bytes if spill_bytes is not None else int(os.environ.get("ARTIFACT_SPILL_BYTES", 0))
+        self.spill_path = spill_path or os.environ.get("ARTIFACT_STORE_PATH", DEFAULT_SPILL_PATH)
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _spill_db(self) -> _SpillDB:
+        if self._db is None:
+            self._db = _get_spill_db(self.spill_path)
+        return self._db
+
+    def put(self, key: str, value: Any):
+        """写入产物（同一 key 覆盖旧值）"""
+        if self.spill_bytes > 0:
+            payload = dumps(value)
+            if len(payload) > self.spill_bytes:
+                self._spill_db().put(self.run_id, key, payload)
+                with self._lock:
+                    self._values[key] = _SPILLED
+                logger.debug(f"产物 {key} ({len(payload)} bytes) 已写入 {self.spill_path}")
+                return
+        with self._lock:
+            previous = self._values.get(key)
+            self._values[key] = value
+        if previous is _SPILLED:
+            self._spill_db().delete(self.run_id, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._values.get(key, default)
+        if value is _SPILLED:
+            payload = self._spill_db().get(self.run_id, key)
+            return loads(payload) if payload is not None else default
+        return value
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return key in self._values
+
+    def delete(self, key: str):
+        with self._lock:
+            value = self._values.pop(key, None)
+        if value is _SPILLED:
+            self._spill_db().delete(self.run_id, key)
+
+    def clear(self):
+        with self._lock:
+            spilled = any(value is _SPILLED for value in self._values.values())
+            self._values.clear()
+        if spilled:
+            self._spill_db().delete(self.run_id)
+
+
+_spill_dbs: Dict[str, _SpillDB] = {}
+_stores: Dict[str, ArtifactStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _get_spill_db(path: str) -> _SpillDB:
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _spill_dbs:
+            _spill_dbs[path] = _SpillDB(path)
+        return _spill_dbs[path]
+
+
+def get_artifact_store(run_id: str = None) -> ArtifactStore:
+    """
+    获取某次运行的产物存储
+
+    Args:
+        run_id: 运行 ID；为 None 时使用 bind_run 绑定的当前运行，都没有时使用 "default"
+    """
+    run_id = run_id or _current_run_id.get() or "default"
+    with _stores_lock:
+        if run_id not in _stores:
+            _stores[run_id] = ArtifactStore(run_id)
+        return _stores[run_id]
+
+
+def release_artifact_store(run_id: str):
+    """运行结束后释放其产物（包括溢出到 SQLite 的部分）"""
+    with _stores_lock:
+        store = _stores.pop(run_id, None)
+    if store is not None:
+        store.clear()
@@ -51,6 +51,7 @@ class DatasetInfo:
     url: str
     tags: List[str]
     is_public: bool
+    version: Optional[int] = None  # 当前版本号（登记表据此判断本地副本是否过期）
 
 class KaggleSearcher:
     """使用官方API的Kaggle搜索模块（彻底移除dataset_metadata）"""
@@ -95,7 +96,8 @@ class KaggleSearcher:
                     votes=getattr(ds, 'votes', 0) or 0,
                     url=f"https://www.kaggle.com/datasets/{ds.ref}",
                     tags=[],  # 无可靠方式获取，留空
-                    is_public=True  # 搜索结果默认是公开数据集
+                    is_public=True,  # 搜索结果默认是公开数据集
+                    version=getattr(ds, 'current_version_number', None) or getattr(ds, 'currentVersionNumber', None)
                 )
                 datasets.append(dataset)
             except Exception as e:
@@ -103,26 +105,29 @@ class KaggleSearcher:
                 continue
         return datasets
 
+    @staticmethod
+    def score_dataset(dataset: DatasetInfo, keyword: str) -> float:
+        """数据集与关键词的匹配得分（标题包含完整关键词即得 50 分以上）"""
+        keyword_lower = keyword.lower()
+        score = 0
+        # 标题匹配
+        if keyword_lower in dataset.title.lower():
+            score += 50
+        if keyword_lower == dataset.title.lower():
+            score += 50
+        # 描述匹配（基于标题的描述）
+        if keyword_lower in dataset.description.lower():
+            score += 20
+        # 受欢迎程度
+        score += min(dataset.downloads / 1000, 15)
+        score += min(dataset.votes / 100, 10)
+        return score
+
     def select_best_match(self, datasets: List[DatasetInfo], keyword: str) -> Optional[DatasetInfo]:
         """选择最佳匹配"""
         if not datasets:
             return None
-        keyword_lower = keyword.lower()
-        scored_datasets = []
-        for dataset in datasets:
-            score = 0
-            # 标题匹配
-            if keyword_lower in dataset.title.lower():
-                score += 50
-            if keyword_lower == dataset.title.lower():
-                score += 50
-            # 描述匹配（基于标题的描述）
-            if keyword_lower in dataset.description.lower():
-                score += 20
-            # 受欢迎程度
-            score += min(dataset.downloads / 1000, 15)
-            score += min(dataset.votes / 100, 10)
-            scored_datasets.append((score, dataset))
+        scored_datasets = [(self.score_dataset(dataset, keyword), dataset) for dataset in datasets]
         scored_datasets.sort(reverse=True, key=lambda x: x[0])
         return scored_datasets[0][1]
 
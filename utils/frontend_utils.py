@@ -4,12 +4,16 @@ from datetime import datetime
 import pandas as pd
 import os
 import json
+import threading
 from loguru import logger
 
 from utils.config import Config
 
 current_node = ""
 last_message = None
+# 主流程与后台线程（推测式数据集检索）会同时写消息文件，读-改-写及去重用的全局变量都需要串行
+# （可重入：frontend_add_message 持锁时再调用 _save_message）
+_messages_lock = threading.RLock()
 
 tool_show_message = {
     "search_academicPapers_from_AriXv": "Searching Arxiv for **{query}**",
@@ -22,6 +26,13 @@ def _get_messages_file_path(config: Config):
     os.makedirs(streamlit_dir, exist_ok=True)
     return os.path.join(streamlit_dir, "messages.json")
 
+def _dump_json(path: str, data: list):
+    """先写临时文件再替换，避免读到写了一半的文件"""
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 def _save_message(config: Config, message_data: dict):
     """保存消息到JSON文件，只保留最新的30条消息"""
     messages_file = _get_messages_file_path(config)
@@ -29,31 +40,30 @@ def _save_message(config: Config, message_data: dict):
     if not message_file_all:
         return
     
-    messages = []
-    if os.path.exists(message_file_all):
+    with _messages_lock:
+        messages = []
+        if os.path.exists(message_file_all):
+            try:
+                with open(message_file_all, 'r') as f:
+                    messages = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to read messages file: {e}")
+                messages = []
+        
+        # 添加新消息
+        messages.append(message_data)
+        
+        # 保存回文件
         try:
-            with open(message_file_all, 'r') as f:
-                messages = json.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to read messages file: {e}")
-            messages = []
-    
-    # 添加新消息
-    messages.append(message_data)
-    
-    # 保存回文件
-    try:
-        with open(messages_file, 'w') as f:
             show_messages = messages[-30:] if len(messages) > 30 else messages
-            json.dump(show_messages, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save message to file: {e}")
-        
-    try:
-        with open(message_file_all, 'w') as f:
-            json.dump(messages, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save message to file: {e}")
+            _dump_json(messages_file, show_messages)
+        except Exception as e:
+            logger.error(f"Failed to save message to file: {e}")
+            
+        try:
+            _dump_json(message_file_all, messages)
+        except Exception as e:
+            logger.error(f"Failed to save message to file: {e}")
 
 def frontend_add_message(new_message: Union[ToolMessage, HumanMessage, AIMessage], config: Config):
     if not config:
@@ -61,48 +71,49 @@ def frontend_add_message(new_message: Union[ToolMessage, HumanMessage, AIMessage
     
     global current_node, last_message
 
-    if new_message == last_message:
-        return
-    
-    last_message = new_message[-1] if isinstance(new_message, list) else new_message
-    if last_message.content.strip():
-        if isinstance(last_message, ToolMessage):
-            role = "tool"
-            title = ""
-            content = ""
+    with _messages_lock:
+        if new_message == last_message:
             return
-        elif isinstance(last_message, HumanMessage):
-            role = "user"
-            title = "Agent"
-            content = last_message.content
-        elif isinstance(last_message, AIMessage):
-            role = "assistant"
-            title = "deepseek-chat"
-            content = last_message.content
-        else:
-            role = "assistant"
-            title = ""
-            content = last_message.content
+    
+        last_message = new_message[-1] if isinstance(new_message, list) else new_message
+        if last_message.content.strip():
+            if isinstance(last_message, ToolMessage):
+                role = "tool"
+                title = ""
+                content = ""
+                return
+            elif isinstance(last_message, HumanMessage):
+                role = "user"
+                title = "Agent"
+                content = last_message.content
+            elif isinstance(last_message, AIMessage):
+                role = "assistant"
+                title = "deepseek-chat"
+                content = last_message.content
+            else:
+                role = "assistant"
+                title = ""
+                content = last_message.content
 
-        try:
-            message_data = {
-                "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d"),
-                "type": "message",
-                "role": role,
-                "title": title,
-                "content": new_message.content
-            }
-        except:
-            message_data = {
-                "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d"),
-                "type": "message",
-                "role": role,
-                "title": title,
-                "content": content
-            }
-        _save_message(config, message_data)
-    else:
-        logger.warning("Empty message content...", new_message)
+            try:
+                message_data = {
+                    "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d"),
+                    "type": "message",
+                    "role": role,
+                    "title": title,
+                    "content": new_message.content
+                }
+            except:
+                message_data = {
+                    "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d"),
+                    "type": "message",
+                    "role": role,
+                    "title": title,
+                    "content": content
+                }
+            _save_message(config, message_data)
+        else:
+            logger.warning("Empty message content...", new_message)
 
 def frontend_add_tool_call(tool_name: str, tool_args: dict, config: Config):
     if not config:
@@ -0,0 +1,207 @@
+"""
+Kaggle 数据集的本地登记表
+
+KaggleDatasetTool 原先每次运行都对所有关键词策略重新调用 Kaggle API，并重新下载选中的数据集，
+再遍历整个下载目录确认 CSV。这里用 SQLite 记录：
+- 关键词搜索结果（TTL 内重复搜索直接查表）
+- 已下载的数据集（按 ref 与版本号），附带文件清单，命中时只核对清单中的文件
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import asdict, fields
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from utils.dataset_download import DatasetInfo
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "kaggle.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# 小于该字节数的 CSV 视为无效
+MIN_CSV_BYTES = 100
+
+_DATASET_FIELDS = {f.name for f in fields(DatasetInfo)}
+
+
+def _normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+def _dataset_path(ref: str, download_dir: str) -> str:
+    """与 KaggleDownloader.download_dataset 的输出目录一致：<download_dir>/<dataset-name>"""
+    return os.path.abspath(os.path.join(download_dir, ref.split("/")[-1]))
+
+
+def _build_manifest(path: str) -> List[Dict[str, Any]]:
+    manifest = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            full_path = os.path.join(root, name)
+            stat = os.stat(full_path)
+            manifest.append({
+                "path": os.path.relpath(full_path, path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            })
+    manifest.sort(key=lambda entry: entry["path"])
+    return manifest
+
+
+def _csv_files(manifest: List[Dict[str, Any]]) -> List[str]:
+    return [entry["path"] for entry in manifest
+            if entry["path"].lower().endswith(".csv") and entry["size"] > MIN_CSV_BYTES]
+
+
+class KaggleRegistry:
+    """
+    基于 SQLite 的本地 Kaggle 数据集登记表
+
+    - searches: 规范化关键词 -> 搜索结果（DatasetInfo 列表）及抓取时间（TTL 内直接复用）
+    - downloads: (ref, 本地目录) -> 版本号、下载时间与文件清单（相对路径 / 大小 / mtime）
+      命中时只核对清单中的文件，不再遍历整个目录
+    """
+
+    def __init__(self, db_path: str = None, ttl_seconds: int = None):
+        self.db_path = os.path.abspath(db_path or os.environ.get("KAGGLE_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else \
+            int(os.environ.get("KAGGLE_SEARCH_TTL", DEFAULT_TTL_SECONDS))
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "keyword TEXT PRIMARY KEY, max_results INTEGER NOT NULL, "
+                "results TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                "ref TEXT NOT NULL, path TEXT NOT NULL, version INTEGER, "
+                "manifest TEXT NOT NULL, downloaded_at REAL NOT NULL, PRIMARY KEY (ref, path))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS downloads_path ON downloads (path)")
+
+    def record_search(self, keyword: str, max_results: int, datasets: List[DatasetInfo]):
+        """记录一次远程搜索的结果"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (keyword, max_results, results, fetched_at) VALUES (?, ?, ?, ?)",
+                (_normalize_keyword(keyword), max_results,
+                 json.dumps([asdict(ds) for ds in datasets], ensure_ascii=False), time.time())
+            )
+
+    def lookup_search(self, keyword: str, max_results: int) -> Optional[List[DatasetInfo]]:
+        """
+        搜索缓存命中：同一关键词在 TTL 内已搜索过，且当时请求的条数不少于本次
+
+        Returns:
+            命中时返回 DatasetInfo 列表（可能为空列表，表示远程确实无结果），否则返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max_results, results, fetched_at FROM searches WHERE keyword = ?",
+                (_normalize_keyword(keyword),)
+            ).fetchone()
+        if row is None:
+            return None
+        cached_max, results, fetched_at = row
+        if time.time() - fetched_at >= self.ttl_seconds:
+            return None
+        results = json.loads(results)
+        if cached_max < max_results and len(results) >= cached_max:
+            # 上次请求的条数不足，且远程还可能有更多结果
+            return None
+        return [DatasetInfo(**{k: v for k, v in item.items() if k in _DATASET_FIELDS})
+                for item in results[:max_results]]
+
+    def record_download(self, ref: str, path: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        登记一次下载，记录目录下的文件清单
+
+        Returns:
+            登记记录，见 lookup_download
+        """
+        path = os.path.abspath(str(path))
+        manifest = _build_manifest(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (ref, path, version, manifest, downloaded_at) VALUES (?, ?, ?, ?, ?)",
+                (ref, path, version, json.dumps(manifest, ensure_ascii=False), time.time())
+            )
+        return {"ref": ref, "path": path, "version": version, "files": manifest, "csv_files": _csv_files(manifest)}
+
+    def _row_to_record(self, row) -> Optional[Dict[str, Any]]:
+        ref, path, version, manifest = row
+        manifest = json.loads(manifest)
+        # 只核对清单中的文件是否仍在且大小未变
+        for entry in manifest:
+            full_path = os.path.join(path, entry["path"])
+            try:
+                if os.stat(full_path).st_size != entry["size"]:
+                    return None
+            except OSError:
+                return None
+        return {"ref": ref, "path": path, "version": version, "files": manifest, "csv_files": _csv_files(manifest)}
+
+    def lookup_download(self, ref: str, download_dir: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找已下载且完整的数据集
+
+        Args:
+            ref: 数据集引用（username/dataset-name）
+            download_dir: 下载根目录
+            version: 期望的版本号（None 表示不限；已知版本不一致时视为未命中）
+
+        Returns:
+            {"ref", "path", "version", "files": 文件清单, "csv_files": 有效 CSV 相对路径}；未命中返回 None
+        """
+        path = _dataset_path(ref, download_dir)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ref, path, version, manifest FROM downloads WHERE ref = ? AND path = ?", (ref, path)
+            ).fetchone()
+        if row is None:
+            return None
+        if version is not None and row[2] is not None and row[2] != version:
+            logger.info(f"数据集 {ref} 有新版本（本地 v{row[2]}，远程 v{version}）")
+            return None
+        record = self._row_to_record(row)
+        if record is None:
+            logger.info(f"数据集 {ref} 的本地文件已变化，需要重新下载")
+        return record
+
+    def lookup_path(self, path: str) -> Optional[Dict[str, Any]]:
+        """按本地目录查找登记记录（文件不完整时返回 None）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ref, path, version, manifest FROM downloads WHERE path = ? ORDER BY downloaded_at DESC",
+                (os.path.abspath(str(path)),)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_kaggle_registry() -> Optional[KaggleRegistry]:
+    """获取进程内共享的 KaggleRegistry；设置 KAGGLE_REGISTRY_DISABLED=1 时返回 None"""
+    global _default_registry
+    if os.environ.get("KAGGLE_REGISTRY_DISABLED", "0") == "1":
+        return None
+    with _default_registry_lock:
+        if _default_registry is None:
+            try:
+                _default_registry = KaggleRegistry()
+            except sqlite3.Error as e:
+                logger.warning(f"初始化 Kaggle 本地登记表失败，直接访问远程: {e}")
+                return None
+        return _default_registry
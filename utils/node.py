@@ -1,7 +1,12 @@
 """Simple tool node for executing tool calls in LangGraph."""
+import os
+import asyncio
 import logging
-from typing import Dict, Any, Optional, Callable
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Tuple
 from langchain_core.messages import ToolMessage
+from utils.artifact_store import bind_run, bind_tool_call, ensure_run_id, get_artifact_store, tool_call_key
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +20,9 @@ class SimpleToolNode:
     def __init__(
         self, 
         tools: list,
-        context_provider: Optional[Callable[[Dict[str, Any], str, Dict[str, Any]], Dict[str, Any]]] = None
+        context_provider: Optional[Callable[[Dict[str, Any], str, Dict[str, Any]], Dict[str, Any]]] = None,
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None
     ):
         """
         Initialize the tool node.
@@ -24,9 +31,17 @@ class SimpleToolNode:
             tools: List of tool instances
             context_provider: Optional function that enriches tool arguments with context from state.
                              Signature: (state_dict, tool_name, tool_args) -> enriched_tool_args
+            parallel: Run multiple tool calls of one message concurrently
+                      (default from TOOL_NODE_PARALLEL, off; only enable for tools that
+                      don't share mutable per-run state)
+            max_workers: Thread pool size in parallel mode (default TOOL_NODE_MAX_WORKERS or 8)
         """
         self.tools_by_name = {tool.name: tool for tool in tools}
         self.context_provider = context_provider
+        if parallel is None:
+            parallel = os.environ.get("TOOL_NODE_PARALLEL", "0").lower() in ("1", "true", "yes")
+        self.parallel = parallel
+        self.max_workers = max_workers or int(os.environ.get("TOOL_NODE_MAX_WORKERS", 8))
     
     def __call__(self, state_dict: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -48,61 +63,143 @@ class SimpleToolNode:
             logger.warning("No tool calls found in last message")
             return state_dict
         
-        outputs = []
-        for tool_call in last_message.tool_calls:
+        # Tools read/write run-scoped artifacts via get_artifact_store() without seeing the state
+        with bind_run(ensure_run_id(state_dict)):
+            outputs = self._run_tool_calls(state_dict, last_message.tool_calls)
+        
+        messages.extend(outputs)
+        state_dict["messages"] = messages
+        return state_dict
+    
+    def _run_tool_calls(self, state_dict: Dict[str, Any], tool_calls: list) -> list:
+        """
+        Run tool calls and build their ToolMessages in the original call order.
+        
+        In parallel mode the tools themselves run concurrently, but context enrichment,
+        _handle_tool_result (state mutation) and message building stay sequential.
+        """
+        # Resolve tools and enrich args up front (reads state, so done sequentially)
+        prepared = []
+        for tool_call in tool_calls:
             tool_name = tool_call.get("name")
             tool_args = tool_call.get("args", {})
-            
-            if tool_name not in self.tools_by_name:
-                error_msg = f"Tool {tool_name} not found"
-                logger.error(error_msg)
-                outputs.append(
-                    ToolMessage(
-                        content=error_msg,
-                        name=tool_name,
-                        tool_call_id=tool_call.get("id", ""),
-                        status="error"
-                    )
-                )
-                continue
-            
-            try:
-                tool = self.tools_by_name[tool_name]
-                
+            tool = self.tools_by_name.get(tool_name)
+            error = None
+            if tool is None:
+                error = f"Tool {tool_name} not found"
+                logger.error(error)
+            elif self.context_provider:
                 # Enrich tool args with context if context_provider is provided
-                if self.context_provider:
+                try:
                     tool_args = self.context_provider(state_dict, tool_name, tool_args)
-                
-                tool_result = tool.invoke(tool_args)
-                
-                # Handle special tool results (e.g., update state)
-                self._handle_tool_result(state_dict, tool_name, tool_result)
-                
-                outputs.append(
-                    ToolMessage(
-                        content=str(tool_result),
-                        name=tool_name,
-                        tool_call_id=tool_call.get("id", ""),
-                        status="success"
+                except Exception as e:
+                    error = f"Tool {tool_name} error: {str(e)}"
+                    logger.error(f"❌ {error}")
+            prepared.append((tool_call, tool, tool_args, error))
+        
+        runnable = [idx for idx, (_, tool, _, error) in enumerate(prepared) if error is None]
+        calls = [(prepared[idx][1], prepared[idx][2], prepared[idx][0].get("id")) for idx in runnable]
+        if self.parallel and len(runnable) > 1:
+            results = self._invoke_parallel(calls)
+        else:
+            results = [self._invoke_one(*call) for call in calls]
+        results_by_idx = dict(zip(runnable, results))
+        
+        outputs = []
+        for idx, (tool_call, tool, tool_args, error) in enumerate(prepared):
+            tool_name = tool_call.get("name")
+            if error is None:
+                ok, tool_result = results_by_idx[idx]
+                if ok:
+                    try:
+                        # Handle special tool results (e.g., update state)
+                        self._handle_tool_result(state_dict, tool_name, tool_result, tool_call.get("id"))
+                    except Exception as e:
+                        ok, tool_result = False, e
+                if ok:
+                    outputs.append(
+                        ToolMessage(
+                            content=str(tool_result),
+                            name=tool_name,
+                            tool_call_id=tool_call.get("id", ""),
+                            status="success"
+                        )
                     )
+                    continue
+                error = f"Tool {tool_name} error: {str(tool_result)}"
+                logger.error(f"❌ {error}")
+            outputs.append(
+                ToolMessage(
+                    content=error,
+                    name=tool_name,
+                    tool_call_id=tool_call.get("id", ""),
+                    status="error"
                 )
-            except Exception as e:
-                error_msg = f"Tool {tool_name} error: {str(e)}"
-                logger.error(f"❌ {error_msg}")
-                outputs.append(
-                    ToolMessage(
-                        content=error_msg,
-                        name=tool_name,
-                        tool_call_id=tool_call.get("id", ""),
-                        status="error"
-                    )
+            )
+        return outputs
+    
+    @staticmethod
+    def _invoke_one(tool, tool_args, tool_call_id=None) -> Tuple[bool, Any]:
+        try:
+            # Tools that store artifacts key them by the bound tool_call_id (see tool_call_key)
+            with bind_tool_call(tool_call_id):
+                return True, tool.invoke(tool_args)
+        except Exception as e:
+            return False, e
+    
+    @staticmethod
+    def _has_async_impl(tool) -> bool:
+        """Whether the tool overrides _arun (otherwise ainvoke would just run _run in an executor)."""
+        return hasattr(tool, "ainvoke") and "_arun" in type(tool).__dict__
+    
+    @staticmethod
+    async def _ainvoke_bound(tool, tool_args, tool_call_id=None):
+        # Each gathered coroutine runs as its own task, so the binding stays local to this call
+        with bind_tool_call(tool_call_id):
+            return await tool.ainvoke(tool_args)
+    
+    @classmethod
+    async def _ainvoke_all(cls, calls: list) -> list:
+        results = await asyncio.gather(*(cls._ainvoke_bound(*call) for call in calls),
+                                       return_exceptions=True)
+        return [(False, r) if isinstance(r, Exception) else (True, r) for r in results]
+    
+    def _invoke_parallel(self, calls: list) -> list:
+        """
+        Invoke (tool, args, tool_call_id) triples concurrently: sync tools on a thread pool, tools with their own
+        _arun together via asyncio.gather (on one pool thread with its own event loop).
+        Returns (ok, result_or_exception) in input order.
+        """
+        async_idx = [idx for idx, (tool, _, _) in enumerate(calls) if self._has_async_impl(tool)]
+        sync_idx = [idx for idx in range(len(calls)) if idx not in async_idx]
+        results = [None] * len(calls)
+        workers = min(self.max_workers, len(sync_idx) + (1 if async_idx else 0))
+        logger.info(f"Running {len(calls)} tool calls concurrently ({len(async_idx)} async)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each job runs in a copy of the caller's context (keeps the bound run_id etc.)
+            sync_futures = {
+                idx: executor.submit(contextvars.copy_context().run, self._invoke_one, *calls[idx])
+                for idx in sync_idx
+            }
+            async_future = None
+            if async_idx:
+                async_future = executor.submit(
+                    contextvars.copy_context().run, asyncio.run,
+                    self._ainvoke_all([calls[idx] for idx in async_idx])
                 )
-        
-        messages.extend(outputs)
-        state_dict["messages"] = messages
-        return state_dict
+            for idx, future in sync_futures.items():
+                results[idx] = future.result()
+            if async_future is not None:
+                try:
+                    async_results = async_future.result()
+                except Exception as e:
+                    async_results = [(False, e)] * len(async_idx)
+                for idx, result in zip(async_idx, async_results):
+                    results[idx] = result
+        return results
     
-    def _handle_tool_result(self, state_dict: Dict[str, Any], tool_name: str, tool_result: Any):
+    def _handle_tool_result(self, state_dict: Dict[str, Any], tool_name: str, tool_result: Any,
+                            tool_call_id: Optional[str] = None):
         """
         Handle special tool results that need to update state.
         
@@ -110,6 +207,7 @@ class SimpleToolNode:
             state_dict: Current state dictionary
             tool_name: Name of the tool that was executed
             tool_result: Result from the tool execution
+            tool_call_id: ID of the tool call (artifacts written by the tool are keyed by it)
         """
         # If methodology_writer_tool succeeded, mark the paper as processed
         if tool_name == "methodology_writer_tool":
@@ -152,15 +250,27 @@ class SimpleToolNode:
             if "current_paper" in state_dict:
                 state_dict["current_paper"]["methodology"] = tool_result
         
-        # If pdf_parser_tool succeeded, update state with parsed content
+        # If pdf_parser_tool succeeded, merge this call's parsed content into state
         if tool_name == "pdf_parser_tool":
-            tool = self.tools_by_name.get(tool_name)
-            if tool and hasattr(tool, "_last_parsed_state"):
-                parsed_state = tool._last_parsed_state
-                # Update state_dict with parsed content
-                state_dict["parsed_multimodal_content"] = parsed_state.parsed_multimodal_content
-                state_dict["pdf_files"] = parsed_state.pdf_files
-                if parsed_state.errors:
-                    state_dict["errors"] = state_dict.get("errors", []) + parsed_state.errors
-                # Clear the temporary state
-                tool._last_parsed_state = None
+            store = get_artifact_store(state_dict.get("run_id"))
+            content_key = tool_call_key("parsed_multimodal_content", tool_call_id)
+            # Present only if this call succeeded: PDFParserTool clears its keys when it starts
+            if store.has(content_key):
+                parsed = store.get(content_key)
+                downloaded = store.get(tool_call_key("downloaded_papers", tool_call_id), [])
+                errors = store.get(tool_call_key("errors", tool_call_id))
+                for key in ("parsed_multimodal_content", "downloaded_papers", "errors"):
+                    store.delete(tool_call_key(key, tool_call_id))
+                # Accumulate across calls; a re-parse of the same PDF (e.g. filling in more sections) replaces it
+                new_paths = {item.get("pdf_path") for item in parsed}
+                state_dict["parsed_multimodal_content"] = [
+                    item for item in state_dict.get("parsed_multimodal_content") or []
+                    if item.get("pdf_path") not in new_paths
+                ] + list(parsed)
+                state_dict["downloaded_papers"] = list(dict.fromkeys(
+                    list(state_dict.get("downloaded_papers") or []) + list(downloaded)
+                ))
+                # Run-wide copy for nodes that read it from the store (see chatbot._load_parsed_content)
+                store.put("parsed_multimodal_content", state_dict["parsed_multimodal_content"])
+                if errors:
+                    state_dict["errors"] = state_dict.get("errors", []) + errors
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional, Iterable
+
+from loguru import logger
+
+from utils.paper import Paper
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "arxiv.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# arXiv 查询语法中的字段前缀和布尔运算符，构造 FTS 查询时需要去掉
+_ARXIV_FIELD_PREFIX = re.compile(r"\b(ti|au|abs|co|jr|cat|rn|id|all):", re.IGNORECASE)
+_ARXIV_OPERATORS = {"and", "or", "andnot", "not"}
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-\.]*")
+_VERSION_SUFFIX = re.compile(r"v\d+$")
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _paper_to_record(paper: Paper) -> str:
+    """Paper -> JSON 字符串（保留 list 字段，便于无损还原）"""
+    return json.dumps({
+        "paper_id": paper.paper_id,
+        "title": paper.title,
+        "authors": paper.authors,
+        "abstract": paper.abstract,
+        "doi": paper.doi,
+        "published_date": paper.published_date.isoformat() if paper.published_date else None,
+        "pdf_url": paper.pdf_url,
+        "url": paper.url,
+        "source": paper.source,
+        "updated_date": paper.updated_date.isoformat() if paper.updated_date else None,
+        "categories": paper.categories,
+        "keywords": paper.keywords,
+        "citations": paper.citations,
+        "references": paper.references,
+        "extra": paper.extra,
+    }, ensure_ascii=False)
+
+
+def _record_to_paper(record: str) -> Paper:
+    data = json.loads(record)
+    for key in ("published_date", "updated_date"):
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    return Paper(**data)
+
+
+class PaperCache:
+    """
+    基于 SQLite 的本地 arXiv 元数据缓存
+
+    - papers: paper_id -> Paper 记录及抓取时间
+    - papers_fts: FTS5 全文索引（title / abstract / categories）
+    - queries: 规范化后的查询 -> 远程返回的 paper_id 列表及抓取时间（用于 TTL 判断）
+    """
+
+    def __init__(self, db_path: str = None, ttl_seconds: int = None):
+        self.db_path = os.path.abspath(db_path or os.environ.get("ARXIV_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else \
+            int(os.environ.get("ARXIV_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS papers ("
+                "paper_id TEXT PRIMARY KEY, record TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+                "paper_id UNINDEXED, title, abstract, categories, tokenize='porter unicode61')"
+            )
+            # 不带版本号的 arXiv id -> 最新缓存的 paper_id（带版本号）
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS id_aliases (alias TEXT PRIMARY KEY, paper_id TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS queries ("
+                "query TEXT PRIMARY KEY, max_results INTEGER NOT NULL, "
+                "paper_ids TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return (time.time() - fetched_at) < self.ttl_seconds
+
+    def upsert(self, papers: Iterable[Paper]):
+        """写入/更新论文记录及全文索引"""
+        now = time.time()
+        rows = [(p.paper_id, _paper_to_record(p), p.title, p.abstract, " ".join(p.categories or []))
+                for p in papers if p.paper_id]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            ids = [(row[0],) for row in rows]
+            self._conn.executemany("DELETE FROM papers_fts WHERE paper_id = ?", ids)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO papers (paper_id, record, fetched_at) VALUES (?, ?, ?)",
+                [(row[0], row[1], now) for row in rows]
+            )
+            self._conn.executemany(
+                "INSERT INTO papers_fts (paper_id, title, abstract, categories) VALUES (?, ?, ?, ?)",
+                [(row[0], row[2], row[3], row[4]) for row in rows]
+            )
+            aliases = [(_VERSION_SUFFIX.sub("", row[0]), row[0]) for row in rows]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO id_aliases (alias, paper_id) VALUES (?, ?)",
+                [alias for alias in aliases if alias[0] != alias[1]]
+            )
+
+    def get(self, paper_ids: List[str], fresh_only: bool = False) -> List[Paper]:
+        """按 paper_id 读取论文（保持输入顺序，缺失的跳过）"""
+        if not paper_ids:
+            return []
+        placeholders = ",".join("?" * len(paper_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT paper_id, record, fetched_at FROM papers WHERE paper_id IN ({placeholders})",
+                list(paper_ids)
+            ).fetchall()
+        by_id = {
+            paper_id: record for paper_id, record, fetched_at in rows
+            if not fresh_only or self._is_fresh(fetched_at)
+        }
+        return [_record_to_paper(by_id[pid]) for pid in paper_ids if pid in by_id]
+
+    def get_by_ids(self, arxiv_ids: List[str], fresh_only: bool = False) -> List[Optional[Paper]]:
+        """
+        按 arXiv id 读取论文，不带版本号的 id 解析为已缓存的最新版本
+
+        Returns:
+            与输入一一对应的列表，未命中的位置为 None
+        """
+        if not arxiv_ids:
+            return []
+        placeholders = ",".join("?" * len(arxiv_ids))
+        with self._lock:
+            alias_rows = self._conn.execute(
+                f"SELECT alias, paper_id FROM id_aliases WHERE alias IN ({placeholders})",
+                list(arxiv_ids)
+            ).fetchall()
+        aliases = dict(alias_rows)
+        resolved_ids = [aliases.get(arxiv_id, arxiv_id) for arxiv_id in arxiv_ids]
+        papers = {paper.paper_id: paper for paper in self.get(resolved_ids, fresh_only=fresh_only)}
+        return [papers.get(paper_id) for paper_id in resolved_ids]
+
+    def record_query(self, query: str, max_results: int, papers: List[Paper]):
+        """记录一次远程查询的结果，用于后续判断缓存是否过期"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (query, max_results, paper_ids, fetched_at) VALUES (?, ?, ?, ?)",
+                (_normalize_query(query), max_results, json.dumps([p.paper_id for p in papers]), time.time())
+            )
+
+    def lookup_query(self, query: str, max_results: int) -> Optional[List[Paper]]:
+        """
+        查询缓存命中：同一查询在 TTL 内已远程检索过，且当时请求的条数不少于本次
+
+        Returns:
+            命中时返回 Paper 列表，否则返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max_results, paper_ids, fetched_at FROM queries WHERE query = ?",
+                (_normalize_query(query),)
+            ).fetchone()
+        if row is None:
+            return None
+        cached_max, paper_ids, fetched_at = row
+        if not self._is_fresh(fetched_at):
+            return None
+        paper_ids = json.loads(paper_ids)
+        if cached_max < max_results and len(paper_ids) >= cached_max:
+            # 上次请求的条数不足，且远程还可能有更多结果
+            return None
+        papers = self.get(paper_ids[:max_results])
+        if len(papers) < min(len(paper_ids), max_results):
+            return None
+        return papers
+
+    def abstracts_since(self, since: float = 0.0) -> List[tuple]:
+        """
+        读取抓取时间晚于 since 的论文标题与摘要（供增量构建向量索引）
+
+        Returns:
+            [(paper_id, title, abstract, fetched_at)]，按抓取时间升序
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT p.paper_id, f.title, f.abstract, p.fetched_at FROM papers p "
+                "JOIN papers_fts f ON f.paper_id = p.paper_id WHERE p.fetched_at > ? ORDER BY p.fetched_at",
+                (since,)
+            ).fetchall()
+
+    @staticmethod
+    def _to_fts_query(query: str) -> str:
+        """把 arXiv 风格的查询转换为 FTS5 MATCH 表达式（词项 OR 连接，按 bm25 排序）"""
+        query = _ARXIV_FIELD_PREFIX.sub(" ", query)
+        tokens = [t.strip(".-") for t in _TOKEN_PATTERN.findall(query)]
+        tokens = [t for t in tokens if t and t.lower() not in _ARXIV_OPERATORS]
+        seen = set()
+        terms = []
+        for token in tokens:
+            key = token.lower()
+            if key not in seen:
+                seen.add(key)
+                terms.append('"' + token.replace('"', '') + '"')
+        return " OR ".join(terms)
+
+    def search_local(self, query: str, max_results: int = 10) -> List[Paper]:
+        """在本地全文索引中检索"""
+        fts_query = self._to_fts_query(query)
+        if not fts_query:
+            return []
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT paper_id FROM papers_fts WHERE papers_fts MATCH ? "
+                    "ORDER BY bm25(papers_fts, 0.0, 10.0, 3.0, 1.0) LIMIT ?",
+                    (fts_query, max_results)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"本地全文检索失败: {e}")
+            return []
+        return self.get([row[0] for row in rows])
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_paper_cache() -> Optional[PaperCache]:
+    """获取进程内共享的 PaperCache；设置 ARXIV_CACHE_DISABLED=1 时返回 None"""
+    global _default_cache
+    if os.environ.get("ARXIV_CACHE_DISABLED", "0") == "1":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = PaperCache()
+            except sqlite3.Error as e:
+                logger.warning(f"初始化 arXiv 本地缓存失败，直接访问远程: {e}")
+                return None
+        return _default_cache
@@ -0,0 +1,212 @@
+import os
+import re
+import shutil
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "papers")
+
+# 匹配新式 (2401.12345v2) 与旧式 (hep-th/9901001v1) arXiv id
+_ARXIV_ID_PATTERN = re.compile(
+    r"(?P<id>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(?P<version>\d+))?",
+    re.IGNORECASE
+)
+
+_hash_memo = {}
+_hash_memo_lock = threading.Lock()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件的 sha256（按 路径+大小+mtime 记忆化，同一文件在进程内只读一次）
+
+    Args:
+        path: 文件路径
+        chunk_size: 分块读取大小
+
+    Returns:
+        十六进制 sha256
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _hash_memo_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    with _hash_memo_lock:
+        _hash_memo[key] = sha256
+    return sha256
+
+
+def parse_arxiv_id(url_or_id: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    从 arXiv 链接或 id 中解析 (id, version)
+
+    e.g. "http://arxiv.org/pdf/2401.12345v2" -> ("2401.12345", "2")
+    """
+    if not url_or_id:
+        return None, None
+    tail = url_or_id.rstrip("/")
+    if "/abs/" in tail or "/pdf/" in tail:
+        tail = re.split(r"/(?:abs|pdf)/", tail, maxsplit=1)[-1]
+    if tail.lower().endswith(".pdf"):
+        tail = tail[:-4]
+    match = _ARXIV_ID_PATTERN.fullmatch(tail) or _ARXIV_ID_PATTERN.search(tail)
+    if not match:
+        return None, None
+    return match.group("id"), match.group("version")
+
+
+class PaperStore:
+    """
+    跨运行共享的内容寻址论文库
+
+    - blobs/<sha[:2]>/<sha>.pdf: 按内容哈希存储的 PDF
+    - index.sqlite: arXiv id/version -> sha256 索引，以及 sha256 -> 解析输出目录
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(os.path.abspath(root or os.environ.get("PAPER_STORE_PATH", DEFAULT_STORE_PATH)))
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS arxiv_ids ("
+                "arxiv_id TEXT NOT NULL, version INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+                "added_at REAL NOT NULL, PRIMARY KEY (arxiv_id, version))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed ("
+                "sha256 TEXT PRIMARY KEY, output_dir TEXT NOT NULL, parsed_at REAL NOT NULL)"
+            )
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / f"{sha256}.pdf"
+
+    def has_blob(self, sha256: str) -> bool:
+        return self.blob_path(sha256).exists()
+
+    def put_bytes(self, data: bytes, arxiv_id: str = None, version: str = None) -> str:
+        """写入 PDF 内容，返回其 sha256；同时登记 arXiv id/version"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, blob)
+        if arxiv_id:
+            self.register_id(arxiv_id, version, sha256)
+        return sha256
+
+    def put_file(self, path: str, arxiv_id: str = None, version: str = None) -> str:
+        """把已有的 PDF 文件登记进库"""
+        sha256 = hash_file(path)
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, blob)
+        if arxiv_id:
+            self.register_id(arxiv_id, version, sha256)
+        return sha256
+
+    def register_id(self, arxiv_id: str, version: Optional[str], sha256: str):
+        # 未带版本号的下载记为 version 0，查询时作为兜底
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO arxiv_ids (arxiv_id, version, sha256, added_at) VALUES (?, ?, ?, ?)",
+                (arxiv_id, int(version) if version else 0, sha256, time.time())
+            )
+
+    def lookup(self, arxiv_id: str, version: str = None) -> Optional[str]:
+        """
+        查找已入库的 PDF
+
+        Args:
+            arxiv_id: arXiv id（不含版本号）
+            version: 指定版本；为 None 时返回已知的最新版本
+
+        Returns:
+            sha256，未找到（或 blob 已丢失）时返回 None
+        """
+        with self._lock:
+            if version:
+                row = self._conn.execute(
+                    "SELECT sha256 FROM arxiv_ids WHERE arxiv_id = ? AND version = ?",
+                    (arxiv_id, int(version))
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT sha256 FROM arxiv_ids WHERE arxiv_id = ? ORDER BY version DESC LIMIT 1",
+                    (arxiv_id,)
+                ).fetchone()
+        if row and self.has_blob(row[0]):
+            return row[0]
+        return None
+
+    def materialize(self, sha256: str, dest_path: str) -> Path:
+        """
+        把库中的 PDF 复制到目标路径
+
+        不使用硬链接：目标文件被原地改写时会同时破坏库中的 blob（sha256 不再匹配），影响之后的所有运行
+        """
+        dest = Path(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        blob = self.blob_path(sha256)
+        if dest.exists():
+            # 旧版本留下的硬链接也要断开
+            if not os.path.samefile(dest, blob) and hash_file(str(dest)) == sha256:
+                return dest
+            dest.unlink()
+        tmp_path = dest.with_suffix(f"{dest.suffix}.{os.getpid()}.tmp")
+        shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, dest)
+        return dest
+
+    def record_parse(self, sha256: str, output_dir: str):
+        """记录某个内容哈希对应的解析输出目录"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed (sha256, output_dir, parsed_at) VALUES (?, ?, ?)",
+                (sha256, os.path.abspath(output_dir), time.time())
+            )
+
+    def parsed_dir(self, sha256: str) -> Optional[Path]:
+        with self._lock:
+            row = self._conn.execute("SELECT output_dir FROM parsed WHERE sha256 = ?", (sha256,)).fetchone()
+        if row and Path(row[0]).exists():
+            return Path(row[0])
+        return None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_paper_store() -> Optional[PaperStore]:
+    """获取进程内共享的 PaperStore；初始化失败时返回 None（调用方退回原有逻辑）"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            try:
+                _default_store = PaperStore()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"初始化论文库失败: {e}")
+                return None
+        return _default_store
@@ -0,0 +1,70 @@
+"""
+按模型提供商限制并发与请求速率
+
+同一提供商的所有调用（无论来自哪个节点/线程）共享一个限制器：
+- 并发上限：<PROVIDER>_MAX_CONCURRENCY，未设置时用 LLM_MAX_CONCURRENCY（默认 4）
+- 速率上限：<PROVIDER>_RPM（每分钟请求数），未设置时用 LLM_RPM（默认 0，不限制）
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+
+def _env_int(provider: str, name: str, default: int) -> int:
+    return int(os.environ.get(f"{provider.upper()}_{name}", os.environ.get(f"LLM_{name}", default)))
+
+
+class ProviderLimiter:
+    def __init__(self, provider: str, max_concurrency: int = None, requests_per_minute: int = None):
+        """
+        Args:
+            provider: 提供商名称，如 zhipu / deepseek / openai
+            max_concurrency: 最大并发请求数
+            requests_per_minute: 每分钟最多发起的请求数（0 表示不限制）
+        """
+        self.provider = provider
+        self.max_concurrency = max(1, max_concurrency or _env_int(provider, "MAX_CONCURRENCY", 4))
+        self.requests_per_minute = requests_per_minute if requests_per_minute is not None else \
+            _env_int(provider, "RPM", 0)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _wait_for_slot(self):
+        """按固定间隔发放请求时间片，超出速率时等待"""
+        if self.requests_per_minute <= 0:
+            return
+        interval = 60.0 / self.requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    @contextmanager
+    def acquire(self):
+        """占用一个并发名额（并等待速率时间片），退出时释放"""
+        with self._semaphore:
+            self._wait_for_slot()
+            yield
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在限制下调用 fn"""
+        with self.acquire():
+            return fn(*args, **kwargs)
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(provider: str) -> ProviderLimiter:
+    """获取进程内共享的提供商限制器"""
+    key = provider.lower()
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = ProviderLimiter(key)
+        return _limiters[key]
@@ -1,12 +1,28 @@
-from typing import List
+from typing import List, Optional, Tuple, Iterator
 from datetime import datetime
 import requests
 from PyPDF2 import PdfReader
 import os
 import feedparser
 import traceback
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
 
 from utils.paper import Paper
+from utils.paper_cache import PaperCache, get_paper_cache
+from utils.paper_store import get_paper_store, parse_arxiv_id, hash_file
+from utils.rate_limit import ProviderLimiter
+
+# arXiv API policy: at most one request every 3 seconds, shared by every search in the process
+_arxiv_limiter = ProviderLimiter("arxiv", max_concurrency=1,
+                                 requests_per_minute=int(os.environ.get("ARXIV_RPM", 20)))
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
 
 class PaperSource:
     def search():
@@ -22,7 +38,51 @@ class ArxivSearch(PaperSource):
     """Searcher for arXiv papers"""
     BASE_URL = "http://export.arxiv.org/api/query"
 
+    def __init__(self, cache: Optional[PaperCache] = None, use_cache: bool = True):
+        """
+        :param cache: local metadata cache, defaults to the process-wide PaperCache
+        :type cache: PaperCache
+        :param use_cache: whether to serve queries from the local cache first
+        :type use_cache: bool
+        """
+        self.cache = cache if cache is not None else (get_paper_cache() if use_cache else None)
+
     def search(self, query: str = "", max_results: int = 10):
+        """
+        search arXiv, serving repeated queries from the local cache
+
+        a query that was fetched remotely within the cache TTL is answered locally;
+        otherwise remote hits are merged with local full-text hits and written back
+        """
+        if self.cache is None:
+            return self._search_remote(query, max_results)
+
+        cached = self.cache.lookup_query(query, max_results)
+        if cached is not None:
+            logger.info(f"arXiv cache hit: {query} ({len(cached)} papers)")
+            return cached
+
+        local_papers = self.cache.search_local(query, max_results)
+        try:
+            remote_papers = self._search_remote(query, max_results)
+        except Exception as e:
+            logger.warning(f"arXiv remote search failed, falling back to local cache: {e}")
+            return local_papers
+
+        self.cache.upsert(remote_papers)
+        self.cache.record_query(query, max_results, remote_papers)
+
+        merged = list(remote_papers)
+        seen = {paper.paper_id for paper in merged}
+        for paper in local_papers:
+            if len(merged) >= max_results:
+                break
+            if paper.paper_id not in seen:
+                seen.add(paper.paper_id)
+                merged.append(paper)
+        return merged
+
+    def _search_remote(self, query: str = "", max_results: int = 10):
         params = {
             "search_query": query,
             "max_results": max_results,
@@ -30,8 +90,15 @@ class ArxivSearch(PaperSource):
             "sortOrder": "descending"
         }
 
-        response = requests.get(self.BASE_URL, params=params)
-        feed = feedparser.parse(response.content)
+        with _arxiv_limiter.acquire():
+            response = requests.get(self.BASE_URL, params=params)
+        response.raise_for_status()
+        return self._parse_feed(response.content)
+
+    @staticmethod
+    def _parse_feed(content: bytes) -> List[Paper]:
+        """parse an arXiv Atom feed into Paper records"""
+        feed = feedparser.parse(content)
         papers = []
 
         for entry in feed.entries:
@@ -59,17 +126,109 @@ class ArxivSearch(PaperSource):
                 print(traceback.format_exc())
 
         return papers
+
+    def fetch_by_ids(self, paper_ids: List[str], batch_size: int = 200, page_size: int = 100,
+                     request_interval: float = 3.0) -> List[Paper]:
+        """
+        resolve many arXiv ids with batched id_list queries
+
+        ids already in the local cache (and within TTL) are served locally; the
+        rest are requested batch_size at a time, paginated by page_size. Each feed is
+        parsed on a worker thread while the next page is being downloaded, and
+        the parsed papers are written back to the cache.
+
+        :param paper_ids: arXiv ids, with or without version suffix
+        :type paper_ids: List[str]
+        :param batch_size: ids per id_list (arXiv accepts a few hundred per request)
+        :type batch_size: int
+        :param page_size: results per page within one id_list
+        :type page_size: int
+        :param request_interval: seconds between requests, per arXiv's rate limit policy
+        :type request_interval: float
+
+        :return: papers in the order of the requested ids (unresolved ids are skipped)
+        :type return: List[Paper]
+        """
+        requested = []
+        seen = set()
+        for paper_id in paper_ids:
+            arxiv_id, version = parse_arxiv_id(paper_id)
+            if not arxiv_id:
+                continue
+            key = f"{arxiv_id}v{version}" if version else arxiv_id
+            if key not in seen:
+                seen.add(key)
+                requested.append(key)
+
+        resolved = {}
+        if self.cache is not None:
+            for key, paper in zip(requested, self.cache.get_by_ids(requested, fresh_only=True)):
+                if paper is not None:
+                    resolved[key] = paper
+        missing = [key for key in requested if key not in resolved]
+        if missing:
+            logger.info(f"arXiv id_list: {len(resolved)} ids from cache, fetching {len(missing)} remotely")
+
+        fetched = []
+        page_size = min(page_size, batch_size)
+        with ThreadPoolExecutor(max_workers=1) as parser:
+            pending = []
+            for batch_start in range(0, len(missing), batch_size):
+                batch = missing[batch_start:batch_start + batch_size]
+                for start in range(0, len(batch), page_size):
+                    if pending:
+                        time.sleep(request_interval)
+                    params = {
+                        "id_list": ",".join(batch),
+                        "start": start,
+                        "max_results": page_size,
+                    }
+                    try:
+                        with _arxiv_limiter.acquire():
+                            response = requests.get(self.BASE_URL, params=params, timeout=60)
+                        response.raise_for_status()
+                    except Exception as e:
+                        logger.warning(f"arXiv id_list request failed ({len(batch)} ids, start={start}): {e}")
+                        continue
+                    # parse on the worker thread while the next page is downloading
+                    pending.append(parser.submit(self._parse_feed, response.content))
+
+            for future in pending:
+                fetched.extend(future.result())
+
+        if self.cache is not None and fetched:
+            self.cache.upsert(fetched)
+
+        by_key = {}
+        for paper in fetched:
+            arxiv_id, version = parse_arxiv_id(paper.paper_id)
+            by_key[paper.paper_id] = paper
+            by_key.setdefault(arxiv_id, paper)
+        resolved.update({key: by_key[key] for key in missing if key in by_key})
+        return [resolved[key] for key in requested if key in resolved]
     
     def download_pdf(self, paper_id: str, save_path: str):
+        output_file = f"{save_path}/{paper_id}.pdf"
+        store = get_paper_store()
+        arxiv_id, version = parse_arxiv_id(paper_id)
+        sha256 = store.lookup(arxiv_id, version) if (store and arxiv_id) else None
+        if sha256:
+            store.materialize(sha256, output_file)
+            return output_file
+
         pdf_url = f"https://arxiv.org/pdf/{paper_id}.pdf"
         response = requests.get(pdf_url)
-        output_file = f"{save_path}/{paper_id}.pdf"
-        with open(output_file, "wb") as f:
-            f.write(response.content)
+        response.raise_for_status()
+        if store:
+            sha256 = store.put_bytes(response.content, arxiv_id, version)
+            store.materialize(sha256, output_file)
+        else:
+            with open(output_file, "wb") as f:
+                f.write(response.content)
         
         return output_file
     
-    def read_paper(self, paper_id: str, save_path: str = ".download/"):
+    def read_paper(self, paper_id: str, save_path: str = ".download/", pages: Optional[Tuple[int, int]] = None):
         """
         read a paper and convert it to text format
         
@@ -77,6 +236,8 @@ class ArxivSearch(PaperSource):
         :type paper_id: str
         :param save_apth: path to save paper in the format of text
         :type save_apth: str
+        :param pages: optional 0-based [start, end) page range, e.g. (0, 2) for the abstract/intro
+        :type pages: Tuple[int, int]
 
         :return: the extracted content in the format of text from pdf
         :type return: str
@@ -86,14 +247,82 @@ class ArxivSearch(PaperSource):
             pdf_path = self.download_pdf(paper_id, save_path)
 
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            # extracted text is cached next to the PDF, keyed by its content hash
+            cache_path = _text_cache_path(pdf_path, pages)
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return f.read()
+
+            start, end = pages if pages else (0, None)
+            text = "\n".join(iter_pdf_pages(pdf_path, start, end)).strip()
 
-            return text.strip()
+            with open(cache_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            return text
         
         except Exception as e:
             print(f"Error: {paper_id}")
             print(traceback.format_exc())
             return ""
+
+
+def _text_cache_path(pdf_path: str, pages: Optional[Tuple[int, int]] = None) -> str:
+    sha256 = hash_file(pdf_path)
+    suffix = f".p{pages[0]}-{pages[1]}" if pages else ""
+    return f"{os.path.splitext(pdf_path)[0]}.{sha256[:16]}{suffix}.txt"
+
+
+def iter_pdf_pages(pdf_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """
+    lazily yield the text layer of each page in [start, end)
+
+    uses PyMuPDF when available (much faster), otherwise falls back to PyPDF2
+
+    :param pdf_path: path to the PDF file
+    :type pdf_path: str
+    :param start: first page (0-based, inclusive)
+    :type start: int
+    :param end: last page (exclusive), None for the end of the document
+    :type end: int
+    """
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(pdf_path) as doc:
+            stop = len(doc) if end is None else min(end, len(doc))
+            for page_num in range(start, stop):
+                yield doc[page_num].get_text("text")
+        return
+
+    reader = PdfReader(pdf_path)
+    stop = len(reader.pages) if end is None else min(end, len(reader.pages))
+    for page_num in range(start, stop):
+        yield reader.pages[page_num].extract_text() or ""
+
+def reciprocal_rank_fusion(rankings: List[List[Paper]], k: int = 60) -> List[Paper]:
+    """
+    fuse several ranked paper lists with reciprocal-rank fusion
+
+    score(d) = sum over lists of 1 / (k + rank(d)); papers are deduplicated by
+    arXiv id (ignoring the version suffix), keeping the first record seen
+
+    :param rankings: ranked result lists, one per query
+    :type rankings: List[List[Paper]]
+    :param k: RRF damping constant
+    :type k: int
+
+    :return: papers sorted by fused score, best first
+    :type return: List[Paper]
+    """
+    scores = {}
+    papers = {}
+    for ranking in rankings:
+        seen_in_list = set()
+        for rank, paper in enumerate(ranking, start=1):
+            key = parse_arxiv_id(paper.paper_id)[0] or paper.paper_id
+            if key in seen_in_list:
+                continue
+            seen_in_list.add(key)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            papers.setdefault(key, paper)
+
+    ordered = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [papers[key] for key in ordered]
@@ -11,10 +11,13 @@ from tools.rag import vector_search
 class State(TypedDict):
     # for all
     messages: list # 所有的信息
+    run_id: str # 运行 ID，产物存储（utils/artifact_store）按它隔离
 
     # for literature search
     original_query: str # 用户的原始输入
     refined_query: str # 经过 deepseek 润色之后的 query
+    refined_queries: list # 多个查询变体（fan-out 检索）
+    paper_candidates: list # RRF 融合后的候选论文（按得分排序）
     paper_urls: list # 文献的 url list
     downloaded_papers: list # 下载的文献的路径 list
     save_path: str
@@ -26,6 +29,7 @@ class State(TypedDict):
     methodology_path: Optional[str]
     errors: List[str]
     processed_papers: set
+    methodology_queue: list # 待提取方法论的论文在 parsed_multimodal_content 中的下标
     current_paper: str
 
     # for AIScientist
@@ -34,6 +38,8 @@ class State(TypedDict):
     methodology_summary: Dict[str, Any]
     new_idea: str
     motivation: str
+    novelty_verdict: str # 本地新颖性检查结论：RETURN / VERIFY / CONTINUE（tools/novelty）
+    novelty_rounds: int # 想法生成 -> 新颖性检查的轮数
     download_path: str
     dataset: str
     dataset_url: str
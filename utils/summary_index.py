@@ -0,0 +1,249 @@
+"""
+文献总结 / 方法论文件的增量索引
+
+outputs/reports 与 outputs/methods 会跨运行不断累积文件。索引记录每个文件的大小、mtime 与 sha256：
+- refresh 只读取新增或修改过的文件，删除的文件同步移出索引
+- 文件按 markdown 标题 / 段落切分为块，load 直接从索引拼回全文，不再逐个读文件
+- 可按论文 ID 限定范围（只取本次运行的论文），search 通过 FTS5 全文索引做块级检索（bm25 排序）
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "outputs", "cache", "summary_index.sqlite")
+METHODOLOGY_SUFFIX = "_methodology.md"
+# 单个块的最大字符数
+CHUNK_CHARS = 1500
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def paper_id_for(file_name: str) -> str:
+    """文件名 -> 论文 ID（方法论文件为 <paper_id>_methodology.md，其余取文件名主干）"""
+    if file_name.endswith(METHODOLOGY_SUFFIX):
+        return file_name[:-len(METHODOLOGY_SUFFIX)]
+    return os.path.splitext(file_name)[0]
+
+
+def chunk_markdown(text: str, max_chars: int = CHUNK_CHARS) -> List[Dict[str, str]]:
+    """按标题切分，过长的节再按段落切分；返回 [{"heading", "text"}]"""
+    headings = list(_HEADING.finditer(text))
+    spans = [(0, headings[0].start() if headings else len(text), "")]
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        spans.append((match.start(), end, match.group(1).strip()))
+
+    chunks = []
+    for start, end, heading in spans:
+        current = ""
+        for paragraph in text[start:end].split("\n\n"):
+            if current and len(current) + len(paragraph) + 2 > max_chars:
+                chunks.append({"heading": heading, "text": current.strip()})
+                current = ""
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current.strip():
+            chunks.append({"heading": heading, "text": current.strip()})
+    return chunks
+
+
+def _to_fts_query(query: str) -> str:
+    """查询文本 -> FTS5 MATCH 表达式（词项去重后 OR 连接）"""
+    terms = list(dict.fromkeys(_TOKEN.findall(query.lower())))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class SummaryIndex:
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: 索引 SQLite 文件（默认 SUMMARY_INDEX_PATH 或 outputs/cache/summary_index.sqlite）
+        """
+        self.path = os.path.abspath(path or os.environ.get("SUMMARY_INDEX_PATH", DEFAULT_INDEX_PATH))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, kind TEXT NOT NULL, name TEXT NOT NULL, paper_id TEXT NOT NULL, "
+                "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, indexed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "path TEXT NOT NULL, idx INTEGER NOT NULL, heading TEXT NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (path, idx))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_kind ON files (kind, paper_id)")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                "path UNINDEXED, idx UNINDEXED, heading, text, tokenize='porter unicode61')"
+            )
+            # 旧版本索引只有 chunks 表：一次性补建全文索引
+            if self._conn.execute("SELECT 1 FROM chunks_fts LIMIT 1").fetchone() is None:
+                self._conn.execute("INSERT INTO chunks_fts (path, idx, heading, text) SELECT path, idx, heading, text FROM chunks")
+
+    def refresh(self, directory: str, kind: str) -> int:
+        """
+        增量同步目录下的 .md 文件
+
+        Args:
+            directory: 目录
+            kind: 文件类别，如 report / methodology
+
+        Returns:
+            新增或内容变化的文件数
+        """
+        directory = os.path.abspath(directory)
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime_ns, sha256 FROM files WHERE kind = ? AND path LIKE ?",
+                    (kind, os.path.join(directory, "%"))
+                )
+            }
+
+        seen, changed = set(), 0
+        if os.path.isdir(directory):
+            for entry in os.scandir(directory):
+                if not entry.is_file() or not entry.name.endswith(".md"):
+                    continue
+                seen.add(entry.path)
+                stat = entry.stat()
+                previous = known.get(entry.path)
+                if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+                    continue
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                content_changed = not previous or previous[2] != sha256
+                self._upsert(entry.path, kind, entry.name, stat, sha256, text if content_changed else None)
+                changed += content_changed
+
+        removed = [path for path in known if path not in seen]
+        if removed:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed])
+                self._conn.executemany("DELETE FROM chunks WHERE path = ?", [(p,) for p in removed])
+                self._conn.executemany("DELETE FROM chunks_fts WHERE path = ?", [(p,) for p in removed])
+        if changed or removed:
+            logger.info(f"📚 总结索引 {kind}: 更新 {changed} 个文件，移除 {len(removed)} 个")
+        return changed
+
+    def _upsert(self, path: str, kind: str, name: str, stat, sha256: str, text: Optional[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, kind, name, paper_id, size, mtime_ns, sha256, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, kind, name, paper_id_for(name), stat.st_size, stat.st_mtime_ns, sha256, time.time())
+            )
+            if text is None:
+                # 只是 mtime 变化，内容未变，块无需重建
+                return
+            rows = [(path, idx, chunk["heading"], chunk["text"]) for idx, chunk in enumerate(chunk_markdown(text))]
+            self._conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM chunks_fts WHERE path = ?", (path,))
+            self._conn.executemany("INSERT INTO chunks (path, idx, heading, text) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO chunks_fts (path, idx, heading, text) VALUES (?, ?, ?, ?)", rows)
+
+    def _files(self, kind: str, paper_ids: Optional[Iterable[str]] = None,
+               names: Optional[Iterable[str]] = None) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, name, paper_id FROM files WHERE kind = ? ORDER BY name", (kind,)
+            ).fetchall()
+        if paper_ids is not None:
+            paper_ids = set(paper_ids)
+            rows = [row for row in rows if row[2] in paper_ids]
+        if names is not None:
+            names = set(names)
+            rows = [row for row in rows if row[1] in names]
+        return rows
+
+    def load(self, kind: str, paper_ids: Optional[Iterable[str]] = None,
+             names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        读取某类文件的全文（从索引中的块拼回）
+
+        Args:
+            kind: 文件类别
+            paper_ids: 只返回这些论文的文件（None 表示不限）
+            names: 只返回这些文件名（None 表示不限）
+
+        Returns:
+            {文件名: 全文}
+        """
+        result = {}
+        for path, name, _ in self._files(kind, paper_ids, names):
+            with self._lock:
+                chunks = self._conn.execute(
+                    "SELECT text FROM chunks WHERE path = ? ORDER BY idx", (path,)
+                ).fetchall()
+            result[name] = "\n\n".join(chunk[0] for chunk in chunks)
+        return result
+
+    def search(self, query: str, kind: str = None, paper_ids: Optional[Iterable[str]] = None,
+               k: int = 5) -> List[Dict[str, str]]:
+        """
+        块级检索（FTS5 全文索引，bm25 排序）
+
+        Args:
+            query: 查询文本
+            kind: 限定文件类别（None 表示全部）
+            paper_ids: 限定论文
+            k: 返回块数
+
+        Returns:
+            [{"name", "paper_id", "heading", "text", "score"}]，按得分降序
+        """
+        fts_query = _to_fts_query(query)
+        if not fts_query:
+            return []
+        sql = ("SELECT f.name, f.paper_id, s.heading, s.text, bm25(chunks_fts, 0.0, 0.0, 2.0, 1.0) AS rank "
+               "FROM chunks_fts s JOIN files f ON f.path = s.path WHERE chunks_fts MATCH ?")
+        params = [fts_query]
+        if kind:
+            sql += " AND f.kind = ?"
+            params.append(kind)
+        if paper_ids is not None:
+            paper_ids = list(paper_ids)
+            if not paper_ids:
+                return []
+            sql += f" AND f.paper_id IN ({','.join('?' * len(paper_ids))})"
+            params.extend(paper_ids)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(k)
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"总结索引全文检索失败: {e}")
+            return []
+        # bm25 越小越相关，取负数使得分越高越相关
+        return [{"name": name, "paper_id": paper_id, "heading": heading, "text": text, "score": -rank}
+                for name, paper_id, heading, text, rank in rows]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_summary_index() -> Optional[SummaryIndex]:
+    """获取进程内共享的 SummaryIndex；初始化失败时返回 None（调用方退回直接读文件）"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            try:
+                _default_index = SummaryIndex()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"初始化总结索引失败: {e}")
+                return None
+        return _default_index
@@ -1,11 +1,37 @@
 import os
 import logging
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable
 from langchain_core.messages import ToolMessage, AIMessage
 
 logger = logging.getLogger(__name__)
 
 
+def build_methodology_queue(state_dict: Dict[str, Any]) -> List[int]:
+    """
+    Build the methodology work queue: indices into parsed_multimodal_content of
+    successfully parsed papers that have not been processed yet.
+    
+    The queue is stored in state_dict["methodology_queue"]; routing only checks its
+    length instead of rescanning every parsed paper.
+    """
+    processed_papers = state_dict.get("processed_papers") or set()
+    queue = [
+        idx for idx, item in enumerate(state_dict.get("parsed_multimodal_content") or [])
+        if item.get("status") == "success" and
+        os.path.basename(item.get("pdf_path", "")) not in processed_papers
+    ]
+    state_dict["methodology_queue"] = queue
+    return queue
+
+
+def pending_methodology_count(state_dict: Dict[str, Any]) -> int:
+    """Number of papers still waiting for methodology extraction."""
+    queue = state_dict.get("methodology_queue")
+    if queue is None:
+        queue = build_methodology_queue(state_dict)
+    return len(queue)
+
+
 def route_by_tool_call(
     state_dict: Dict[str, Any],
     tool_name: str = "summary_writer_tool",
@@ -26,19 +52,8 @@ def route_by_tool_call(
         Routing decision: "TOOLS", "CONTINUE", or "END"
     """
     # For methodology workflow, check if all papers are processed first
-    if check_papers:
-        parsed_content = state_dict.get("parsed_multimodal_content", [])
-        processed_papers = state_dict.get("processed_papers", set())
-        
-        # Count unprocessed papers
-        unprocessed = [
-            item for item in parsed_content
-            if item.get("status") == "success" and 
-            os.path.basename(item.get("pdf_path", "")) not in processed_papers
-        ]
-        
-        if not unprocessed:
-            return "END"
+    if check_papers and not pending_methodology_count(state_dict):
+        return "END"
     
     messages = state_dict.get("messages", [])
     if not messages:
@@ -57,14 +72,7 @@ def route_by_tool_call(
             
             # Default behavior: for methodology, check if more papers to process
             if check_papers:
-                parsed_content = state_dict.get("parsed_multimodal_content", [])
-                processed_papers = state_dict.get("processed_papers", set())
-                unprocessed = [
-                    item for item in parsed_content
-                    if item.get("status") == "success" and 
-                    os.path.basename(item.get("pdf_path", "")) not in processed_papers
-                ]
-                if unprocessed:
+                if pending_methodology_count(state_dict):
                     return "CONTINUE"
                 else:
                     return "END"